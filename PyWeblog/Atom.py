@@ -47,10 +47,8 @@ class Atom(GenericFeed.GenericFeed):
 
     def transform(self, ctx, root):
         root.set("icon", self._favicon or "")
-        self._favicon = self.site.transform_href(ctx, root, attrname="icon", make_global=True)
-        feed = super(Atom, self).transform(ctx, root)
-        transform_href = self.site.transform_href
-        return feed
+        self.site.transform_href(ctx, root, attrname="icon", make_global=True)
+        return super(Atom, self).transform(ctx, root)
 
     # these are handled by a proxy class. this instance is _never_ returned as
     # handling node
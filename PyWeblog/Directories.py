@@ -25,7 +25,7 @@
 from __future__ import unicode_literals, absolute_import, print_function
 
 from datetime import datetime
-import functools, copy
+import functools
 
 from PyXWF.utils import ET
 import PyXWF.Nodes as Nodes
@@ -93,12 +93,8 @@ class YearDir(Nodes.DirectoryResolutionBehaviour, Nodes.Node, Navigation.Info):
     def get_representative(self):
         return self
 
-    def purge_empty(self):
-        for i, month in enumerate(self._months):
-            if month is None:
-                continue
-            if len(month) == 0:
-                self._months[i] = None
+    def drop_month_node(self, month):
+        self._months[month-1] = None
 
     def __iter__(self):
         return (month for month in reversed(self._months) if month is not None)
@@ -159,8 +155,21 @@ class MonthDir(Nodes.DirectoryResolutionBehaviour, Nodes.Node, Navigation.Info,
         return self._monthname
 
     def do_GET(self, ctx):
+        paginator = self.Blog.month_paginator
+        posts = self.index.get_posts_by_month(self.year, self.month)
+        page = paginator.get_page_number(ctx)
+        abstracts = paginator.get_abstract_list(
+            paginator.get_page(posts, page),
+            page,
+            paginator.get_page_count(len(posts)),
+            self.Path,
+            attrib={
+                "month-name": self._monthstr,
+                "month": unicode(self.month),
+                "year": unicode(self.year)
+            })
         return self.site.template_cache[self.Blog.month_template].transform(
-            self.abstracts,
+            abstracts,
             self.Blog.get_transform_args()
         )
 
@@ -177,7 +186,8 @@ class MonthDir(Nodes.DirectoryResolutionBehaviour, Nodes.Node, Navigation.Info,
         return self
 
     def get_posts(self):
-        return self._children
+        return self.index.get_posts_by_date(self.year, self.month,
+                                            reverse=True)
 
     def resolve_path(self, ctx, rel_path):
         result = super(MonthDir, self).resolve_path(ctx, rel_path)
@@ -186,11 +196,6 @@ class MonthDir(Nodes.DirectoryResolutionBehaviour, Nodes.Node, Navigation.Info,
         return result
 
     def update_children(self):
-        abstracts = ET.Element(getattr(NS.PyBlog, "abstract-list"), attrib={
-            "month-name": self._monthstr,
-            "month": unicode(self.month),
-            "year": unicode(self.year)
-        })
         self._childmap = {}
         self._children = []
         for post in reversed(self.Blog.index.get_posts_by_month(self.year, self.month)):
@@ -200,8 +205,6 @@ class MonthDir(Nodes.DirectoryResolutionBehaviour, Nodes.Node, Navigation.Info,
             node = Post.PostNode(self, post)
             self._childmap[name] = node
             self._children.append(node)
-            abstracts.append(copy.deepcopy(post.abstract))
-        self.abstracts = abstracts
 
     def __iter__(self):
         if self.Blog.show_posts_in_nav:
@@ -58,6 +58,13 @@ class Feeds(Node.Tweak, Protocols.Feeds):
 
         self.Blog.Feeds = self
 
+    @property
+    def QueryParam(self):
+        """
+        The name of the query parameter which selects the feed protocol.
+        """
+        return self._queryparam
+
     def get_feeds_node(self, for_directory):
         feeds = NS.PyBlog("feeds")
         feeds.set("query-param", self._queryparam)
@@ -24,15 +24,40 @@
 ########################################################################
 from __future__ import unicode_literals, absolute_import, print_function
 
-import abc, operator, itertools
+import abc, operator, itertools, hashlib, urllib
+from datetime import datetime
 
-from PyXWF.utils import ET, _F
+from PyXWF.utils import ET, _F, threading
 import PyXWF.Nodes as Nodes
 import PyXWF.Namespaces as NS
 import PyXWF.Types as Types
+import PyXWF.Errors as Errors
+import PyXWF.Cache as Cache
+import PyXWF.Message as Message
+import PyXWF.HTTPUtils as HTTPUtils
 
 import PyWeblog.Protocols as Protocols
 
+class CachedFeed(Cache.Cachable):
+    """
+    A rendered feed document for one variant of a request, valid as long as
+    *version* does not change. *posts* is the list of posts contained in the
+    feed and *etag* the opaque entity tag of the full document.
+
+    Delta documents (see RFC 3229) rendered from this feed are kept in
+    :attr:`deltas`, keyed by the number of posts they contain. The posts in a
+    delta are always the most recently updated ones of the feed, so there are
+    at most as many deltas as posts, whatever timestamps clients send.
+    """
+
+    def __init__(self, version, message, posts, etag=None):
+        super(CachedFeed, self).__init__()
+        self.version = version
+        self.body = Message.EncodedBodyCache(message)
+        self.posts = posts
+        self.etag = etag
+        self.deltas = {}
+
 class GenericFeed(Protocols.Feed):
     __metaclass__ = abc.ABCMeta
 
@@ -62,16 +87,20 @@ class GenericFeed(Protocols.Feed):
 
     def __init__(self, site, parent, node):
         if not isinstance(parent, Protocols.Feeds):
-            raise BadParent(node, parent)
+            raise Errors.BadParent(node, parent)
         super(GenericFeed, self).__init__()
         self.site = site
         self.Blog = parent.Blog
+        self._query_param = parent.QueryParam
         self._limit = Types.NumericRange(int, 1, None)(node.get("limit", 10))
         self._link_prefix = Types.NotNone(node.get("link-prefix"))
         self._idprefix = node.get("id-prefix", self._link_prefix)
         self._iconhref = node.get("icon-href")
         self._rootid = node.get("root-id")
         self._map_updated_to_last_modified = Types.Typecasts.bool(node.get("map-updated-to-last-modified", True))
+        self._delta_encoding = Types.Typecasts.bool(node.get("delta-encoding", True))
+        self._cache = site.cache[(self, "feeds")]
+        self._cache_lock = threading.Lock()
 
     @abc.abstractproperty
     def ContentType(self):
@@ -83,23 +112,154 @@ class GenericFeed(Protocols.Feed):
     def QueryValue(self):
         return self._query_value
 
+    def _get_cache_key(self, ctx, node):
+        # these are all the request properties which go into the rendered
+        # feed (see render and transform); besides the one selecting this
+        # feed, only the query parameters which select the posts are read
+        return (ctx.URLScheme, ctx.HostName, node.Path,
+                tuple(node.QueryArguments))
+
+    def _get_feed_path(self, ctx, node):
+        query = urllib.urlencode([
+            (name.encode("utf-8"), value.encode("utf-8"))
+            for name, value in itertools.chain(
+                node.QueryArguments,
+                [(self._query_param, self.QueryValue)])
+        ])
+        return self.site.transform_relative_uri(ctx,
+            "{0}?{1}".format(node.Path, query))
+
+    def _get_version(self):
+        return (self.Blog.index.Version,
+                self.site.template_cache[self._template].LastModified)
+
+    # format of the timestamp part of the entity tags; this allows to find out
+    # which posts are new to the client from the entity tag alone.
+    etag_timestamp_format = "%Y%m%dT%H%M%S%f"
+
+    def _get_updated_key(self):
+        if self._map_updated_to_last_modified:
+            return operator.attrgetter("LastModified")
+        else:
+            return operator.attrgetter("creation_date")
+
+    def _get_etag(self, posts, body):
+        updated_key = self._get_updated_key()
+        if posts:
+            timestamp = max(map(updated_key, posts)).strftime(
+                self.etag_timestamp_format)
+        else:
+            timestamp = "0"
+        digest = hashlib.sha1(body.get_encoded_body("utf-8")).hexdigest()
+        return "{0}-{1}".format(timestamp, digest[:16])
+
+    def _parse_etag_timestamp(self, etag):
+        timestamp, _, _ = etag.partition("-")
+        try:
+            return datetime.strptime(timestamp, self.etag_timestamp_format)
+        except ValueError:
+            return None
+
+    def _get_entry(self, ctx, node):
+        key = self._get_cache_key(ctx, node)
+        version = self._get_version()
+        entry = self._cache.get(key)
+        if entry is None or entry.version != version:
+            posts = list(itertools.islice(node.get_posts(), 0, self._limit))
+            message = Message.XMLMessage(self.render(ctx, node, posts),
+                self.ContentType,
+                cleanup_namespaces=True,
+                pretty_print=self.site.pretty_print)
+            entry = CachedFeed(version, message, posts)
+            entry.etag = self._get_etag(posts, entry.body)
+            self._cache.replace(key, entry)
+        return entry
+
+    def _wants_delta(self, ctx):
+        if not self._delta_encoding:
+            return False
+        a_im = ctx.get_request_header("a-im")
+        if not a_im:
+            return False
+        manipulations = (item.partition(";")[0].strip().lower()
+                         for item in a_im.split(","))
+        return "feed" in manipulations
+
+    def _get_delta(self, ctx, node, entry, etags):
+        """
+        Return the delta message for a client which has one of the entity
+        tags in *etags*, or None if no sensible delta can be produced.
+        """
+        timestamps = filter(None, map(self._parse_etag_timestamp, etags))
+        if not timestamps:
+            return None
+        since = max(timestamps)
+        updated_key = self._get_updated_key()
+        posts = [post for post in entry.posts if updated_key(post) > since]
+        if not posts or len(posts) == len(entry.posts):
+            return None
+        with self._cache_lock:
+            body = entry.deltas.get(len(posts))
+        if body is None:
+            body = Message.EncodedBodyCache(
+                Message.XMLMessage(self.render(ctx, node, posts),
+                    self.ContentType,
+                    cleanup_namespaces=True,
+                    pretty_print=self.site.pretty_print))
+            with self._cache_lock:
+                entry.deltas[len(posts)] = body
+        ctx.set_response_header(b"IM", b"feed")
+        return body.get_message(status=Errors.IMUsed)
+
     def do_GET(self, ctx, node):
+        """
+        Return the feed for the :class:`~PyWeblog.Protocols.PostDirectory`
+        *node*. Rendered feeds are cached until the blog index or the feed
+        template change.
+
+        If the client asks for the ``feed`` instance manipulation (RFC 3229)
+        and sends the entity tag of a previous version of the feed, only the
+        posts which changed since then are returned with ``226 IM Used``.
+        As the response then depends on both headers, all responses of a
+        feed with delta encoding enabled vary on them.
+        """
+        entry = self._get_entry(ctx, node)
+        ctx.set_response_header(b"ETag",
+            HTTPUtils.format_entity_tag(entry.etag))
+        if self._delta_encoding:
+            ctx.add_vary("A-IM")
+            ctx.add_vary("If-None-Match")
+
+        if_none_match = ctx.get_request_header("if-none-match")
+        if if_none_match is not None:
+            etags = HTTPUtils.parse_entity_tags(if_none_match)
+            if ctx.Cachable and ("*" in etags or entry.etag in etags):
+                raise Errors.NotModified()
+            if self._wants_delta(ctx):
+                message = self._get_delta(ctx, node, entry, etags)
+                if message is not None:
+                    return message
+
+        return entry.body.get_message()
+
+    def render(self, ctx, node, posts):
+        """
+        Render the feed for *node* containing *posts* without using the
+        cache.
+        """
         root = ET.Element(NS.PyBlog.syndication, attrib={
             "kind": node.SelectionCriterion,
             "title": node.SelectionValue
         })
         rootid = ET.SubElement(root, NS.PyBlog.id).text = \
             self._rootid or (self._idprefix + node.Path)
-        if self._map_updated_to_last_modified:
-            updated_key = operator.attrgetter("LastModified")
-        else:
-            updated_key = operator.attrgetter("creation_date")
+        updated_key = self._get_updated_key()
 
-        posts = list(itertools.islice(node.get_posts(), 0, self._limit))
         if len(posts) > 0:
             ET.SubElement(root, getattr(NS.PyBlog, "updated")).text = \
                 max(map(updated_key, posts)).isoformat() + "Z"
-        ET.SubElement(root, getattr(NS.PyBlog, "feed-path")).text = ctx.FullURI
+        ET.SubElement(root, getattr(NS.PyBlog, "feed-path")).text = \
+            self._get_feed_path(ctx, node)
         ET.SubElement(root, getattr(NS.PyBlog, "node-path")).text = node.Path
         ET.SubElement(root, getattr(NS.PyBlog, "blog-path")).text = self.Blog.Path
         for post in posts:
@@ -127,5 +287,8 @@ class GenericFeed(Protocols.Feed):
     def transform(self, ctx, root):
         self.site.transform_references(ctx, root)
         feed = self.site.template_cache[self._template].raw_transform(root, {})
-        feed = self.site.transform_py_namespace(ctx, feed, crumbs=False)
+        # feeds are read by feed readers, not mobile browsers; rendering
+        # them the same way for every client allows to cache them per URL
+        feed = self.site.transform_py_namespace(ctx, feed, crumbs=False,
+                                                mobile=False)
         return feed
@@ -25,14 +25,20 @@
 from __future__ import unicode_literals, print_function, absolute_import
 
 import functools
+import heapq
 import os
 import logging
+import time
+from datetime import datetime
 import operator
 
 from PyXWF.utils import ET, BraceMessage as _F, blist
 import PyXWF.Resource as Resource
 import PyXWF.Errors as Errors
 import PyXWF.Namespaces as NS
+import PyXWF.TimeUtils as TimeUtils
+
+import PyWeblog.Related as Related
 
 logger = logging.getLogger(__name__)
 
@@ -41,7 +47,7 @@ SortedPostList = blist.sortedlist
 @functools.total_ordering
 class Post(Resource.Resource):
     def __init__(self, cache, filename, pathformat, dateformat,
-            resort_callback=None, find_neighbours_callback=None):
+            resort_callback=None, changed_callback=None):
         super(Post, self).__init__()
         self.cache = cache
         self.filename = filename
@@ -52,15 +58,20 @@ class Post(Resource.Resource):
         self.keywords = None
         self.creation_date = None
         self.description = None
+        # these are maintained by the Index
         self._prevpost = None
         self._nextpost = None
+        self._ordinal = None
+        self._related = []
 
         self._resort_callback = resort_callback
+        # the initial load is not announced as change
+        self._changed_callback = None
         self._pathformat = pathformat
         self._dateformat = dateformat
         self._cache_metadata(self.cache[self.filename].doc)
         self._last_modified = self._calc_last_modified()
-        self._find_neighbours_callback = find_neighbours_callback
+        self._changed_callback = changed_callback
 
     def _cache_metadata(self, document):
         creation_date = document.date
@@ -73,8 +84,8 @@ class Post(Resource.Resource):
 
         self.need_resort = False
         if self.creation_date is not None:
-            if      creation_date.year != self.creation_date.year or \
-                    creation_date.month != self.creation_date.month:
+            # any change of the date may change the ordering of the posts
+            if creation_date != self.creation_date:
                 self.need_resort = True
         if self.keywords is not None:
             if frozenset(keywords) != frozenset(self.keywords):
@@ -112,47 +123,74 @@ class Post(Resource.Resource):
         for author in self.authors:
             author.apply_to_node(ET.SubElement(self.abstract, NS.PyWebXML.author))
 
-        # mark the relations for update
-        if self._prevpost:
-            self._prevpost._nextpost = False
-        if self._nextpost:
-            self._nextpost._prevpost = False
-        self._prevpost = False
-        self._nextpost = False
+        if self._changed_callback:
+            self._changed_callback(self)
 
     def _calc_last_modified(self):
         return self.cache.get_last_modified(self.filename)
 
-    def _update_neighbours(self):
-        if self._find_neighbours_callback:
-            self._prevpost, self._nextpost = self._find_neighbours_callback(self)
-        else:
-            self._prevpost, self._nextpost = None, None
-
     @property
     def LastModified(self):
         return self._last_modified
 
     @property
     def PrevPost(self):
-        if self._prevpost is False:
-            self._update_neighbours()
+        """
+        The post preceding this post in the index (i.e. the next older one)
+        or :data:`None`.
+        """
         return self._prevpost
 
     @property
     def NextPost(self):
-        if self._nextpost is False:
-            self._update_neighbours()
+        """
+        The post following this post in the index (i.e. the next newer one)
+        or :data:`None`.
+        """
         return self._nextpost
 
+    @property
+    def RelatedPosts(self):
+        """
+        List of the most similar posts, most similar first. This is only
+        filled if the index has been set up to compute related posts.
+        """
+        return [post for _, post in self._related]
+
+    @property
+    def RelatedPostScores(self):
+        """
+        List of the similarity scores of the :attr:`RelatedPosts`, formatted
+        as they appear in the ``@score`` attributes of the metadata.
+        """
+        return [self._format_score(score) for score, _ in self._related]
+
+    @staticmethod
+    def _format_score(score):
+        return "{0:.3f}".format(score)
+
+    @property
+    def Ordinal(self):
+        """
+        Zero-based position of the post in the index, oldest first, or
+        :data:`None` if the post is not in an index.
+        """
+        return self._ordinal
+
     def update(self):
+        """
+        Reload the post if the file has changed. Return :data:`True` if the
+        post was reloaded.
+        """
         new_last_modified = self._calc_last_modified()
         if new_last_modified > self._last_modified:
             docproxy = self.cache[self.filename]
             docproxy.update()
             doc = docproxy.doc
-            self._cache_metadata(doc)
             self._last_modified = new_last_modified
+            self._cache_metadata(doc)
+            return True
+        return False
 
     def get_document(self):
         return self.cache.get(self.filename, header_offset=2).doc
@@ -176,13 +214,22 @@ class Post(Resource.Resource):
                 "href": nextpost.path,
                 "title": nextpost.title
             })
+        for score, related in self._related:
+            ET.SubElement(meta, getattr(NS.PyBlog, "related-post"), attrib={
+                "href": related.path,
+                "title": related.title,
+                "score": self._format_score(score)
+            })
 
         ET.SubElement(meta, getattr(NS.PyBlog, "node-path")).text = self.path
         return page
 
     def __lt__(self, other):
+        # the filename breaks ties, so that posts with equal dates still
+        # have a well-defined order in the sorted lists
         try:
-            return self.creation_date < other.creation_date
+            return (self.creation_date, self.filename) < \
+                   (other.creation_date, other.filename)
         except AttributeError:
             return NotImplemented
 
@@ -196,10 +243,74 @@ class Post(Resource.Resource):
             return NotImplemented
 
 
+class IndexChange(object):
+    """
+    Describe a set of changes to an :class:`Index`. This is passed to the
+    *posts_changed_callback* of the index, so that only the parts of the
+    blog which are actually affected need to be rebuilt.
+
+    .. attribute:: added
+
+        Set of posts which have been added to the index.
+
+    .. attribute:: removed
+
+        Set of posts which have been removed from the index.
+
+    .. attribute:: moved
+
+        Set of posts whose date or keywords have changed, i.e. which have been
+        moved to other months, keywords or positions.
+
+    .. attribute:: updated
+
+        Set of posts whose metadata has changed otherwise.
+
+    .. attribute:: months
+
+        Set of ``(year, month)`` tuples of all months whose list of posts (or
+        the metadata of a post in it) has changed. For moved posts, this
+        includes both the old and the new month.
+
+    .. attribute:: keywords
+
+        Set of keywords whose list of posts (or the metadata of a post in it)
+        has changed.
+    """
+
+    def __init__(self):
+        super(IndexChange, self).__init__()
+        self.added = set()
+        self.removed = set()
+        self.moved = set()
+        self.updated = set()
+        self.months = set()
+        self.keywords = set()
+
+    def touch(self, post):
+        """
+        Mark the month and keywords *post* currently belongs to as affected.
+        """
+        self.months.add((post.creation_date.year, post.creation_date.month))
+        self.keywords.update(post.keywords)
+
+    def __nonzero__(self):
+        return bool(self.added or self.removed or self.moved or self.updated)
+
 class Index(Resource.Resource):
+    """
+    Index of the blog posts in *entry_dir*. The directory is scanned for new,
+    changed and removed posts on :meth:`update`, but at most every
+    *check_interval* seconds. Posts dated in the future are promoted into the
+    index on every :meth:`update` once they are due, independent of the
+    scan.
+    """
+
     def __init__(self, blog, doc_cache, entry_dir, pathformat, dateformat,
-            posts_changed_callback=None):
+            posts_changed_callback=None, related_count=0, check_interval=0.):
         super(Index, self).__init__()
+        self.check_interval = check_interval
+        self._checked = None
         self._doc_cache = doc_cache
         self._dir = entry_dir
         self._posts = SortedPostList()
@@ -210,15 +321,44 @@ class Index(Resource.Resource):
         self._pathformat = pathformat
         self._dateformat = dateformat
         self._posts_changed_callback = posts_changed_callback
+        self._change_listeners = []
+        self._change = IndexChange()
+        self._version = 0
+        self._keyword_version = 0
+        # maps posts whose date or keywords are being changed to whether
+        # they were published (as opposed to scheduled) before
+        self._moving = {}
+        self._reloading = False
+        # position in _posts from which on ordinals and neighbour pointers
+        # need to be refreshed, if any
+        self._relink_from = None
+        # posts dated in the future are kept out of the lists above; they
+        # are stored in this heap of (creation_date, filename, post) tuples
+        # until they are due. Stale entries (for posts which were removed or
+        # rescheduled in the meantime) are skipped when popping.
+        self._schedule = []
+        self._scheduled = set()
+        if related_count:
+            self._related = Related.RelatedPosts(self, related_count)
+        else:
+            self._related = None
 
     def _reload(self):
-        logger.info("Updating blog index")
+        logger.debug("Updating blog index")
+        self._checked = time.time()
+        self._reloading = True
+        try:
+            self._reload_posts()
+        finally:
+            self._reloading = False
+        self._flush_changes()
 
+    def _reload_posts(self):
         ignore_names = frozenset(["blog.reload", "blog.index"])
 
         missing = set(self._post_files.iterkeys())
 
-        added, updated, errors = 0, 0, 0
+        added, errors = 0, 0
 
         for dirpath, dirnames, filenames in os.walk(self._dir):
             for filename in filenames:
@@ -236,7 +376,12 @@ class Index(Resource.Resource):
                     pass
                 else:
                     missing.remove(fullpath)
-                    updated += 1
+                    try:
+                        post.update()
+                    except ValueError as err:
+                        logger.error(_F("While updating blog post at {1!r}: {0}", \
+                                         err, filename))
+                        errors += 1
                     continue
                 # otherwise, we'll load and add the post if possible.
                 try:
@@ -256,13 +401,18 @@ class Index(Resource.Resource):
         for filename in missing:
             post = self._post_files[filename]
             self._remove_post(post)
+        self._publish_due_posts()
         try:
-            self._last_modified = max(map(operator.attrgetter("LastModified"),
-                                         self._posts))
+            # a post which was scheduled appears only at its creation date,
+            # which may well be after the modification of its file
+            self._last_modified = max(
+                max(post.LastModified, post.creation_date)
+                for post in self._posts)
         except ValueError:
             self._last_modified = None
             logger.warning(_F("No blog posts found in {0}", self._dir))
 
+        updated = len(self._change.moved) + len(self._change.updated)
         if len(missing) or added or updated or errors:
             logger.info(_F(
     "Updated blog index; {0} removed, {1} added, {2} updated, {3} errors",
@@ -271,8 +421,34 @@ class Index(Resource.Resource):
                 updated,
                 errors
             ))
-            if self._posts_changed_callback:
-                self._posts_changed_callback()
+
+    def _flush_changes(self):
+        """
+        Pass the changes collected since the last call to the
+        *posts_changed_callback*, if there are any.
+        """
+        self._relink()
+        change = self._change
+        if not change:
+            return
+        self._change = IndexChange()
+        self._version += 1
+        if change.added or change.removed or change.moved:
+            self._keyword_version += 1
+        if self._related is not None:
+            self._related.update(change)
+        if self._posts_changed_callback:
+            self._posts_changed_callback(change)
+        for listener in self._change_listeners:
+            listener(change)
+
+    def add_change_listener(self, callback):
+        """
+        Register *callback* to be called with an :class:`IndexChange` instance
+        whenever the index has changed. Listeners are called after the
+        *posts_changed_callback* passed to the constructor.
+        """
+        self._change_listeners.append(callback)
 
     @property
     def LastModified(self):
@@ -280,9 +456,42 @@ class Index(Resource.Resource):
             self._reload()
         return self._last_modified
 
+    @property
+    def Version(self):
+        """
+        Counter which is incremented whenever the set of posts or the metadata
+        or contents of any post changes. Use this to invalidate data derived
+        from the index.
+        """
+        return self._version
+
+    @property
+    def KeywordVersion(self):
+        """
+        Like :attr:`Version`, but only incremented when posts are added,
+        removed or moved, i.e. when the set of posts of a keyword may have
+        changed. Changes to the contents of posts do not affect it.
+        """
+        return self._keyword_version
+
     def update(self):
+        if self._checked is not None and \
+                time.time() - self._checked < self.check_interval:
+            # the directory has been scanned recently, only look at the
+            # schedule
+            if self._publish_due_posts():
+                self._flush_changes()
+            return
         self._reload()
 
+    @property
+    def ScheduledPosts(self):
+        """
+        List of the posts which are dated in the future and thus not
+        published yet, in the order they will be published.
+        """
+        return sorted(self._scheduled)
+
     def _autocreate_month_dir(self, year, month):
         try:
             yeardir = self._calendary[year]
@@ -300,17 +509,56 @@ class Index(Resource.Resource):
             self._keywords[keyword] = keyworddir
             return keyworddir
 
-    def _find_neighbours(self, post):
+    def _mark_relink(self, idx):
+        if self._relink_from is None or idx < self._relink_from:
+            self._relink_from = idx
+
+    def _relink(self):
+        """
+        Refresh ordinals and neighbour pointers of all posts from the first
+        position which has changed since the last call on. As posts are
+        usually added at the end, this touches only a few posts.
+        """
+        start = self._relink_from
+        if start is None:
+            return
+        self._relink_from = None
+        posts = self._posts
+        prev = posts[start-1] if start > 0 else None
+        for ordinal, post in enumerate(posts[start:], start):
+            post._ordinal = ordinal
+            post._prevpost = prev
+            if prev is not None:
+                prev._nextpost = post
+            prev = post
+        if prev is not None:
+            prev._nextpost = None
+
+    def _insert_post(self, post):
+        self._posts.add(post)
+        self._mark_relink(self._posts.index(post))
+
+    def _extract_post(self, post):
         idx = self._posts.index(post)
-        if idx > 0:
-            prev = self._posts[idx-1]
-        else:
-            prev = None
-        if idx < len(self._posts)-1:
-            next = self._posts[idx+1]
-        else:
-            next = None
-        return prev, next
+        del self._posts[idx]
+        self._mark_relink(idx)
+        post._ordinal = None
+        post._prevpost = None
+        post._nextpost = None
+
+    def _bisect_date(self, date, lo, hi):
+        """
+        Return the index of the first post in ``_posts[lo:hi]`` created at or
+        after *date*.
+        """
+        posts = self._posts
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if posts[mid].creation_date < date:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
 
     def _unindex_post(self, post):
         year, month = post.creation_date.year, post.creation_date.month
@@ -318,35 +566,124 @@ class Index(Resource.Resource):
         for keyword in post.keywords:
             self._keywords[keyword].remove(post)
 
+    def _index_post(self, post):
+        self._autocreate_month_dir( post.creation_date.year,
+                                    post.creation_date.month).add(post)
+        for keyword in post.keywords:
+            self._autocreate_keyword_dir(keyword).add(post)
+
+    def _is_due(self, post):
+        return post.creation_date <= TimeUtils.now_date()
+
+    def _schedule_post(self, post):
+        self._scheduled.add(post)
+        heapq.heappush(self._schedule,
+                       (post.creation_date, post.filename, post))
+
+    def _publish_post(self, post):
+        self._index_post(post)
+        self._insert_post(post)
+        self._change.touch(post)
+        self._change.added.add(post)
+        if self._last_modified is not None:
+            self._last_modified = max(self._last_modified, post.creation_date)
+
+    def _publish_due_posts(self):
+        """
+        Move all scheduled posts whose creation date has been reached into
+        the index. Return the number of posts published.
+        """
+        schedule = self._schedule
+        now = TimeUtils.now_date()
+        published = 0
+        while schedule and schedule[0][0] <= now:
+            date, _, post = heapq.heappop(schedule)
+            if post not in self._scheduled or post.creation_date != date:
+                # stale entry
+                continue
+            self._scheduled.remove(post)
+            self._publish_post(post)
+            published += 1
+        if published:
+            logger.info(_F("Published {0} scheduled blog posts", published))
+        return published
+
     def _remove_post(self, post):
+        if post in self._scheduled:
+            # it has never been visible, so there is nothing to announce
+            self._scheduled.remove(post)
+            self._post_files.pop(post.filename)
+            return
+        self._change.touch(post)
+        self._change.removed.add(post)
         self._unindex_post(post)
-        self._posts.remove(post)
+        self._extract_post(post)
         self._post_files.pop(post.filename)
+        if not self._reloading:
+            self._flush_changes()
 
     def _resort_post(self, post, new_date, new_authors, new_keywords):
+        # this is called before the new metadata is applied to the post, so
+        # we can remove it from the lists using the old sort keys. It is put
+        # back by _post_changed once the new metadata is in place.
+        if post in self._scheduled:
+            self._scheduled.remove(post)
+            self._moving[post] = False
+            return
+        self._change.touch(post)
         self._unindex_post(post)
+        self._extract_post(post)
+        self._moving[post] = True
 
-        year, month = new_date.year, new_date.month
-        self._autocreate_month_dir(year, month).add(post)
-        for keyword in new_keywords:
-            self._autocreate_keyword_dir(keyword).add(post)
+    def _post_changed(self, post):
+        try:
+            was_published = self._moving.pop(post)
+        except KeyError:
+            if post in self._scheduled:
+                return
+            self._change.updated.add(post)
+            self._change.touch(post)
+        else:
+            if not self._is_due(post):
+                # the post has been (re-)dated into the future
+                self._schedule_post(post)
+                if was_published:
+                    self._change.removed.add(post)
+            elif was_published:
+                self._index_post(post)
+                self._insert_post(post)
+                self._change.moved.add(post)
+                self._change.touch(post)
+            else:
+                self._publish_post(post)
+        if not self._reloading:
+            self._flush_changes()
 
     def add_post(self, filename):
         post = Post(self._doc_cache, filename, self._pathformat,
                 self._dateformat,
                 resort_callback=self._resort_post,
-                find_neighbours_callback=self._find_neighbours)
-        self._autocreate_month_dir( post.creation_date.year,
-                                    post.creation_date.month).add(post)
-        for keyword in post.keywords:
-            self._autocreate_keyword_dir(keyword).add(post)
-        self._posts.add(post)
+                changed_callback=self._post_changed)
         self._post_files[filename] = post
+        if not self._is_due(post):
+            logger.info(_F("Scheduled blog post {0!r} for {1}", filename,
+                           post.creation_date))
+            self._schedule_post(post)
+            return post
+        self._publish_post(post)
+        if not self._reloading:
+            self._flush_changes()
         return post
 
     def get_all_posts(self):
         return self._posts
 
+    def get_post_by_filename(self, filename):
+        post = self._post_files.get(filename, None)
+        if post in self._scheduled:
+            return None
+        return post
+
     def get_posts_by_keyword(self, tag):
         try:
             return self._keywords[tag]
@@ -373,26 +710,32 @@ class Index(Resource.Resource):
         except KeyError:
             return []
 
+    def get_posts_between(self, start=None, end=None):
+        """
+        Return the posts created at or after the :class:`datetime.datetime`
+        *start* and before *end*, oldest first. Either bound may be
+        :data:`None` to leave that side open.
+        """
+        lo, hi = 0, len(self._posts)
+        if start is not None:
+            lo = self._bisect_date(start, lo, hi)
+        if end is not None:
+            hi = self._bisect_date(end, lo, hi)
+        return self._posts[lo:hi]
+
     def get_posts_by_year(self, year):
-        try:
-            return itertools.chain(*self._calendary[year])
-        except KeyError:
-            return []
+        return self.get_posts_between(datetime(year, 1, 1),
+                                      datetime(year+1, 1, 1))
 
     def get_posts_by_year_newest_first(self, year):
-        try:
-            return itertools.chain(*(
-                reversed(monthdir) for monthdir in reversed(self._calendary[year])
-            ))
-        except KeyError:
-            return []
+        return reversed(self.get_posts_by_year(year))
 
     def get_posts_by_date(self, year, month=None, reverse=False):
         if month:
             if reverse:
-                return reversed(self.get_posts_by_month)
+                return reversed(self.get_posts_by_month(year, month))
             else:
-                return self.get_posts_by_month()
+                return self.get_posts_by_month(year, month)
         else:
             if reverse:
                 return self.get_posts_by_year_newest_first(year)
@@ -40,6 +40,7 @@ import PyXWF.Types as Types
 import PyWeblog.Protocols as Protocols
 import PyWeblog.Index as Index
 import PyWeblog.Directories as Directories
+import PyWeblog.Pagination as Pagination
 
 logger = logging.getLogger(__name__)
 
@@ -57,6 +58,7 @@ class Blog(Nodes.DirectoryResolutionBehaviour, Nodes.Node):
 
     namespace = str(NS.PyBlog)
     names = ["node"]
+    lazy = True
 
     _child_order_type = Types.DefaultForNone(True,
         Types.EnumMap({
@@ -119,12 +121,19 @@ class Blog(Nodes.DirectoryResolutionBehaviour, Nodes.Node):
         self.month_template = Types.NotNone(node.get("month-template"))
         self.post_template = Types.NotNone(node.get("post-template"))
         self.show_posts_in_nav = Types.Typecasts.bool(node.get("show-posts-in-nav", True))
+        self.month_paginator = Pagination.Paginator(
+            Pagination.Paginator.page_size_type(node.get("month-page-size"))
+        )
 
         entry_dir = Types.NotNone(node.get("entry-dir"))
         self.index = Index.Index(self, site.file_document_cache, entry_dir,
             self.Path + "{year}/{month}/{basename}",
             self.site.long_date_format,
-            posts_changed_callback=self._posts_changed)
+            posts_changed_callback=self._posts_changed,
+            related_count=Types.NumericRange(int, 0, None)(
+                node.get("related-posts", 0)),
+            check_interval=Types.NumericRange(float, 0., None)(
+                node.get("check-interval", 0.)))
         self.index._reload()
 
         self._load_children(node)
@@ -168,6 +177,19 @@ class Blog(Nodes.DirectoryResolutionBehaviour, Nodes.Node):
         ctx.use_resource(self.index)
         return super(Blog, self).resolve_path(ctx, relpath)
 
+    def iter_children(self):
+        return iter(self._childnode_list)
+
+    def iter_sitemap_urls(self, ctx):
+        # the year and month directories are left out, the posts are taken
+        # directly from the index instead
+        ctx.use_resource(self.index)
+        return itertools.chain(
+            super(Blog, self).iter_sitemap_urls(ctx),
+            ((post.path, post.LastModified)
+             for post in reversed(self.index.get_all_posts()))
+        )
+
     def _get_child(self, key):
         try:
             year = int(key)
@@ -177,7 +199,7 @@ class Blog(Nodes.DirectoryResolutionBehaviour, Nodes.Node):
             except KeyError:
                 return None
         else:
-            return self._year_nodes[year]
+            return self._year_nodes.get(year)
 
     def _load_children(self, node):
         # this must only run on a fresh blog node
@@ -194,28 +216,28 @@ class Blog(Nodes.DirectoryResolutionBehaviour, Nodes.Node):
             else:
                 self._add_child(plugin)
 
-    def _posts_changed(self):
-        logger.debug("Posts changed callback")
-        known_years = set(map(operator.attrgetter("year"), self._year_nodes.viewvalues()))
-        curr_years = set()
-        for year, monthiter in self.index.iter_deep():
-            yearnode = self._autocreate_year_node(year)
-            for month in monthiter:
-                monthnode = yearnode.autocreate_month_node(month)
-            yearnode.purge_empty()
-            curr_years.add(year)
-
-        deleted = known_years - curr_years
-        for deleted_year in deleted:
-            node = self._year_nodes.pop(deleted_year)
-            self._post_containers.remove(node)
+    def _posts_changed(self, change):
+        logger.debug(_F("Posts changed callback: {0} months, {1} keywords",
+                        len(change.months), len(change.keywords)))
+        for year, month in change.months:
+            if len(self.index.get_posts_by_month(year, month)) > 0:
+                self._autocreate_year_node(year).autocreate_month_node(month)
+                continue
+            try:
+                yearnode = self._year_nodes[year]
+            except KeyError:
+                continue
+            yearnode.drop_month_node(month)
+            if len(yearnode) == 0:
+                del self._year_nodes[year]
+                self._post_containers.remove(yearnode)
 
         try:
             callable = self._tag_dir.update_children
         except AttributeError:
             pass
         else:
-            callable()
+            callable(change.keywords)
 
     @property
     def TagDirectory(self):
@@ -0,0 +1,142 @@
+# File name: Pagination.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+from __future__ import unicode_literals, print_function, absolute_import
+
+import copy
+import urllib
+
+from PyXWF.utils import ET
+import PyXWF.Namespaces as NS
+import PyXWF.Errors as Errors
+import PyXWF.Types as Types
+
+class Paginator(object):
+    """
+    Split a listing of posts into pages of *page_size* posts each. The page
+    to show is selected using the *query_param* query parameter; the first
+    page is the one without that parameter.
+
+    If *page_size* is :data:`None`, no pagination takes place and all posts
+    are shown on a single page.
+
+    Listings are expected as oldest-first sequences supporting :func:`len`
+    and slicing (like the sorted lists maintained by
+    :class:`~PyWeblog.Index.Index`). Only the slice which is actually shown is
+    touched, so the cost of rendering a page does not depend on the amount of
+    posts in the listing.
+    """
+
+    page_size_type = Types.DefaultForNone(None,
+        Types.NumericRange(int, 1, None)
+    )
+
+    def __init__(self, page_size, query_param="page"):
+        super(Paginator, self).__init__()
+        self.page_size = page_size
+        self.query_param = query_param
+
+    def get_page_number(self, ctx):
+        """
+        Return the page number requested in *ctx*. Raise
+        :class:`~PyXWF.Errors.NotFound` if the query parameter is malformed.
+        """
+        if self.page_size is None:
+            return 1
+        try:
+            values = ctx.QueryData[self.query_param]
+        except KeyError:
+            return 1
+        try:
+            page = int(values[0])
+        except (IndexError, ValueError):
+            raise Errors.NotFound()
+        if page < 1:
+            raise Errors.NotFound()
+        return page
+
+    def get_page_count(self, total):
+        if self.page_size is None or total == 0:
+            return 1
+        return (total + self.page_size - 1) // self.page_size
+
+    def get_page(self, posts, page):
+        """
+        Return the posts on page *page* of *posts*, newest first. Raise
+        :class:`~PyXWF.Errors.NotFound` if the page does not exist.
+        """
+        total = len(posts)
+        if page > self.get_page_count(total):
+            raise Errors.NotFound()
+        if self.page_size is None:
+            return list(reversed(posts))
+        end = total - (page - 1) * self.page_size
+        start = max(0, end - self.page_size)
+        return list(reversed(posts[start:end]))
+
+    def get_page_href(self, base, page, query=()):
+        """
+        Return the link to page *page* of the listing at *base*. *query* is a
+        sequence of ``(name, value)`` pairs of further query parameters the
+        link must carry.
+        """
+        query = list(query)
+        if page != 1:
+            query.append((self.query_param, unicode(page)))
+        if not query:
+            return base
+        return "{0}?{1}".format(base, urllib.urlencode([
+            (name.encode("utf-8"), value.encode("utf-8"))
+            for name, value in query]))
+
+    def get_abstract_list(self, posts, page, page_count, base, attrib={},
+            query=()):
+        """
+        Create a ``<blog:abstract-list />`` element containing the abstracts
+        of *posts*. If pagination is enabled and *page_count* is not
+        :data:`None`, ``@page`` and ``@page-count`` attributes are set and
+        ``<blog:prev-page />`` and ``<blog:next-page />`` elements with
+        ``@href`` and ``@page`` are added where applicable. The links carry
+        the query parameters *query* (see :meth:`get_page_href`).
+        """
+        abstracts = ET.Element(getattr(NS.PyBlog, "abstract-list"),
+                               attrib=attrib)
+        if self.page_size is not None and page_count is not None:
+            abstracts.set("page", unicode(page))
+            abstracts.set("page-count", unicode(page_count))
+            if page > 1:
+                ET.SubElement(abstracts, getattr(NS.PyBlog, "prev-page"),
+                    attrib={
+                        "href": self.get_page_href(base, page-1, query),
+                        "page": unicode(page-1)
+                    })
+            if page < page_count:
+                ET.SubElement(abstracts, getattr(NS.PyBlog, "next-page"),
+                    attrib={
+                        "href": self.get_page_href(base, page+1, query),
+                        "page": unicode(page+1)
+                    })
+        for post in posts:
+            abstracts.append(copy.deepcopy(post.abstract))
+        return abstracts
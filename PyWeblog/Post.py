@@ -24,9 +24,31 @@
 ########################################################################
 from __future__ import unicode_literals
 
+import zlib
+
+from PyXWF.utils import ET
 import PyXWF.Nodes as Nodes
 import PyXWF.Navigation as Navigation
 import PyXWF.Namespaces as NS
+import PyXWF.Cache as Cache
+import PyXWF.ContentTypes as ContentTypes
+
+class RenderedPost(Cache.Cachable):
+    """
+    The output of the post template for a post, stored as compressed
+    serialized XML. It is valid as long as *version* does not change.
+    """
+
+    def __init__(self, version, tree):
+        super(RenderedPost, self).__init__()
+        self.version = version
+        self._data = zlib.compress(ET.tostring(tree, encoding="utf-8"))
+
+    def get_tree(self):
+        """
+        Return a fresh copy of the stored tree.
+        """
+        return ET.fromstring(zlib.decompress(self._data))
 
 class PostNode(Nodes.Node, Navigation.Info):
     def __init__(self, parent, post):
@@ -43,11 +65,36 @@ class PostNode(Nodes.Node, Navigation.Info):
             ctx.use_resource(self.site.template_cache[self.Blog.post_template])
         return node
 
+    def _get_version(self, template):
+        # the neighbours and related posts are part of the output, so their
+        # identity, title and (for related posts) score must be taken into
+        # account too
+        post = self.post
+        neighbours = tuple(
+            (neighbour.path, neighbour.title) if neighbour else None
+            for neighbour in [post.PrevPost, post.NextPost] +
+                             post.RelatedPosts)
+        return (post.LastModified, template.LastModified, neighbours,
+                tuple(post.RelatedPostScores))
+
     def do_GET(self, ctx):
-        return self.site.template_cache[self.Blog.post_template].transform(
-            self.post.get_PyWebXML(),
-            self.Blog.get_transform_args()
-        )
+        template = self.site.template_cache[self.Blog.post_template]
+        version = self._get_version(template)
+        cache = self.site.cache[(self.Blog, "posts")]
+        key = self.post.filename
+        entry = cache.get(key)
+        if entry is None or entry.version != version:
+            tree = template.raw_transform(
+                self.post.get_PyWebXML(),
+                self.Blog.get_transform_args()
+            )
+            entry = RenderedPost(version, tree)
+            cache.replace(key, entry)
+            root = tree.getroot()
+        else:
+            root = entry.get_tree()
+        return self.site.parser_registry[ContentTypes.PyWebXML].parse_tree(
+            root, header_offset=0)
 
     def get_navigation_info(self, ctx):
         return self
@@ -51,6 +51,16 @@ class PostDirectory(object):
         a human-readable value.
         """
 
+    @property
+    def QueryArguments(self):
+        """
+        Sequence of ``(name, value)`` pairs of the query parameters of the
+        current request which, besides the node path, select the posts
+        returned by :meth:`get_posts`. Links to the directory, e.g. those of
+        its feeds, need to carry them. By default, there are none.
+        """
+        return ()
+
 class TagDir(object):
     __metaclass__ = abc.ABCMeta
 
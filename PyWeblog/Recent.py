@@ -24,8 +24,6 @@
 ########################################################################
 from __future__ import unicode_literals, print_function, absolute_import
 
-import itertools, copy
-
 from PyXWF.utils import ET
 import PyXWF.Nodes as Nodes
 import PyXWF.Registry as Registry
@@ -36,8 +34,10 @@ import PyXWF.Navigation as Navigation
 
 import PyWeblog.Node as BlogNode
 import PyWeblog.Protocols as Protocols
+import PyWeblog.Pagination as Pagination
 
-class RecentPosts(Protocols.FeedableDirectoryMixin, Nodes.Node, Navigation.Info):
+class RecentPosts(Protocols.FeedableDirectoryMixin, Nodes.Node, Navigation.Info,
+        Protocols.PostDirectory):
     __metaclass__ = Registry.NodeMeta
 
     namespace = str(NS.PyBlog)
@@ -58,6 +58,8 @@ class RecentPosts(Protocols.FeedableDirectoryMixin, Nodes.Node, Navigation.Info)
         self._navdisplay = Navigation.DisplayMode(node.get("nav-display", "show"))
         self._list_template = Types.NotNone(node.get("list-template"))
         self._post_count = self._post_count_type(node.get("post-count"))
+        self._paginate = Types.Typecasts.bool(node.get("paginate", False))
+        self._paginator = Pagination.Paginator(self._post_count)
 
     def resolve_path(self, ctx, relpath):
         result = super(RecentPosts, self).resolve_path(ctx, relpath)
@@ -67,18 +69,22 @@ class RecentPosts(Protocols.FeedableDirectoryMixin, Nodes.Node, Navigation.Info)
         return result
 
     def do_GET(self, ctx):
-        abstracts = NS.PyBlog("abstract-list")
+        paginator = self._paginator
+        posts = self.Blog.index.get_all_posts()
+        if self._paginate:
+            page = paginator.get_page_number(ctx)
+            page_count = paginator.get_page_count(len(posts))
+        else:
+            page, page_count = 1, None
+        abstracts = paginator.get_abstract_list(
+            paginator.get_page(posts, page),
+            page,
+            page_count,
+            self.Path)
         if self.Blog.Feeds:
             feeds = self.Blog.Feeds.get_feeds_node(self)
             feeds.set("base", self.Path)
-            abstracts.append(feeds)
-        postiter = itertools.islice(
-            reversed(self.Blog.index.get_all_posts()),
-            0,
-            self._post_count
-        )
-        for post in postiter:
-            abstracts.append(copy.deepcopy(post.abstract))
+            abstracts.insert(0, feeds)
         return self.site.template_cache[self._list_template].transform(
             abstracts,
             self.Blog.get_transform_args()
@@ -0,0 +1,195 @@
+# File name: Related.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+"""
+Precomputed "related posts" for the posts of a blog
+:class:`~PyWeblog.Index.Index`. Posts are compared by the cosine similarity of
+their tf-idf weighted keyword and title term vectors. The lists are kept up to
+date incrementally from the change events of the index, so that only posts
+sharing a keyword or title term with a changed post are touched.
+
+As the idf weights of all terms shift slightly with every change, the lists
+of other posts become slightly inaccurate over time. Thus, everything is
+recomputed once the number of changes since the last full computation
+exceeds a fraction of the number of posts.
+"""
+from __future__ import unicode_literals, print_function, absolute_import
+
+import heapq
+import math
+import re
+
+_term_re = re.compile(r"\w+", re.UNICODE)
+
+class RelatedPosts(object):
+    """
+    Maintain the *count* most similar posts for each post in *index*. The
+    result is stored in the posts themselves (see
+    :attr:`PyWeblog.Index.Post.RelatedPosts`).
+
+    Keywords are weighted with *keyword_weight* and title terms with
+    *title_weight* before idf weighting. A full recomputation takes place
+    once more than *rebuild_ratio* times the number of posts have changed.
+    """
+
+    def __init__(self, index, count, keyword_weight=1.0, title_weight=0.5,
+            rebuild_ratio=0.1):
+        super(RelatedPosts, self).__init__()
+        self._index = index
+        self._count = count
+        self._keyword_weight = keyword_weight
+        self._title_weight = title_weight
+        self._rebuild_ratio = rebuild_ratio
+        self._changes = 0
+        # maps posts to their raw (not idf weighted) feature dicts
+        self._features = {}
+        # maps features to the set of posts having them
+        self._postings = {}
+        # maps posts to their weighted vectors while lists are recomputed,
+        # see _recompute_all
+        self._vectors = None
+
+    def _get_features(self, post):
+        features = {}
+        for keyword in post.keywords:
+            features["k:" + keyword] = self._keyword_weight
+        for term in _term_re.findall(post.title or ""):
+            key = "t:" + term.lower()
+            features[key] = features.get(key, 0) + self._title_weight
+        return features
+
+    def _idf(self, feature):
+        return math.log(float(len(self._features) + 1) /
+                        len(self._postings[feature]))
+
+    def _build_vector(self, post):
+        features = self._features[post]
+        vector = dict(
+            (feature, weight * self._idf(feature))
+            for feature, weight in features.iteritems())
+        norm = math.sqrt(sum(value*value for value in vector.itervalues()))
+        return vector, norm
+
+    def _get_vector(self, post):
+        vectors = self._vectors
+        if vectors is None:
+            return self._build_vector(post)
+        try:
+            return vectors[post]
+        except KeyError:
+            vector = self._build_vector(post)
+            vectors[post] = vector
+            return vector
+
+    def _similarity(self, vector, norm, other):
+        if not norm:
+            return 0.
+        other_vector, other_norm = self._get_vector(other)
+        if not other_norm:
+            return 0.
+        dot = sum(
+            value * other_vector.get(feature, 0.)
+            for feature, value in vector.iteritems())
+        return dot / (norm * other_norm)
+
+    def _add_features(self, post):
+        features = self._get_features(post)
+        self._features[post] = features
+        for feature in features:
+            self._postings.setdefault(feature, set()).add(post)
+
+    def _remove_features(self, post):
+        features = self._features.pop(post)
+        for feature in features:
+            postings = self._postings[feature]
+            postings.discard(post)
+            if not postings:
+                del self._postings[feature]
+        return features
+
+    def _get_neighbours(self, post, features):
+        neighbours = set()
+        for feature in features:
+            neighbours.update(self._postings.get(feature, ()))
+        neighbours.discard(post)
+        return neighbours
+
+    def _recompute(self, post):
+        vector, norm = self._get_vector(post)
+        scored = (
+            (self._similarity(vector, norm, other), other)
+            for other in self._get_neighbours(post, self._features[post]))
+        post._related = heapq.nlargest(self._count,
+            ((score, other) for score, other in scored if score > 0.),
+            key=lambda item: (item[0], item[1].creation_date))
+
+    def _recompute_all(self, posts):
+        # the weights do not change while the lists are recomputed, so each
+        # vector is only built once instead of once per neighbour
+        self._vectors = {}
+        try:
+            for post in posts:
+                self._recompute(post)
+        finally:
+            self._vectors = None
+
+    def rebuild(self):
+        """
+        Recompute the related posts of all posts.
+        """
+        self._features = {}
+        self._postings = {}
+        self._changes = 0
+        posts = list(self._index.get_all_posts())
+        for post in posts:
+            self._add_features(post)
+        self._recompute_all(posts)
+
+    def update(self, change):
+        """
+        Apply the :class:`~PyWeblog.Index.IndexChange` *change*.
+        """
+        changed = change.added | change.moved | change.updated
+        if self._features:
+            self._changes += len(changed) + len(change.removed)
+            if self._changes > len(self._features) * self._rebuild_ratio:
+                for post in change.removed:
+                    post._related = []
+                self.rebuild()
+                return
+
+        affected = set()
+        for post in change.removed | changed:
+            if post in self._features:
+                affected.update(self._get_neighbours(post,
+                                self._remove_features(post)))
+        for post in changed:
+            self._add_features(post)
+            affected.update(self._get_neighbours(post, self._features[post]))
+        affected -= changed
+        affected -= change.removed
+
+        for post in change.removed:
+            post._related = []
+        self._recompute_all(changed | affected)
@@ -0,0 +1,370 @@
+# File name: Search.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+"""
+Full-text search for blogs. The :class:`SearchIndex` keeps an inverted index
+over the title, description, keywords and body text of all posts of a
+:class:`~PyWeblog.Index.Index`, which is updated from the change events of the
+index and optionally persisted to disk. Queries are ranked using Okapi BM25.
+"""
+from __future__ import unicode_literals, print_function, absolute_import
+
+import copy
+import heapq
+import logging
+import math
+import os
+import re
+import tempfile
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from PyXWF.utils import ET, _F, threading
+import PyXWF.Nodes as Nodes
+import PyXWF.Registry as Registry
+import PyXWF.Namespaces as NS
+import PyXWF.Errors as Errors
+import PyXWF.Types as Types
+import PyXWF.Navigation as Navigation
+
+import PyWeblog.Node as BlogNode
+
+logger = logging.getLogger(__name__)
+
+_token_re = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text):
+    """
+    Split *text* into a list of lower-case terms.
+    """
+    if not text:
+        return []
+    return [token.lower() for token in _token_re.findall(text)]
+
+class SearchIndex(object):
+    """
+    Inverted index over the posts in the blog index *index*. If *filename*
+    is not :data:`None`, the index is loaded from and saved to that file, so
+    that only posts which changed in the meantime need to be reindexed on
+    startup.
+
+    Changes are saved in a background thread :attr:`save_delay` seconds after
+    the first unsaved change, so that requests which trigger an update of
+    the blog index do not wait for it and bursts of changes are saved at
+    once. The file is replaced atomically. Use :meth:`flush` to save pending
+    changes right away.
+
+    Terms are weighted by the field they occur in according to
+    :attr:`field_weights`.
+    """
+
+    format_version = 1
+
+    field_weights = {
+        "title": 3,
+        "keywords": 2,
+        "description": 2,
+        "body": 1
+    }
+
+    # BM25 parameters
+    k1 = 1.2
+    b = 0.75
+
+    save_delay = 5
+
+    def __init__(self, index, filename=None):
+        super(SearchIndex, self).__init__()
+        self._index = index
+        self._filename = filename
+        self._lock = threading.Lock()
+        # filename -> (last modified, document length, {term: frequency})
+        self._documents = {}
+        # term -> {filename: frequency}
+        self._postings = {}
+        self._total_length = 0
+        # serializes writes of the index file
+        self._save_lock = threading.Lock()
+        self._save_timer = None
+
+        self._load()
+        changed = self._sync()
+        index.add_change_listener(self._index_changed)
+        if changed:
+            self._save()
+
+    def _load(self):
+        if self._filename is None:
+            return
+        try:
+            with open(self._filename, "rb") as f:
+                data = pickle.load(f)
+        except IOError:
+            return
+        except Exception as err:
+            logger.warning(_F("Discarding unreadable search index {0!r}: {1}",
+                              self._filename, err))
+            return
+        if data.get("version") != self.format_version:
+            return
+        for filename, document in data["documents"].iteritems():
+            self._add_document(filename, *document)
+
+    def _save(self):
+        if self._filename is None:
+            return
+        with self._lock:
+            # the entries are replaced, not modified, on changes, so a
+            # shallow copy is a consistent snapshot
+            data = {
+                "version": self.format_version,
+                "documents": dict(self._documents)
+            }
+        with self._save_lock:
+            dirname, basename = os.path.split(os.path.abspath(self._filename))
+            try:
+                fd, tmpname = tempfile.mkstemp(prefix=basename + ".",
+                                               dir=dirname)
+            except (IOError, OSError) as err:
+                logger.warning(_F("Could not save search index to {0!r}: {1}",
+                                  self._filename, err))
+                return
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+                os.rename(tmpname, self._filename)
+            except (IOError, OSError) as err:
+                logger.warning(_F("Could not save search index to {0!r}: {1}",
+                                  self._filename, err))
+                try:
+                    os.unlink(tmpname)
+                except OSError:
+                    pass
+
+    def _schedule_save(self):
+        if self._filename is None:
+            return
+        with self._save_lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.save_delay,
+                                               self._save_scheduled)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _save_scheduled(self):
+        with self._save_lock:
+            self._save_timer = None
+        self._save()
+
+    def flush(self):
+        """
+        Save pending changes now instead of waiting for the background
+        thread.
+        """
+        with self._save_lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is not None:
+            timer.cancel()
+            self._save()
+
+    def _sync(self):
+        """
+        Bring the index up to date with the posts currently in the blog
+        index. Return whether anything changed.
+        """
+        changed = False
+        known = set(self._documents.iterkeys())
+        for post in self._index.get_all_posts():
+            known.discard(post.filename)
+            try:
+                last_modified = self._documents[post.filename][0]
+            except KeyError:
+                pass
+            else:
+                if last_modified == post.LastModified.isoformat():
+                    continue
+            self._index_post(post)
+            changed = True
+        for filename in known:
+            self._remove_document(filename)
+            changed = True
+        return changed
+
+    def _add_document(self, filename, last_modified, length, terms):
+        self._documents[filename] = (last_modified, length, terms)
+        self._total_length += length
+        for term, frequency in terms.iteritems():
+            self._postings.setdefault(term, {})[filename] = frequency
+
+    def _remove_document(self, filename):
+        try:
+            _, length, terms = self._documents.pop(filename)
+        except KeyError:
+            return
+        self._total_length -= length
+        for term in terms:
+            postings = self._postings[term]
+            del postings[filename]
+            if not postings:
+                del self._postings[term]
+
+    def _get_fields(self, post):
+        body = post.get_document().body
+        return {
+            "title": post.title,
+            "keywords": " ".join(post.keywords),
+            "description": post.description,
+            "body": " ".join(body.itertext()) if body is not None else ""
+        }
+
+    def _index_post(self, post):
+        terms = {}
+        length = 0
+        for field, text in self._get_fields(post).iteritems():
+            weight = self.field_weights[field]
+            for token in tokenize(text):
+                terms[token] = terms.get(token, 0) + weight
+                length += weight
+        self._remove_document(post.filename)
+        self._add_document(post.filename, post.LastModified.isoformat(),
+                           length, terms)
+
+    def _index_changed(self, change):
+        with self._lock:
+            for post in change.removed:
+                self._remove_document(post.filename)
+            for post in change.added | change.moved | change.updated:
+                self._index_post(post)
+        self._schedule_save()
+
+    def search(self, query, limit):
+        """
+        Return a list of up to *limit* ``(score, post)`` tuples for the posts
+        matching *query*, best match first.
+        """
+        terms = set(tokenize(query))
+        scores = {}
+        with self._lock:
+            count = len(self._documents)
+            if count == 0:
+                return []
+            avg_length = float(self._total_length) / count
+            k1, b = self.k1, self.b
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                for filename, frequency in postings.iteritems():
+                    length = self._documents[filename][1]
+                    score = idf * frequency * (k1 + 1) / (
+                        frequency + k1 * (1 - b + b * length / avg_length))
+                    scores[filename] = scores.get(filename, 0) + score
+
+        results = []
+        for filename, score in heapq.nlargest(limit, scores.iteritems(),
+                key=lambda item: item[1]):
+            post = self._index.get_post_by_filename(filename)
+            if post is not None:
+                results.append((score, post))
+        return results
+
+class SearchNode(Nodes.Node, Navigation.Info):
+    """
+    Node which answers full-text queries passed via the query parameter
+    *@query-param* (defaults to ``q``) with a ``<blog:search-results />``
+    element, which contains the abstracts of up to *@result-limit* matching
+    posts and is transformed using *@list-template*. The search index is
+    persisted to *@index-file*, if given.
+    """
+    __metaclass__ = Registry.NodeMeta
+
+    namespace = str(NS.PyBlog)
+    names = ["search"]
+
+    _result_limit_type = Types.NumericRange(int, 1, None)
+
+    def __init__(self, site, parent, node):
+        if not isinstance(parent, BlogNode.Blog):
+            raise Errors.BadParent(self, parent)
+        super(SearchNode, self).__init__(site, parent, node)
+        self.Blog = parent
+
+        self._navtitle = Types.NotNone(node.get("nav-title"))
+        self._navdisplay = Navigation.DisplayMode(node.get("nav-display", "show"))
+        self._list_template = Types.NotNone(node.get("list-template"))
+        self._result_limit = self._result_limit_type(node.get("result-limit", 20))
+        self._query_param = Types.NotEmpty(node.get("query-param", "q"))
+        self.search_index = SearchIndex(self.Blog.index, node.get("index-file"))
+
+    def resolve_path(self, ctx, relpath):
+        result = super(SearchNode, self).resolve_path(ctx, relpath)
+        if result is self:
+            ctx.use_resource(self.Blog.index)
+            ctx.use_resource(self.site.template_cache[self._list_template])
+        return result
+
+    def do_GET(self, ctx):
+        try:
+            query = ctx.QueryData[self._query_param][0]
+        except (KeyError, IndexError):
+            query = ""
+        if isinstance(query, str):
+            query = query.decode("utf-8", "replace")
+        results = self.search_index.search(query, self._result_limit)
+
+        root = ET.Element(getattr(NS.PyBlog, "search-results"), attrib={
+            "query": query,
+            "query-param": self._query_param,
+            "result-count": unicode(len(results))
+        })
+        for score, post in results:
+            abstract = copy.deepcopy(post.abstract)
+            abstract.set(NS.PyBlog.score, "{0:.4f}".format(score))
+            root.append(abstract)
+        return self.site.template_cache[self._list_template].transform(
+            root,
+            self.Blog.get_transform_args()
+        )
+
+    def get_navigation_info(self, ctx):
+        return self
+
+    def get_title(self):
+        return self._navtitle
+
+    def get_display(self):
+        return self._navdisplay
+
+    def get_representative(self):
+        return self
+
+    request_handlers = {
+        "GET": do_GET
+    }
@@ -24,9 +24,9 @@
 ########################################################################
 from __future__ import unicode_literals, print_function, division
 
-import operator, itertools
+import operator, itertools, copy
 
-from PyXWF.utils import ET
+from PyXWF.utils import ET, threading
 import PyXWF.utils as utils
 import PyXWF.Namespaces as NS
 import PyXWF.Registry as Registry
@@ -54,12 +54,15 @@ class TagCloud(Crumbs.CrumbBase):
         self.maxlevel = self._levels_type(node.get("level-count")) - 1
         self.maxtags = self._maxtags_type(node.get("max-tags"))
         self.class_prefix = self._class_prefix_type(node.get("css-class-prefix"))
+        # the cloud only depends on the keywords of the index, so it is built
+        # once per KeywordVersion of the index
+        self._cloud = None
+        self._cloud_version = None
+        self._cloud_lock = threading.Lock()
 
-    def render(self, ctx, parent):
+    def _build_cloud(self, index):
         ul = ET.Element(NS.XHTML.ul)
-        index = self.Blog.index
         tag_dir = self.Blog.TagDirectory
-        ctx.use_resource(index)
         tags = ((tag, len(posts)) for tag, posts in
                             index.get_keyword_posts())
 
@@ -81,4 +84,15 @@ class TagCloud(Crumbs.CrumbBase):
                 "href": tag_dir.get_tag_page_path(tag)
             })
             a.text = tag
-        yield ul
+        return ul
+
+    def render(self, ctx, parent):
+        index = self.Blog.index
+        ctx.use_resource(index)
+        version = index.KeywordVersion
+        with self._cloud_lock:
+            if self._cloud_version != version:
+                self._cloud = self._build_cloud(index)
+                self._cloud_version = version
+            cloud = self._cloud
+        yield copy.deepcopy(cloud)
@@ -26,7 +26,6 @@ from __future__ import unicode_literals, print_function, absolute_import
 
 import abc
 import operator
-import copy
 import os
 import logging
 
@@ -40,6 +39,8 @@ import PyXWF.Navigation as Navigation
 
 import PyWeblog.Node as BlogNode
 import PyWeblog.Protocols as Protocols
+import PyWeblog.Pagination as Pagination
+import PyWeblog.TagQuery as TagQuery
 
 logger = logging.getLogger(__name__)
 
@@ -82,13 +83,31 @@ class TagDir(Nodes.DirectoryResolutionBehaviour, Nodes.Node, Navigation.Info,
         except AttributeError:
             raise Errors.NodeConfigurationError("Tag dir requires template node (<blog:tag-page /> without name)", self)
 
+        self._enable_queries = Types.Typecasts.bool(node.get("enable-queries", True))
+        self._query_template = node.get("query-template",
+                                        self._template_node.get("list-template"))
+        self._query_title_fmt = node.get("query-title-format", "{query}")
+        self._query_paginator = Pagination.Paginator(
+            Pagination.Paginator.page_size_type(
+                self._template_node.get("page-size"))
+        )
+
         self.Blog.TagDirectory = self
 
     def _get_child(self, key):
         if key == "":
             return self
-        else:
-            return self._children.get(key, None)
+        try:
+            return self._children[key]
+        except KeyError:
+            pass
+        if self._enable_queries and TagQuery.TagQuery.is_query(key):
+            try:
+                query = TagQuery.TagQuery.parse(key)
+            except ValueError:
+                return None
+            return TagQueryPage(self, key, query)
+        return None
 
     def do_GET(self, ctx):
         tag_list = NS.PyBlog("tag-list")
@@ -122,19 +141,34 @@ class TagDir(Nodes.DirectoryResolutionBehaviour, Nodes.Node, Navigation.Info,
             ctx.use_resource(self.site.template_cache[self._list_template])
         return node
 
-    def update_children(self):
-        self._children = {}
-        self._child_list = []
-        for keyword, posts in self.index.get_keyword_posts():
+    def update_children(self, keywords=None):
+        """
+        Update the tag pages for all *keywords*. If *keywords* is
+        :data:`None`, all tag pages are rebuilt.
+        """
+        if keywords is None:
+            self._children = {}
+            keywords = [keyword for keyword, _ in self.index.get_keyword_posts()]
+        for keyword in keywords:
+            posts = self.index.get_posts_by_keyword(keyword)
+            if len(posts) == 0:
+                self._children.pop(keyword, None)
+                continue
             try:
-                page = self._fixed_children[keyword]
+                page = self._children[keyword]
             except KeyError:
-                self._template_node.set("name", keyword)
-                page = TagPage(self.site, self, self._template_node)
-            self._children[keyword] = page
-            self._child_list.append((len(posts), page))
+                try:
+                    page = self._fixed_children[keyword]
+                except KeyError:
+                    self._template_node.set("name", keyword)
+                    page = TagPage(self.site, self, self._template_node)
+                self._children[keyword] = page
             page.update_children(posts)
-        self._child_list.sort(key=lambda x: (x[0], x[1].Name))
+        self._child_list = sorted(
+            ((len(page.get_post_list()), page)
+             for page in self._children.viewvalues()),
+            key=lambda x: (x[0], x[1].Name)
+        )
         logger.debug(_F("Tag dir updated: {0} children", len(self._child_list)))
         logger.debug(_F("Tags: {0}", ", ".join(self._children.keys())))
 
@@ -167,20 +201,31 @@ class TagPage(Protocols.FeedableDirectoryMixin, Nodes.Node, Navigation.Info, Pro
         self._posts = []
         self._title = (node.get("nav-title-fmt") or parent._page_title_fmt).format(tag=self.Name)
         self._list_template = Types.NotNone(node.get("list-template"))
-        self._feeds_node = None
+        self._paginator = Pagination.Paginator(
+            Pagination.Paginator.page_size_type(node.get("page-size"))
+        )
 
     @property
     def SelectionValue(self):
         return self.Name
 
     def do_GET(self, ctx):
-        if not self._feeds_node and self.Blog.Feeds:
+        paginator = self._paginator
+        page = paginator.get_page_number(ctx)
+        abstracts = paginator.get_abstract_list(
+            paginator.get_page(self._posts, page),
+            page,
+            paginator.get_page_count(len(self._posts)),
+            self.Path,
+            attrib={
+                "tag": self.Name
+            })
+        if self.Blog.Feeds:
             feeds = self.Blog.Feeds.get_feeds_node(self)
             feeds.set("base", self.Path)
-            self.abstracts.append(feeds)
-            self._feeds_node = feeds
+            abstracts.append(feeds)
         return self.site.template_cache[self._list_template].transform(
-            self.abstracts,
+            abstracts,
             self.Blog.get_transform_args()
         )
 
@@ -203,17 +248,117 @@ class TagPage(Protocols.FeedableDirectoryMixin, Nodes.Node, Navigation.Info, Pro
         return self
 
     def get_posts(self):
+        return reversed(self._posts)
+
+    def get_post_list(self):
+        """
+        Return the list of posts with this tag, oldest first.
+        """
         return self._posts
 
     def update_children(self, posts):
-        self._posts = list(reversed(posts))
-        self.abstracts = ET.Element(getattr(NS.PyBlog, "abstract-list"), attrib={
-            "tag": self.Name
-        })
-        for post in self._posts:
-            self.abstracts.append(copy.deepcopy(post.abstract))
+        # posts is the (oldest first) list maintained by the index; we keep a
+        # reference instead of copying it or its abstracts
+        self._posts = posts
 
     request_handlers = {
         "GET": do_GET
     }
 
+
+class TagQueryPage(Protocols.FeedableDirectoryMixin, Nodes.Node, Navigation.Info,
+        Protocols.PostDirectory):
+    """
+    Transient node for a :class:`~PyWeblog.TagQuery.TagQuery` below a
+    :class:`TagDir`. These are created on demand for each request. The
+    ``since`` and ``until`` query parameters (``YYYY``, ``YYYY-MM`` or
+    ``YYYY-MM-DD``) restrict the result to a date range.
+    """
+
+    SelectionCriterion = "tags"
+
+    def __init__(self, tag_dir, key, query):
+        super(TagQueryPage, self).__init__(tag_dir.site, tag_dir, None)
+        self.Blog = tag_dir.Blog
+        self._name = key
+        self._path = tag_dir.Path + key
+        self._tag_dir = tag_dir
+        self._query = query
+        self._query_arguments = []
+        self._posts = None
+
+    @property
+    def SelectionValue(self):
+        return self._tag_dir._query_title_fmt.format(
+            query=unicode(self._query))
+
+    @property
+    def QueryArguments(self):
+        return self._query_arguments
+
+    def _apply_date_range(self, ctx):
+        query = self._query
+        for param, attr, upper in (("since", "since", False),
+                                   ("until", "until", True)):
+            try:
+                value = ctx.QueryData[param][0]
+            except (KeyError, IndexError):
+                continue
+            try:
+                setattr(query, attr, TagQuery.parse_date_bound(value, upper))
+            except ValueError:
+                raise Errors.NotFound()
+            self._query_arguments.append((param, value))
+
+    def resolve_path(self, ctx, relpath):
+        self._apply_date_range(ctx)
+        result = super(TagQueryPage, self).resolve_path(ctx, relpath)
+        if result is self:
+            ctx.use_resource(self.site.template_cache[self._tag_dir._query_template])
+        return result
+
+    def get_post_list(self):
+        if self._posts is None:
+            self._posts = self._query.evaluate(self.Blog.index)
+        return self._posts
+
+    def get_posts(self):
+        return reversed(self.get_post_list())
+
+    def do_GET(self, ctx):
+        posts = self.get_post_list()
+        paginator = self._tag_dir._query_paginator
+        page = paginator.get_page_number(ctx)
+        abstracts = paginator.get_abstract_list(
+            paginator.get_page(posts, page),
+            page,
+            paginator.get_page_count(len(posts)),
+            self.Path,
+            attrib={
+                "query": unicode(self._query)
+            },
+            query=self.QueryArguments)
+        if self.Blog.Feeds:
+            feeds = self.Blog.Feeds.get_feeds_node(self)
+            feeds.set("base", self.Path)
+            abstracts.append(feeds)
+        return self.site.template_cache[self._tag_dir._query_template].transform(
+            abstracts,
+            self.Blog.get_transform_args()
+        )
+
+    def get_navigation_info(self, ctx):
+        return self
+
+    def get_title(self):
+        return self.SelectionValue
+
+    def get_display(self):
+        return Navigation.Show
+
+    def get_representative(self):
+        return self
+
+    request_handlers = {
+        "GET": do_GET
+    }
@@ -0,0 +1,239 @@
+# File name: TagQuery.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+"""
+Boolean queries over the keyword index of a blog. A query is written as a
+single path segment: ``+`` joins keywords which must all be present, ``,``
+separates alternatives and a leading ``!`` excludes a keyword. For example,
+``python+web,rust!draft`` selects all posts tagged with both *python* and
+*web* and all posts tagged with *rust* but not with *draft*.
+
+Queries are answered by merging the sorted keyword lists of the
+:class:`~PyWeblog.Index.Index` using galloping (exponential) search, so the
+cost depends mostly on the size of the smallest list involved.
+"""
+from __future__ import unicode_literals, print_function, absolute_import
+
+from datetime import datetime, timedelta
+import heapq
+
+import PyXWF.TimeUtils as TimeUtils
+
+AND = "+"
+OR = ","
+NOT = "!"
+
+def _key(post):
+    return (post.creation_date, post.filename)
+
+def _bisect(seq, key, lo, hi):
+    """
+    Return the leftmost index in ``seq[lo:hi]`` whose post sorts at or after
+    *key*.
+    """
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _key(seq[mid]) < key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+def _gallop(seq, key, lo, hi):
+    """
+    Like :func:`_bisect`, but optimized for results close to *lo* by probing
+    exponentially growing steps first.
+    """
+    step = 1
+    probe = lo
+    while probe < hi and _key(seq[probe]) < key:
+        lo = probe + 1
+        probe += step
+        step *= 2
+    return _bisect(seq, key, lo, min(probe, hi))
+
+class _Range(object):
+    """
+    A window ``[lo, hi)`` into a sorted list of posts *seq*.
+    """
+
+    def __init__(self, seq, lo, hi):
+        self.seq = seq
+        self.lo = lo
+        self.hi = hi
+
+    def __len__(self):
+        return self.hi - self.lo
+
+    def __iter__(self):
+        seq = self.seq
+        return (seq[i] for i in xrange(self.lo, self.hi))
+
+    def contains(self, post):
+        """
+        Check whether *post* is in the window. Successive calls must pass
+        posts in ascending order, as the window is narrowed while searching.
+        """
+        key = _key(post)
+        self.lo = _gallop(self.seq, key, self.lo, self.hi)
+        return self.lo < self.hi and self.seq[self.lo] is post
+
+def intersect(ranges):
+    """
+    Yield the posts which are contained in all *ranges*, oldest first.
+    """
+    ranges = sorted(ranges, key=len)
+    driver, others = ranges[0], ranges[1:]
+    for post in driver:
+        if all(other.contains(post) for other in others):
+            yield post
+
+def difference(posts, ranges):
+    """
+    Yield the posts from the ascending iterable *posts* which are not
+    contained in any of *ranges*.
+    """
+    for post in posts:
+        if not any(other.contains(post) for other in ranges):
+            yield post
+
+def union(iterables):
+    """
+    Merge the ascending iterables of posts in *iterables*, dropping
+    duplicates.
+    """
+    prev = None
+    decorated = [((_key(post), post) for post in iterable)
+                 for iterable in iterables]
+    for key, post in heapq.merge(*decorated):
+        if post is not prev:
+            yield post
+        prev = post
+
+def parse_date_bound(value, upper=False):
+    """
+    Parse an ISO 8601 date (``YYYY``, ``YYYY-MM`` or ``YYYY-MM-DD``) into a
+    :class:`datetime.datetime`. If *upper* is true, the bound is inclusive,
+    i.e. the first instant *after* the given period is returned.
+    """
+    for fmt, step in (("%Y-%m-%d", "day"), ("%Y-%m", "month"), ("%Y", "year")):
+        try:
+            dt = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if not upper:
+            return dt
+        if step == "day":
+            return dt + timedelta(days=1)
+        elif step == "month":
+            return TimeUtils.next_month(dt)
+        else:
+            return dt.replace(year=dt.year+1)
+    raise ValueError("Not a valid date: {0!r}".format(value))
+
+class TagQuery(object):
+    """
+    A boolean keyword query. *clauses* is a sequence of ``(include,
+    exclude)`` tuples of keyword sequences; a post matches if it matches any
+    clause, that is if it has all keywords of *include* and none of
+    *exclude*. Optionally, the posts are restricted to the creation dates
+    ``[since, until)``.
+    """
+
+    def __init__(self, clauses, since=None, until=None):
+        super(TagQuery, self).__init__()
+        self.clauses = [(tuple(include), tuple(exclude))
+                        for include, exclude in clauses]
+        self.since = since
+        self.until = until
+
+    @classmethod
+    def parse(cls, spec, since=None, until=None):
+        """
+        Parse the query string *spec*. Raise :class:`ValueError` if *spec*
+        is malformed.
+        """
+        clauses = []
+        for clause in spec.split(OR):
+            include, exclude = [], []
+            for term in clause.split(AND):
+                # allow "a!b" as shorthand for "a+!b"
+                parts = term.split(NOT)
+                if parts[0]:
+                    include.append(parts[0])
+                for keyword in parts[1:]:
+                    if not keyword:
+                        raise ValueError("Empty keyword in query {0!r}".format(spec))
+                    exclude.append(keyword)
+                if not parts[0] and len(parts) == 1:
+                    raise ValueError("Empty keyword in query {0!r}".format(spec))
+            clauses.append((include, exclude))
+        return cls(clauses, since=since, until=until)
+
+    @staticmethod
+    def is_query(key):
+        """
+        Check whether the path segment *key* uses any query operators.
+        """
+        return AND in key or OR in key or NOT in key
+
+    def _get_range(self, seq):
+        lo, hi = 0, len(seq)
+        if self.since is not None:
+            lo = _bisect(seq, (self.since, ""), lo, hi)
+        if self.until is not None:
+            hi = _bisect(seq, (self.until, ""), lo, hi)
+        return _Range(seq, lo, hi)
+
+    def _evaluate_clause(self, index, include, exclude):
+        if include:
+            posts = intersect([
+                self._get_range(index.get_posts_by_keyword(keyword))
+                for keyword in include
+            ])
+        else:
+            posts = iter(self._get_range(index.get_all_posts()))
+        if exclude:
+            posts = difference(posts, [
+                self._get_range(index.get_posts_by_keyword(keyword))
+                for keyword in exclude
+            ])
+        return posts
+
+    def evaluate(self, index):
+        """
+        Return the list of posts from *index* matching the query, oldest
+        first.
+        """
+        results = [self._evaluate_clause(index, include, exclude)
+                   for include, exclude in self.clauses]
+        if len(results) == 1:
+            return list(results[0])
+        return list(union(results))
+
+    def __unicode__(self):
+        return OR.join(
+            AND.join(include) + "".join(NOT + keyword for keyword in exclude)
+            for include, exclude in self.clauses
+        )
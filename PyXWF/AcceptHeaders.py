@@ -27,6 +27,8 @@
 import functools, operator, itertools
 from fnmatch import fnmatch
 
+import PyXWF.utils as utils
+
 @functools.total_ordering
 class Preference(object):
     """
@@ -281,12 +283,58 @@ class PreferenceList(object):
     .. warning::
         If you're dealing with ``Accept-Charset`` headers, please do not
         overlook the method :meth:`~PyXWF.AcceptHeaders.CharsetPreferenceList.inject_rfc_values`.
+
+    Lists obtained from :meth:`from_header` are shared between requests and
+    thus frozen; they also remember the results of :meth:`get_candidates`.
     """
 
+    # parsed lists by (class, header value), shared by all subclasses
+    _header_cache = utils.LRUCache(512)
+    # number of get_candidates results each frozen list remembers
+    candidate_cache_size = 32
+
     def __init__(self, preference_class, **kwargs):
         super(PreferenceList, self).__init__(**kwargs)
         self.preference_class = preference_class
         self._prefs = []
+        self._candidate_cache = None
+
+    @classmethod
+    def from_header(cls, header):
+        """
+        Return a frozen instance holding the preferences from the full HTTP
+        header value *header*. Parsing results are cached, so the same
+        instance is returned for recently seen header values.
+        """
+        key = (cls, header)
+        prefs = cls._header_cache.get(key)
+        if prefs is None:
+            prefs = cls()
+            prefs._load_header(header)
+            prefs.freeze()
+            cls._header_cache[key] = prefs
+        return prefs
+
+    def _load_header(self, header):
+        self.append_header(header)
+
+    def freeze(self):
+        """
+        Make the list immutable, which enables caching of the results of
+        :meth:`get_candidates` (and thus :meth:`get_quality` and
+        :meth:`best_match`).
+        """
+        if self._candidate_cache is None:
+            self._prefs = tuple(self._prefs)
+            self._candidate_cache = utils.LRUCache(self.candidate_cache_size)
+
+    @property
+    def Frozen(self):
+        return self._candidate_cache is not None
+
+    def _require_mutable(self):
+        if self.Frozen:
+            raise TypeError("Cannot modify frozen preference list")
 
     def append_header(self, header, drop_parameters=False):
         """
@@ -294,6 +342,7 @@ class PreferenceList(object):
         header value *header* and add them to the list. *drop_parameters* is
         passed to the respective parser method.
         """
+        self._require_mutable()
         if not header:
             return
         # parse preferences
@@ -343,6 +392,23 @@ class PreferenceList(object):
             can only serve the preferences given in *own_preferences* to
             comply with RFC 2616, see :meth:`best_match`.
         """
+        if self._candidate_cache is None:
+            return self._get_candidates(own_preferences, match_wildcard,
+                include_non_matching, take_everything_on_empty)
+
+        own_preferences = tuple(own_preferences)
+        key = (own_preferences, match_wildcard, include_non_matching,
+               take_everything_on_empty)
+        candidates = self._candidate_cache.get(key)
+        if candidates is None:
+            candidates = tuple(self._get_candidates(own_preferences,
+                match_wildcard, include_non_matching, take_everything_on_empty))
+            self._candidate_cache[key] = candidates
+        # callers are allowed to modify the result
+        return list(candidates)
+
+    def _get_candidates(self, own_preferences, match_wildcard,
+            include_non_matching, take_everything_on_empty):
         if len(self) == 0:
             if take_everything_on_empty:
                 # everything is acceptable
@@ -435,6 +501,7 @@ class CharsetPreferenceList(PreferenceList):
         ``iso-8859-1;q=1.0`` preference if no ``*`` preference and no
         `iso-8859-1`` is present.
         """
+        self._require_mutable()
         if len(self) == 0:
             self._prefs.append(CharsetPreference("*", 1.0))
         else:
@@ -444,6 +511,10 @@ class CharsetPreferenceList(PreferenceList):
                 # is in the list
                 self._prefs.append(CharsetPreference("iso-8859-1", 1.0))
 
+    def _load_header(self, header):
+        super(CharsetPreferenceList, self)._load_header(header)
+        self.inject_rfc_values()
+
 class LanguagePreferenceList(PreferenceList):
     """
     Subclass of :class:`PreferenceList` for HTTP ``Accept-Language`` headers.
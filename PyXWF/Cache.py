@@ -162,6 +162,17 @@ class SubCache(object):
             cachable = self.entries[key]
             cachable.uncache()
 
+    def replace(self, key, cachable):
+        """
+        Associate *cachable* with *key*, like assigning to the key, but
+        uncache the object previously associated with *key* (if any) instead
+        of raising.
+        """
+        with self._lookuplock:
+            if key in self:
+                del self[key]
+            self[key] = cachable
+
     def __contains__(self, key):
         with self._lookuplock:
             return key in self.entries
@@ -37,6 +37,7 @@ plaintext = "text/plain"
 Atom = "application/atom+xml"
 PyWebXML = "application/x-pywebxml"
 Markdown = "text/x-markdown"
+xml = "application/xml"
 
 normalization = {
     "application/xhtml+xml": xhtml,
@@ -33,8 +33,11 @@ import logging
 import itertools
 import base64
 import urllib
+import contextlib
+import time
 
 from PyXWF.utils import _F
+import PyXWF.utils as utils
 import PyXWF.Types as Types
 import PyXWF.Errors as Errors
 import PyXWF.TimeUtils as TimeUtils
@@ -167,6 +170,21 @@ class UserData(object):
     """
     pass
 
+class UserAgentProfile(collections.namedtuple("UserAgentProfile",
+        ["name", "version", "html5", "prefixed_xhtml", "mobile",
+         "classification"])):
+    """
+    What is known about a user agent from its ``User-Agent`` header. *name*
+    and *version* are as returned by :func:`PyXWF.utils.guess_useragent`,
+    *classification* as returned by :func:`PyXWF.utils.classify_useragent`.
+    *html5*, *prefixed_xhtml* and *mobile* tell whether the user agent
+    supports HTML5 and XHTML with namespace prefixes and whether it is a
+    mobile client.
+
+    See :meth:`Context.get_useragent_profile`.
+    """
+    __slots__ = ()
+
 class Context(object):
     """
     The context of a request. It is passed around when retrieving the Document
@@ -221,6 +239,16 @@ class Context(object):
         "ie": None
     }
 
+    # seconds for which responses marked as :attr:`Immutable` may be cached
+    immutable_max_age = 31536000
+
+    # the words a capability class is made of, see CapabilityClass
+    capability_flags = frozenset(["xhtml", "html", "html5", "html4",
+                                  "prefixed", "mobile"])
+
+    # profiles of recently seen User-Agent header values by context class
+    _useragent_profiles = utils.LRUCache(1024)
+
     def __init__(self):
         # Method of the HTTP request ("GET", "POST", ...)
         self._method = None
@@ -240,6 +268,10 @@ class Context(object):
         # :meth:`_require_cookies` )
         self._cookies = None
 
+        # dict mapping lower-cased HTTP request header names to their raw
+        # values (to be filled by the web backend)
+        self._request_headers = {}
+
         # datetime object representing the value of the incoming
         # If-Modified-Since header, if any. Otherwise None
         self._if_modified_since = None
@@ -260,6 +292,8 @@ class Context(object):
         # these are backing values for the properties below. See their
         # docstrings for further information
         self._cachable = True
+        self._immutable = False
+        self._cache_policy = None
         self._pagenode = None
         self._used_resources = set()
         self._last_modified = None
@@ -269,13 +303,33 @@ class Context(object):
         self._prefixed_xhtml_support = False
         self._useragent_name = None
         self._useragent_version = None
+        self._useragent_profile = None
         self._is_mobile_client = False
+        self._capability_header = None
+        self._capability_class_given = False
         self._response_headers = {}
         self._vary = set(["host"])
         self._response_cookies = []
 
         self.userdata = UserData()
 
+        # seconds spent in the phases of handling the request, see timed()
+        self.timings = {}
+
+    @contextlib.contextmanager
+    def timed(self, phase):
+        """
+        Context manager which adds the time spent in the with-block to the
+        entry for *phase* in :attr:`timings`. Web backends use this to make
+        the work done on a request (like parsing headers) measurable.
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.timings[phase] = self.timings.get(phase, 0.) + \
+                time.time() - start
+
     @abc.abstractmethod
     def _require_query(self):
         """
@@ -315,25 +369,47 @@ class Context(object):
 
     def _set_cache_status(self, no_last_modified=False):
         """
-        Use the values of :attr:`Cachable` and :attr:`LastModified` to set up
-        the response headers which relate to caching. This may change the value
-        of the ``Last-Modified`` header and will add a cache control token.
+        Use the values of :attr:`Cachable`, :attr:`Immutable`,
+        :attr:`CachePolicy` and :attr:`LastModified` to set up the response
+        headers which relate to caching. This may change the value of the
+        ``Last-Modified`` header and will add cache control tokens to those
+        added with :meth:`add_cache_control`. If ``private`` has been added
+        that way, the ``public`` and ``s-maxage`` tokens are left out.
+
+        Cachable responses without a defined policy (see
+        :meth:`~PyXWF.HTTPUtils.CachePolicy.is_defined`) get tokens only if
+        they have a Last-Modified value, so that they can be revalidated.
 
         If *no_last_modified* is True (default is False), the Last-Modified
         header will not be set. This is required per RFC 2616 for 304 Not
         Modified responses.
         """
-        self._cache_control = set()
         if self.Cachable:
             last_modified = self.LastModified
-            if last_modified is not None:
-                self.add_cache_control("must-revalidate")
-                # let's see whether that finally forces firefox to fix our
-                # reload issues.
-                self.add_cache_control("max-age=0")
-                if not no_last_modified:
-                    self.set_response_header("Last-Modified",
-                        HTTPUtils.format_http_date(last_modified))
+            if self.Immutable:
+                tokens = ["public",
+                          "max-age={0:d}".format(self.immutable_max_age),
+                          "immutable"]
+            else:
+                policy = self.CachePolicy
+                if policy is not None and policy.is_defined():
+                    tokens = policy.get_tokens()
+                elif last_modified is not None:
+                    # the default policy: revalidate every time. let's see
+                    # whether that finally forces firefox to fix our reload
+                    # issues.
+                    tokens = HTTPUtils.CachePolicy().get_tokens()
+                else:
+                    tokens = []
+            if "private" in self._cache_control:
+                tokens = [token for token in tokens
+                          if token != "public" and
+                             not token.startswith("s-maxage=")]
+            for token in tokens:
+                self.add_cache_control(token)
+            if last_modified is not None and not no_last_modified:
+                self.set_response_header("Last-Modified",
+                    HTTPUtils.format_http_date(last_modified))
         else:
             self.add_cache_control("no-cache")
 
@@ -400,25 +476,26 @@ class Context(object):
                                     self._response_cookies))
             self._response_headers[b"set-cookie"] = cookie_list
 
+        if self._capability_header is not None:
+            self.set_response_header(self._capability_header,
+                                     self.CapabilityClass)
+
     def parse_accept(self, header_value):
         """
         Parse *header_value* as value of an HTTP ``Accept`` header and return the
         resulting :class:`~PyXWF.AcceptHeaders.AcceptPreferenceList` instance.
+        The result is shared between requests and must not be modified.
         """
-        prefs = AcceptHeaders.AcceptPreferenceList()
-        prefs.append_header(header_value)
-        return prefs
+        return AcceptHeaders.AcceptPreferenceList.from_header(header_value)
 
     def parse_accept_charset(self, header_value):
         """
         Parse *header_value* as value of an HTTP ``Accept-Charset`` header and
         return the resulting :class:`~PyXWF.AcceptHeaders.CharsetPreferenceList`
-        instance.
+        instance. The result is shared between requests and must not be
+        modified.
         """
-        prefs = AcceptHeaders.CharsetPreferenceList()
-        prefs.append_header(header_value)
-        prefs.inject_rfc_values()
-        return prefs
+        return AcceptHeaders.CharsetPreferenceList.from_header(header_value)
 
     def get_encoded_body(self, message):
         """
@@ -431,8 +508,13 @@ class Context(object):
         best match, giving priority to the clients wishes.
 
         If no matching encoding can be found,
-        :class:`~PyXWF.Errors.NotAcceptable` is raised.
+        :class:`~PyXWF.Errors.NotAcceptable` is raised. The bodies of
+        :attr:`~PyXWF.Message.Message.binary` messages are returned as they
+        are.
         """
+        if message.binary:
+            return message.get_encoded_body()
+
         candidates = self._accept_charset.get_candidates(
             self.charset_preferences,
             match_wildcard=True,
@@ -452,6 +534,88 @@ class Context(object):
             logging.debug("Accept-Charset: {0}".format(", ".join(map(str, self._accept_charset))))
             raise Errors.NotAcceptable()
 
+    @classmethod
+    def get_useragent_profile(cls, header):
+        """
+        Return the :class:`UserAgentProfile` for the ``User-Agent`` header
+        value *header*. Profiles of recently seen values are cached, as
+        guessing the user agent is comparatively expensive.
+        """
+        key = (cls, header)
+        profile = cls._useragent_profiles.get(key)
+        if profile is None:
+            name, version = utils.guess_useragent(header)
+            profile = UserAgentProfile(
+                name,
+                version,
+                cls.useragent_supports_html5(name, version),
+                cls.useragent_supports_prefixed_xhtml(name, version),
+                utils.is_mobile_useragent(header),
+                utils.classify_useragent(name))
+            cls._useragent_profiles[key] = profile
+        return profile
+
+    def set_useragent_profile(self, profile):
+        """
+        Set up everything which depends on the user agent from the
+        :class:`UserAgentProfile` *profile*. Web backends call this with the
+        result of :meth:`get_useragent_profile`.
+        """
+        self._useragent_profile = profile
+        self._useragent_name = profile.name
+        self._useragent_version = profile.version
+        self._html5_support = profile.html5
+        self._prefixed_xhtml_support = profile.prefixed_xhtml
+        self._is_mobile_client = profile.mobile
+
+    def use_capability_class(self, header):
+        """
+        Let all properties which depend on the client's capabilities
+        (:attr:`CanUseXHTML`, :attr:`HTML5Support`,
+        :attr:`PrefixedXHTMLSupport` and :attr:`IsMobileClient`) add the
+        request header *header* to the Vary header instead of ``User-Agent``
+        and ``Accept``, if the client (usually a caching proxy in front of the
+        site) sent it. Shared caches then only keep one variant per
+        capability class.
+
+        The value of the header must be the capability class which is
+        detected from the other headers (see :attr:`CapabilityClass`) anyway.
+        Any client can send the header, and a variant it chose would be
+        served to everyone sharing the claimed class, so other values are not
+        trusted.
+
+        The capability class is also sent in the response header *header*,
+        so that proxies can learn which class a user agent falls in.
+
+        Return whether the request carried the matching capability class. If
+        it did not, the properties add ``User-Agent`` and ``Accept`` to the
+        Vary header as usual.
+        """
+        header = header.lower()
+        self._capability_header = header
+        value = self.get_request_header(header)
+        self._capability_class_given = value is not None and \
+            self._apply_capability_class(value)
+        return self._capability_class_given
+
+    def _apply_capability_class(self, value):
+        flags = set(value.strip().lower().split("-"))
+        if not flags or not flags <= self.capability_flags:
+            logging.debug(_F("Ignoring invalid capability class: {0}", value))
+            return False
+        if flags != set(self.CapabilityClass.split("-")):
+            logging.debug(_F(
+                "Ignoring capability class {0} which does not match {1}",
+                value, self.CapabilityClass))
+            return False
+        return True
+
+    def _add_capability_vary(self, header):
+        if self._capability_class_given:
+            self.add_vary(self._capability_header)
+        else:
+            self.add_vary(header)
+
     def useragent_support(self, useragent, version):
         """
         Set the attributes backing :prop:`HTML5Support` and
@@ -593,6 +757,48 @@ class Context(object):
     def Cachable(self, value):
         self._cachable = Types.Typecasts.bool(value)
 
+    @property
+    def Immutable(self):
+        """
+        Set whether the response will never change at the requested URL, e.g.
+        because the URL contains a fingerprint of the contents. Cachable
+        immutable responses may be kept by clients and proxies for a year
+        without revalidation.
+        """
+        return self._immutable
+
+    @Immutable.setter
+    def Immutable(self, value):
+        self._immutable = Types.Typecasts.bool(value)
+
+    @property
+    def CachePolicy(self):
+        """
+        The :class:`~PyXWF.HTTPUtils.CachePolicy` for the response if it is
+        cachable and not :attr:`Immutable`. Unless it is set explicitly, this
+        is the policy of the :attr:`PageNode` or :data:`None` if there is no
+        page node.
+        """
+        if self._cache_policy is None and self._pagenode is not None:
+            return self._pagenode.CachePolicy
+        return self._cache_policy
+
+    @CachePolicy.setter
+    def CachePolicy(self, value):
+        self._cache_policy = value
+
+    def get_request_header(self, header, default=None):
+        """
+        Return the raw value of the HTTP request header *header* (which is
+        matched case-insensitively) or *default* if the client did not send
+        it.
+
+        This does not add *header* to the Vary header, so callers which base
+        the response on the value must do that themselves (see
+        :meth:`add_vary`).
+        """
+        return self._request_headers.get(header.lower(), default)
+
     @property
     def IfModifiedSince(self):
         """
@@ -632,7 +838,7 @@ class Context(object):
         If this is False, the application handling the request represented by
         this Context, must not send XHTML responses.
         """
-        self.add_vary("Accept")
+        self._add_capability_vary("Accept")
         return self._can_use_xhtml
 
     @property
@@ -656,7 +862,7 @@ class Context(object):
         This is for example useful to decide about mobile-suited responses
         depending on the host name used in the request.
         """
-        self.add_vary("User-Agent")
+        self._add_capability_vary("User-Agent")
         return self._is_mobile_client
 
     @IsMobileClient.setter
@@ -669,18 +875,56 @@ class Context(object):
         Return whether the User-Agent is supposed to support HTML5. This is
         used by the site to determine whether to apply a to-html4 backtransform.
         """
-        self.add_vary("User-Agent")
+        self._add_capability_vary("User-Agent")
         return self._html5_support
 
+    @property
+    def UserAgentProfile(self):
+        """
+        The :class:`UserAgentProfile` of the requesting user agent, or
+        :data:`None` if it did not send a ``User-Agent`` header.
+        """
+        self.add_vary("User-Agent")
+        return self._useragent_profile
+
     @property
     def PrefixedXHTMLSupport(self):
         """
         Return whether the User-Agent is positively known to support XHTML with
         namespace prefixes.
         """
-        self.add_vary("User-Agent")
+        self._add_capability_vary("User-Agent")
         return self._prefixed_xhtml_support
 
+    @property
+    def CapabilityClass(self):
+        """
+        A short string describing the client capabilities which influence the
+        response, like ``xhtml-html5-mobile``. It consists of ``xhtml`` or
+        ``html``, ``html5`` or ``html4`` and optionally ``prefixed`` (for
+        :attr:`PrefixedXHTMLSupport`) and ``mobile``, joined by ``-``.
+
+        There are only a handful of distinct values, so they are well suited as
+        cache keys, see :meth:`use_capability_class`.
+        """
+        flags = [
+            "xhtml" if self._can_use_xhtml else "html",
+            "html5" if self._html5_support else "html4"
+        ]
+        if self._prefixed_xhtml_support:
+            flags.append("prefixed")
+        if self._is_mobile_client:
+            flags.append("mobile")
+        return "-".join(flags)
+
+    @property
+    def Vary(self):
+        """
+        The lower-cased names of the request headers the response depends on,
+        see :meth:`add_vary`.
+        """
+        return frozenset(self._vary)
+
     @property
     def CacheControl(self):
         """
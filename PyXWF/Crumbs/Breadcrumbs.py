@@ -57,7 +57,9 @@ class Breadcrumbs(Crumbs.CrumbBase):
         had_nodes = set()
         pagenode = ctx.PageNode
         for node in pagenode.iter_upwards():
-            if node is self.root:
+            # the root may still be a LazyNode proxy, which compares equal
+            # to the actual node
+            if node == self.root:
                 break
             nav_info = node.get_navigation_info(ctx)
             display = nav_info.get_display()
@@ -205,9 +205,34 @@ class FileDocument(DocumentResource):
             if mimetype is None:
                 raise Errors.UnknownMIMEType(filename)
         self._kwargs = kwargs
+        self._mimetype = mimetype
         self._parser = site.parser_registry[mimetype]
         self._reload()
 
+    @classmethod
+    def from_document(cls, site, filename, mimetype, last_modified, doc,
+            **kwargs):
+        """
+        Create a :class:`FileDocument` for *filename* holding the already
+        parsed *doc*, which has been loaded from the file as it was at
+        *last_modified*. This is used to restore documents from a
+        :mod:`~PyXWF.Snapshot` and to carry them over to a new
+        :class:`~PyXWF.Site.Site` generation.
+        """
+        self = cls.__new__(cls)
+        super(FileDocument, self).__init__()
+        self._last_modified = last_modified
+        self._filename = filename
+        self._kwargs = kwargs
+        self._mimetype = mimetype
+        self._parser = site.parser_registry[mimetype]
+        self.doc = doc
+        return self
+
+    @property
+    def MIMEType(self):
+        return self._mimetype
+
     def _reload(self):
         self.doc = self._parser.parse(self._filename, **self._kwargs)
 
@@ -35,6 +35,7 @@ __all__ = [
     "HTTP204", "NoContent",
     "HTTP205", "ResetContent",
     "HTTP206", "PartialContent",
+    "HTTP226", "IMUsed",
 
     "HTTPRedirection",
     "HTTP300", "MultipleChoices",
@@ -134,6 +135,10 @@ class HTTP206(HTTPSuccessful):
     code = 206
     title = "Partial Content"
 
+class HTTP226(HTTPSuccessful):
+    code = 226
+    title = "IM Used"
+
 class HTTPRedirection(HTTPStatusBase):
     def __init__(self, location=None, local=True, **kwargs):
         super(HTTPRedirection, self).__init__(**kwargs)
@@ -289,6 +294,7 @@ NonAuthorativeInformation = HTTP203
 NoContent = HTTP204
 ResetContent = HTTP205
 PartialContent = HTTP206
+IMUsed = HTTP226
 MultipleChoices = HTTP300
 MovedPermanently = HTTP301
 Found = HTTP302
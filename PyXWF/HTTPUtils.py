@@ -48,3 +48,101 @@ def format_http_date(datetime):
         This uses :func:`wsgiref.handlers.format_date_time`.
     """
     return format_date_time(TimeUtils.to_timestamp(datetime))
+
+_entity_tag_re = re.compile(r'(?:W/)?"([^"]*)"')
+
+def parse_entity_tags(value):
+    """
+    Parse the string *value* as the value of an ``If-Match`` or
+    ``If-None-Match`` header according to RFC 2616 and return the list of
+    opaque tags (without quotes and weakness indicator). The wildcard ``*``
+    is returned as a list containing only ``"*"``.
+    """
+    if value.strip() == "*":
+        return ["*"]
+    return _entity_tag_re.findall(value)
+
+def format_entity_tag(opaque_tag, weak=False):
+    """
+    Return the entity tag *opaque_tag* quoted for use in an ``ETag`` header.
+    If *weak* is True, the weakness indicator is prepended.
+    """
+    return '{0}"{1}"'.format("W/" if weak else "", opaque_tag)
+
+class CachePolicy(object):
+    """
+    The ``Cache-Control`` settings for cachable responses. *max_age*,
+    *s_maxage*, *stale_while_revalidate* and *stale_if_error* are numbers of
+    seconds, *scope* is either ``"public"`` or ``"private"``. Settings which
+    are :data:`None` are not defined by the policy and can be taken from
+    another policy using :meth:`inherit`.
+    """
+
+    __slots__ = ("max_age", "s_maxage", "stale_while_revalidate",
+                 "stale_if_error", "scope")
+
+    def __init__(self, max_age=None, s_maxage=None,
+            stale_while_revalidate=None, stale_if_error=None, scope=None):
+        super(CachePolicy, self).__init__()
+        self.max_age = max_age
+        self.s_maxage = s_maxage
+        self.stale_while_revalidate = stale_while_revalidate
+        self.stale_if_error = stale_if_error
+        self.scope = scope
+
+    def inherit(self, parent):
+        """
+        Return a policy with the settings of this policy, where those which
+        are not defined are taken from the policy *parent*.
+        """
+        return CachePolicy(*(
+            getattr(parent, name) if getattr(self, name) is None
+            else getattr(self, name)
+            for name in self.__slots__))
+
+    def is_defined(self):
+        """
+        Return whether any setting is defined by this policy.
+        """
+        return any(getattr(self, name) is not None for name in self.__slots__)
+
+    def get_tokens(self):
+        """
+        Return the list of ``Cache-Control`` tokens for this policy. If
+        *max_age* is not defined, it is 0; clients then have to revalidate on
+        every request, which they must not skip even if the origin is not
+        reachable unless one of the ``stale-*`` settings is defined.
+        """
+        tokens = []
+        if self.scope is not None:
+            tokens.append(self.scope)
+        if self.stale_while_revalidate is None and \
+                self.stale_if_error is None and not self.max_age:
+            tokens.append("must-revalidate")
+        tokens.append("max-age={0:d}".format(self.max_age or 0))
+        if self.s_maxage is not None and self.scope != "private":
+            tokens.append("s-maxage={0:d}".format(self.s_maxage))
+        if self.stale_while_revalidate is not None:
+            tokens.append("stale-while-revalidate={0:d}".format(
+                self.stale_while_revalidate))
+        if self.stale_if_error is not None:
+            tokens.append("stale-if-error={0:d}".format(self.stale_if_error))
+        return tokens
+
+    def __eq__(self, other):
+        if not isinstance(other, CachePolicy):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name)
+                   for name in self.__slots__)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __repr__(self):
+        return "CachePolicy({0})".format(", ".join(
+            "{0}={1!r}".format(name, getattr(self, name))
+            for name in self.__slots__
+            if getattr(self, name) is not None))
@@ -31,9 +31,9 @@ the payload to a properly encoded bytes object for conversion in a MessageInfo
 instance.
 """
 
-import abc, copy
+import abc, copy, os
 
-from PyXWF.utils import ET
+from PyXWF.utils import ET, threading
 import PyXWF.utils as utils
 import PyXWF.Namespaces as NS
 import PyXWF.ContentTypes as ContentTypes
@@ -48,9 +48,14 @@ class Message(object):
     properties and methods are set up properly.
 
     *mimetype* is the MIME type according to RFC 2046.
+
+    Messages whose body is binary data, which is sent as-is regardless of the
+    charsets the client accepts, set :attr:`binary` to :data:`True`.
     """
     __metaclass__ = abc.ABCMeta
 
+    binary = False
+
     def __init__(self, mimetype, status=Errors.OK, encoding=None):
         super(Message, self).__init__()
         self._mimetype = mimetype
@@ -300,3 +305,137 @@ class EmptyMessage(Message):
 
     def get_encoded_body(self):
         return None
+
+
+class FileMessage(Message):
+    """
+    Represent the contents of the file *filename* as binary message of the
+    MIME type *mimetype*. Only *length* bytes (the rest of the file if
+    :data:`None`) starting at *offset* are sent. *size* is the size of the
+    whole file; it is determined from the file system if not given. If *data*
+    is given, it must be exactly the bytes to send, which then need not be
+    read again; *filename* may be :data:`None` in that case.
+
+    Web backends can pass the file to the web server (e.g. using
+    ``wsgi.file_wrapper``) instead of calling :meth:`get_encoded_body`.
+    """
+
+    binary = True
+
+    # size of the chunks the file is read in
+    block_size = 65536
+
+    def __init__(self, filename, mimetype, offset=0, length=None, size=None,
+            data=None, **kwargs):
+        super(FileMessage, self).__init__(mimetype, **kwargs)
+        if size is None:
+            size = os.stat(filename).st_size
+        if length is None:
+            length = size - offset
+        self.filename = filename
+        self.offset = offset
+        self.length = length
+        self.size = size
+        self.data = data
+
+    @property
+    def Complete(self):
+        """
+        Whether the message consists of the whole file.
+        """
+        return self.offset == 0 and self.length == self.size
+
+    def open(self):
+        """
+        Open the file and return the file object, positioned at
+        :attr:`offset`.
+        """
+        f = open(self.filename, "rb")
+        if self.offset:
+            f.seek(self.offset)
+        return f
+
+    def iter_blocks(self, f=None):
+        """
+        Yield the contents of the message in chunks of :attr:`block_size`
+        bytes, reading them from the file object *f* (which must be positioned
+        at :attr:`offset`) or from a newly opened file. The file is closed
+        afterwards.
+        """
+        if self.data is not None:
+            yield self.data
+            return
+        if f is None:
+            f = self.open()
+        try:
+            remaining = self.length
+            while remaining > 0:
+                block = f.read(min(remaining, self.block_size))
+                if not block:
+                    break
+                remaining -= len(block)
+                yield block
+        finally:
+            f.close()
+
+    def get_encoded_body(self):
+        if self.data is not None:
+            return self.data
+        return b"".join(self.iter_blocks())
+
+
+class EncodedBodyCache(object):
+    """
+    Keep the encoded bodies of the :class:`Message` *message* for each
+    encoding it has been requested in. This allows to serve the same message
+    many times (e.g. from a cache) without serializing it again. Use
+    :meth:`get_message` to obtain a lightweight message for one response.
+    """
+
+    def __init__(self, message):
+        super(EncodedBodyCache, self).__init__()
+        self._message = message
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    @property
+    def MIMEType(self):
+        return self._message.MIMEType
+
+    def get_encoded_body(self, encoding):
+        """
+        Return the body of the message encoded with *encoding*. This raises
+        the same exceptions as the wrapped messages
+        :meth:`Message.get_encoded_body`.
+        """
+        try:
+            return self._bodies[encoding]
+        except KeyError:
+            pass
+        with self._lock:
+            self._message.Encoding = encoding
+            body = self._message.get_encoded_body()
+            self._bodies[encoding] = body
+        return body
+
+    def get_message(self, **kwargs):
+        """
+        Return a :class:`CachedMessage` serving the body from this cache.
+        Keyword arguments are passed to the :class:`CachedMessage`
+        constructor.
+        """
+        return CachedMessage(self, **kwargs)
+
+
+class CachedMessage(Message):
+    """
+    Represent a message whose body is taken from the
+    :class:`EncodedBodyCache` *body_cache*.
+    """
+
+    def __init__(self, body_cache, **kwargs):
+        super(CachedMessage, self).__init__(body_cache.MIMEType, **kwargs)
+        self._body_cache = body_cache
+
+    def get_encoded_body(self):
+        return self._body_cache.get_encoded_body(self.Encoding or "utf-8")
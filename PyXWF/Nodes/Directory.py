@@ -33,6 +33,7 @@ import PyXWF.Nodes as Nodes
 import PyXWF.Navigation as Navigation
 
 class DirectoryBase(Nodes.DirectoryResolutionBehaviour, Nodes.Node):
+    reuse_children = True
 
     class Info(Navigation.Info):
         def __init__(self, ctx, directory):
@@ -90,6 +91,9 @@ class DirectoryBase(Nodes.DirectoryResolutionBehaviour, Nodes.Node):
     def __iter__(self):
         return iter(self.children)
 
+    def iter_children(self):
+        return iter(self.children)
+
     def __len__(self):
         return len(self.children)
 
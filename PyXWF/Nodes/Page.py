@@ -78,6 +78,10 @@ class Page(Nodes.Node, Navigation.Info, Resource.Resource):
         ctx.use_resource(self)
         return super(Page, self).resolve_path(ctx, relpath)
 
+    def iter_sitemap_urls(self, ctx):
+        ctx.use_resource(self)
+        return iter([(self.Path, self.LastModified)])
+
     def get_title(self):
         return self.title
 
@@ -71,6 +71,10 @@ class RedirectBase(Nodes.Node):
     def Cachable(self):
         return self.cachable
 
+    def iter_sitemap_urls(self, ctx):
+        # redirects must not be announced to search engines
+        return iter(())
+
     request_handlers = redirect
 
 class RedirectInternal(RedirectBase):
@@ -0,0 +1,279 @@
+# File name: Sitemap.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+"""
+Provide a ``sitemap.xml`` according to the protocol documented at
+<http://www.sitemaps.org/protocol.html>. The urls are collected by walking the
+node tree (see :meth:`PyXWF.Nodes.Node.iter_sitemap_urls`), which also allows
+nodes like the blog to announce their dynamic contents.
+
+If there are more urls than allowed in one sitemap, a sitemap index is
+served instead, referring to the parts of the sitemap via a query parameter.
+"""
+
+from __future__ import unicode_literals
+
+from io import BytesIO
+import urllib
+
+from PyXWF.utils import ET
+import PyXWF.Errors as Errors
+import PyXWF.Types as Types
+import PyXWF.Nodes as Nodes
+import PyXWF.Registry as Registry
+import PyXWF.Navigation as Navigation
+import PyXWF.Namespaces as NS
+import PyXWF.Cache as Cache
+import PyXWF.Message as Message
+import PyXWF.ContentTypes as ContentTypes
+
+class SitemapNS(object):
+    __metaclass__ = NS.__metaclass__
+    xmlns = "http://pyxwf.zombofant.net/xmlns/nodes/sitemap"
+
+class SitemapsOrg(object):
+    __metaclass__ = NS.__metaclass__
+    xmlns = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+class SitemapMessage(Message.Message):
+    """
+    An XML message whose body has already been serialized as UTF-8 by
+    :func:`write_urlset` or :func:`write_index`.
+    """
+
+    def __init__(self, body, **kwargs):
+        super(SitemapMessage, self).__init__(ContentTypes.xml, **kwargs)
+        self._body = body
+
+    def get_encoded_body(self):
+        encoding = self.Encoding or "utf-8"
+        if encoding.lower() in ("utf-8", "utf8"):
+            return self._body
+        # this should hardly ever happen, as virtually every client accepts
+        # utf-8
+        return ET.tostring(ET.fromstring(self._body),
+            encoding=encoding,
+            xml_declaration=True)
+
+class CachedSitemap(Cache.Cachable):
+    """
+    The urls of a sitemap along with the resources they have been derived
+    from. Serialized parts are kept in :attr:`parts`.
+    """
+
+    def __init__(self, version, resources, urls):
+        super(CachedSitemap, self).__init__()
+        self.version = version
+        self.resources = resources
+        self.urls = urls
+        self.parts = {}
+
+class ResourceCollector(object):
+    """
+    Stand-in for a :class:`~PyXWF.Context.Context` while walking the tree.
+    It collects the resources passed to :meth:`use_resource`.
+    """
+
+    def __init__(self):
+        self.resources = set()
+
+    def use_resource(self, resource):
+        if resource in self.resources:
+            return
+        self.resources.add(resource)
+        resource.threadsafe_update()
+
+def format_lastmod(last_modified):
+    return last_modified.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _write_entries(tag, entry_tag, entries):
+    buf = BytesIO()
+    with ET.xmlfile(buf, encoding="utf-8") as xf:
+        xf.write_declaration()
+        with xf.element(tag, nsmap={None: str(SitemapsOrg)}):
+            for loc, last_modified in entries:
+                with xf.element(entry_tag):
+                    with xf.element(SitemapsOrg.loc):
+                        xf.write(loc)
+                    if last_modified is not None:
+                        with xf.element(SitemapsOrg.lastmod):
+                            xf.write(format_lastmod(last_modified))
+    return buf.getvalue()
+
+def write_urlset(entries):
+    """
+    Serialize the iterable of ``(loc, last_modified)`` tuples *entries* as
+    ``urlset`` and return the UTF-8 encoded result.
+    """
+    return _write_entries(SitemapsOrg.urlset, SitemapsOrg.url, entries)
+
+def write_index(entries):
+    """
+    Serialize the iterable of ``(loc, last_modified)`` tuples *entries*
+    (which must point to sitemaps) as ``sitemapindex`` and return the UTF-8
+    encoded result.
+    """
+    return _write_entries(SitemapsOrg.sitemapindex, SitemapsOrg.sitemap,
+                          entries)
+
+class Sitemap(Nodes.Node, Navigation.Info):
+    """
+    Serve a sitemap of the tree below the node with the id given in ``@root``
+    (defaults to the whole tree). ``@max-urls`` sets how many urls one sitemap
+    may contain (at most 50000, which is also the default) and ``@query-param``
+    the name of the query parameter used to select the parts.
+
+    The sitemap is cached until one of the resources used to collect the urls
+    changes.
+    """
+    __metaclass__ = Registry.NodeMeta
+
+    namespace = str(SitemapNS)
+    names = ["node"]
+
+    max_urls_limit = 50000
+
+    def __init__(self, site, parent, node):
+        super(Sitemap, self).__init__(site, parent, node)
+        self._root_id = node.get("root")
+        self._max_urls = Types.NumericRange(int, 1, self.max_urls_limit)(
+            node.get("max-urls", self.max_urls_limit))
+        self._query_param = node.get("query-param", "part")
+        self._navtitle = node.get("nav-title", "Sitemap")
+        self._navdisplay = Navigation.DisplayMode(
+            node.get("nav-display", "never-show"))
+        self._cache = site.cache[(self, "sitemap")]
+
+    def _get_root(self):
+        if self._root_id is None:
+            return self.site.tree
+        return self.site.get_node(self._root_id)
+
+    def _get_version(self, resources):
+        # a Version counter (like the one of the blog index) may change
+        # without the timestamp of last modification changing, e.g. when an
+        # older entry is removed
+        return tuple(
+            (resource.LastModified, getattr(resource, "Version", None))
+            for resource in resources)
+
+    def _collect(self, ctx):
+        collector = ResourceCollector()
+        urls = [
+            (self._get_loc(ctx, path), last_modified)
+            for path, last_modified
+            in self._get_root().iter_sitemap_urls(collector)
+        ]
+        resources = list(collector.resources)
+        return CachedSitemap(self._get_version(resources), resources, urls)
+
+    def _get_loc(self, ctx, path):
+        return self.site.transform_relative_uri(ctx,
+            urllib.quote(path.encode("utf-8")).decode("ascii"),
+            make_global=True)
+
+    def _get_entry(self, ctx):
+        key = (ctx.URLScheme, ctx.HostName)
+        entry = self._cache.get(key)
+        if entry is not None:
+            ctx.use_resources(entry.resources)
+            if entry.version == self._get_version(entry.resources):
+                return entry
+        entry = self._collect(ctx)
+        ctx.use_resources(entry.resources)
+        self._cache.replace(key, entry)
+        return entry
+
+    def _get_part_number(self, ctx, part_count):
+        try:
+            value = ctx.QueryData[self._query_param]
+        except KeyError:
+            return None
+        try:
+            part = int(value[0] if isinstance(value, list) else value)
+        except ValueError:
+            raise Errors.NotFound()
+        if not 1 <= part <= part_count:
+            raise Errors.NotFound()
+        return part
+
+    def _render_index(self, ctx, entry, part_count):
+        base = self._get_loc(ctx, self.Path)
+        entries = []
+        for part in xrange(1, part_count+1):
+            urls = entry.urls[(part-1)*self._max_urls:part*self._max_urls]
+            last_modified = max([
+                last_modified
+                for _, last_modified in urls
+                if last_modified is not None] or [None])
+            entries.append((
+                "{0}?{1}={2}".format(base, self._query_param, part),
+                last_modified
+            ))
+        return write_index(entries)
+
+    def resolve_path(self, ctx, relpath):
+        node = super(Sitemap, self).resolve_path(ctx, relpath)
+        self._get_entry(ctx)
+        return node
+
+    def do_GET(self, ctx):
+        entry = self._get_entry(ctx)
+        part_count = max(1,
+            (len(entry.urls) + self._max_urls - 1) // self._max_urls)
+        part = self._get_part_number(ctx, part_count)
+        if part is None and part_count == 1:
+            part = 1
+        try:
+            body = entry.parts[part]
+        except KeyError:
+            if part is None:
+                body = self._render_index(ctx, entry, part_count)
+            else:
+                start = (part-1) * self._max_urls
+                body = write_urlset(entry.urls[start:start+self._max_urls])
+            entry.parts[part] = body
+        return SitemapMessage(body)
+
+    def get_content_type(self, ctx):
+        return ContentTypes.xml
+
+    def iter_sitemap_urls(self, ctx):
+        return iter(())
+
+    def get_navigation_info(self, ctx):
+        return self
+
+    def get_title(self):
+        return self._navtitle
+
+    def get_display(self):
+        return self._navdisplay
+
+    def get_representative(self):
+        return self
+
+    request_handlers = {
+        "GET": do_GET
+    }
@@ -0,0 +1,661 @@
+# File name: Static.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+"""
+Serve the files below a directory of the file system, so that a site can
+deliver its stylesheets, images and downloads without a separate web server.
+
+Links to stylesheets and scripts served this way are rewritten to URLs which
+contain a fingerprint of the file contents, so that clients can cache them
+forever (see :class:`StaticAssets`).
+"""
+
+from __future__ import unicode_literals
+
+import errno
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+import stat
+import time
+
+import PyXWF.utils as utils
+import PyXWF.Errors as Errors
+import PyXWF.Types as Types
+import PyXWF.Nodes as Nodes
+import PyXWF.Registry as Registry
+import PyXWF.Navigation as Navigation
+import PyXWF.Namespaces as NS
+import PyXWF.Resource as Resource
+import PyXWF.Message as Message
+import PyXWF.HTTPUtils as HTTPUtils
+import PyXWF.Sitleton as Sitleton
+
+class StaticNS(object):
+    __metaclass__ = NS.__metaclass__
+    xmlns = "http://pyxwf.zombofant.net/xmlns/nodes/static"
+
+def accepts_gzip(header):
+    """
+    Return whether the value *header* of an ``Accept-Encoding`` request
+    header allows a gzip compressed response.
+    """
+    if not header:
+        return False
+    qualities = {}
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        q = 1.
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.
+        qualities[coding.strip().lower()] = q
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+def parse_range(header, size):
+    """
+    Parse the value *header* of a ``Range`` request header for an entity of
+    *size* bytes. Return a tuple ``(offset, length)`` or :data:`None` if the
+    header should be ignored, which is the case for anything but a single
+    valid byte range. If the range is not satisfiable,
+    :class:`~PyXWF.Errors.RequestedRangeNotSatisfiable` is raised.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0:
+                raise Errors.RequestedRangeNotSatisfiable()
+            start = max(0, size - suffix)
+            end = size - 1
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise Errors.RequestedRangeNotSatisfiable()
+    if end < start:
+        return None
+    end = min(end, size - 1)
+    return start, end - start + 1
+
+# number of hexadecimal digits of a fingerprint used in URLs
+fingerprint_length = 12
+
+_fingerprinted_path = re.compile(
+    r"^(?P<base>.*[^/])\.(?P<fingerprint>[0-9a-f]{{{0:d}}})(?P<ext>\.[^./]+)?$"\
+    .format(fingerprint_length))
+
+def fingerprint_path(relpath, fingerprint):
+    """
+    Insert *fingerprint* into *relpath* in front of the file name extension,
+    e.g. ``css/site.css`` becomes ``css/site.0123456789ab.css``.
+    """
+    base, ext = posixpath.splitext(relpath)
+    return "{0}.{1}{2}".format(base, fingerprint, ext)
+
+def split_fingerprint(relpath):
+    """
+    Reverse :func:`fingerprint_path`: Return a tuple ``(relpath,
+    fingerprint)`` or :data:`None` if *relpath* does not contain a
+    fingerprint.
+    """
+    match = _fingerprinted_path.match(relpath)
+    if match is None:
+        return None
+    return (match.group("base") + (match.group("ext") or ""),
+            match.group("fingerprint"))
+
+def _make_fingerprint(digest):
+    return digest.hexdigest()[:fingerprint_length]
+
+class StaticFile(Resource.Resource):
+    """
+    The metadata of the file *filename*, which is only checked again if it
+    has been checked more than *check_interval* seconds ago. Files of at most
+    *memory_limit* bytes are also kept in memory.
+
+    A file which does not exist (or is not a regular file) is represented
+    too, see :attr:`Exists`.
+    """
+
+    def __init__(self, filename, check_interval=1., memory_limit=0, **kwargs):
+        super(StaticFile, self).__init__(**kwargs)
+        self.filename = filename
+        self.check_interval = check_interval
+        self.memory_limit = memory_limit
+        self._checked = None
+        self._stat = None
+        self._last_modified = None
+        self._data = None
+        self._fingerprint = None
+
+    @property
+    def Exists(self):
+        return self._stat is not None
+
+    @property
+    def LastModified(self):
+        return self._last_modified
+
+    @property
+    def Size(self):
+        return self._stat.st_size
+
+    @property
+    def ETag(self):
+        """
+        Opaque entity tag derived from the size, time of last modification
+        and inode of the file.
+        """
+        st = self._stat
+        return "{0:x}-{1:x}-{2:x}".format(st.st_size, int(st.st_mtime),
+                                          st.st_ino)
+
+    @property
+    def Fingerprint(self):
+        """
+        Hexadecimal digest of the contents of the file. It is computed when it
+        is first needed after the file has changed.
+        """
+        fingerprint = self._fingerprint
+        if fingerprint is None:
+            digest = hashlib.sha1()
+            if self._data is not None:
+                digest.update(self._data)
+            else:
+                with open(self.filename, "rb") as f:
+                    for block in iter(lambda: f.read(65536), b""):
+                        digest.update(block)
+            fingerprint = _make_fingerprint(digest)
+            self._fingerprint = fingerprint
+        return fingerprint
+
+    def update(self):
+        now = time.time()
+        if self._checked is not None and \
+                now - self._checked < self.check_interval:
+            return
+        self._checked = now
+        try:
+            st = os.stat(self.filename)
+        except OSError as err:
+            if err.errno not in (errno.ENOENT, errno.ENOTDIR):
+                raise
+            st = None
+        if st is not None and not stat.S_ISREG(st.st_mode):
+            st = None
+        old = self._stat
+        if st is not None and old is not None and \
+                (st.st_size, st.st_mtime, st.st_ino) == \
+                (old.st_size, old.st_mtime, old.st_ino):
+            return
+        self._stat = st
+        self._data = None
+        self._fingerprint = None
+        if st is None:
+            self._last_modified = None
+            return
+        self._last_modified = utils.datetime.utcfromtimestamp(
+            int(st.st_mtime))
+        if st.st_size <= self.memory_limit:
+            with open(self.filename, "rb") as f:
+                self._data = f.read()
+
+    def get_data(self, offset, length):
+        """
+        Return *length* bytes starting at *offset* if the file is kept in
+        memory, otherwise :data:`None`.
+        """
+        if self._data is None:
+            return None
+        return self._data[offset:offset+length]
+
+    def read(self):
+        """
+        Return the whole contents of the file.
+        """
+        if self._data is not None:
+            return self._data
+        with open(self.filename, "rb") as f:
+            return f.read()
+
+
+class StaticBundle(Resource.Resource):
+    """
+    The concatenation of the :class:`StaticFile` instances *parts*, separated
+    by line breaks where a part does not end with one. It is kept in memory
+    and built again when any of the parts changes. The bundle does not exist
+    while any of its parts is missing.
+    """
+
+    # bundles are always sent from memory
+    filename = None
+
+    def __init__(self, parts, **kwargs):
+        super(StaticBundle, self).__init__(**kwargs)
+        self.parts = parts
+        self._versions = None
+        self._data = None
+        self._last_modified = None
+        self._fingerprint = None
+
+    @property
+    def Exists(self):
+        return self._data is not None
+
+    @property
+    def LastModified(self):
+        return self._last_modified
+
+    @property
+    def Size(self):
+        return len(self._data)
+
+    @property
+    def ETag(self):
+        return self._fingerprint
+
+    @property
+    def Fingerprint(self):
+        return self._fingerprint
+
+    def update(self):
+        for part in self.parts:
+            part.threadsafe_update()
+        versions = tuple(part.ETag if part.Exists else None
+                         for part in self.parts)
+        if versions == self._versions:
+            return
+        self._versions = versions
+        if None in versions:
+            self._data = None
+            self._last_modified = None
+            self._fingerprint = None
+            return
+        chunks = []
+        for part in self.parts:
+            data = part.read()
+            if data and not data.endswith(b"\n"):
+                data += b"\n"
+            chunks.append(data)
+        data = b"".join(chunks)
+        self._last_modified = max(part.LastModified for part in self.parts)
+        self._fingerprint = _make_fingerprint(hashlib.sha1(data))
+        self._data = data
+
+    def get_data(self, offset, length):
+        return self._data[offset:offset+length]
+
+
+class Static(Nodes.Node, Navigation.Info):
+    """
+    Serve the files below the directory ``@src`` (relative to the site root)
+    at the paths below this node. Files and directories whose names start
+    with a dot are not served.
+
+    If ``@precompressed`` is true (the default) and a file ``name.gz`` exists
+    next to a requested file ``name``, it is sent instead to clients which
+    accept gzip content encoding.
+
+    The metadata of up to ``@cache-size`` files is kept and checked again at
+    most every ``@check-interval`` seconds; files of up to ``@memory-limit``
+    bytes are kept in memory.
+
+    Each file can also be requested with a fingerprint of its contents in the
+    file name (see :func:`fingerprint_path`). If the fingerprint is the
+    current one, the response may be cached by clients for a year without
+    revalidation (see :attr:`PyXWF.Context.Context.Immutable`). Links from
+    documents are rewritten to such URLs unless ``@fingerprint`` is false.
+
+    ``<static:bundle name="js/all.js" />`` children define files which are
+    concatenated from the files named in the ``@src`` attributes of their
+    ``<static:part />`` children, in order. A bundle is served at its
+    ``@name``, which takes precedence over a file of the same name.
+    """
+    __metaclass__ = Registry.NodeMeta
+
+    namespace = str(StaticNS)
+    names = ["node"]
+
+    templated = False
+
+    default_mimetype = "application/octet-stream"
+
+    # MIME types used for files which mimetypes only recognizes as encoded
+    encoding_mimetypes = {
+        "gzip": "application/gzip",
+        "bzip2": "application/x-bzip2",
+        "compress": "application/x-compress"
+    }
+
+    def __init__(self, site, parent, node):
+        super(Static, self).__init__(site, parent, node)
+        self.root = os.path.join(site.root, Types.NotNone(node.get("src")))
+        self._precompressed = Types.Typecasts.bool(
+            node.get("precompressed", True))
+        self._check_interval = Types.NumericRange(float, 0., None)(
+            node.get("check-interval", 1.))
+        self._memory_limit = Types.NumericRange(int, 0, None)(
+            node.get("memory-limit", 65536))
+        self._files = utils.LRUCache(Types.NumericRange(int, 1, None)(
+            node.get("cache-size", 1024)))
+        self._fingerprint = Types.Typecasts.bool(
+            node.get("fingerprint", True))
+        self._bundles = {}
+        for bundle_node in node.findall(StaticNS.bundle):
+            name = Types.NotNone(bundle_node.get("name"))
+            if self._split_relpath(name) is None:
+                raise ValueError("Invalid bundle name: {0!r}".format(name))
+            parts = []
+            for part_node in bundle_node.findall(StaticNS.part):
+                src = Types.NotNone(part_node.get("src"))
+                segments = self._split_relpath(src)
+                if segments is None:
+                    raise ValueError("Invalid bundle part: {0!r}".format(src))
+                parts.append(self._make_file(segments))
+            self._bundles[name] = StaticBundle(parts)
+        self._navtitle = node.get("nav-title", self.Name)
+        self._navdisplay = Navigation.DisplayMode(
+            node.get("nav-display", "never-show"))
+
+    @property
+    def Path(self):
+        path = super(Static, self).Path
+        if not path or path[-1] != "/":
+            path += "/"
+        return path
+
+    @staticmethod
+    def _split_relpath(relpath):
+        """
+        Return the segments of *relpath* or :data:`None` if it refers to
+        something which must not be served.
+        """
+        segments = relpath.split("/")
+        for segment in segments:
+            if not segment or segment.startswith(".") or \
+                    "\0" in segment or os.sep in segment:
+                return None
+        return segments
+
+    def _make_file(self, segments):
+        return StaticFile(os.path.join(self.root, *segments),
+            check_interval=self._check_interval,
+            memory_limit=self._memory_limit)
+
+    def _get_file(self, relpath):
+        static_file = self._files.get(relpath)
+        if static_file is None:
+            segments = self._split_relpath(relpath)
+            if segments is None:
+                raise Errors.NotFound()
+            static_file = self._make_file(segments)
+            self._files[relpath] = static_file
+        return static_file
+
+    def _get_asset(self, relpath):
+        """
+        Return the :class:`StaticBundle` or :class:`StaticFile` served at
+        *relpath*.
+        """
+        try:
+            return self._bundles[relpath]
+        except KeyError:
+            return self._get_file(relpath)
+
+    def get_linked_asset(self, relpath):
+        """
+        Return the :class:`StaticBundle` or :class:`StaticFile` at *relpath*
+        if links to it should contain its fingerprint, otherwise
+        :data:`None`. The returned asset has not necessarily been updated and
+        may not exist.
+        """
+        if not self._fingerprint:
+            return None
+        try:
+            return self._get_asset(relpath)
+        except Errors.NotFound:
+            return None
+
+    def _get_mimetype(self, relpath):
+        mimetype, encoding = mimetypes.guess_type(relpath, strict=False)
+        if encoding is not None:
+            return self.encoding_mimetypes.get(encoding, self.default_mimetype)
+        return mimetype or self.default_mimetype
+
+    def resolve_path(self, ctx, relpath):
+        fullpath = ctx.Path
+        if not relpath and fullpath[-1:] != "/" and fullpath:
+            raise Errors.Found(location=fullpath+"/")
+        if not relpath or relpath.endswith("/"):
+            raise Errors.NotFound()
+        fingerprint = None
+        asset = self._get_asset(relpath)
+        ctx.use_resource(asset)
+        if not asset.Exists:
+            split = split_fingerprint(relpath)
+            if split is None:
+                raise Errors.NotFound()
+            relpath, fingerprint = split
+            asset = self._get_asset(relpath)
+            ctx.use_resource(asset)
+            if not asset.Exists:
+                raise Errors.NotFound()
+        ctx.static_relpath = relpath
+        ctx.static_fingerprint = fingerprint
+        return self
+
+    def _check_not_modified(self, ctx, etag):
+        if_none_match = ctx.get_request_header("If-None-Match")
+        if if_none_match is not None:
+            # If-None-Match takes precedence over If-Modified-Since
+            tags = HTTPUtils.parse_entity_tags(if_none_match)
+            if "*" in tags or etag in tags:
+                raise Errors.NotModified()
+            return
+        ctx.check_not_modified()
+
+    def _get_range(self, ctx, asset, etag):
+        header = ctx.get_request_header("Range")
+        if header is None:
+            return None
+        if_range = ctx.get_request_header("If-Range")
+        if if_range is not None:
+            if if_range.startswith(("\"", "W/")):
+                if HTTPUtils.parse_entity_tags(if_range) != [etag] or \
+                        if_range.startswith("W/"):
+                    return None
+            else:
+                try:
+                    if HTTPUtils.parse_http_date(if_range) != \
+                            asset.LastModified:
+                        return None
+                except (TypeError, ValueError):
+                    return None
+        try:
+            return parse_range(header, asset.Size)
+        except Errors.RequestedRangeNotSatisfiable:
+            ctx.set_response_header("Content-Range",
+                "bytes */{0:d}".format(asset.Size))
+            raise
+
+    def do_GET(self, ctx):
+        relpath = ctx.static_relpath
+        asset = self._get_asset(relpath)
+        mimetype = self._get_mimetype(relpath)
+
+        fingerprint = ctx.static_fingerprint
+        if fingerprint is not None and fingerprint == asset.Fingerprint:
+            ctx.Immutable = True
+
+        encoding = None
+        if self._precompressed and asset.filename is not None:
+            compressed = self._get_file(relpath + ".gz")
+            compressed.threadsafe_update()
+            if compressed.Exists:
+                ctx.add_vary("Accept-Encoding")
+                if accepts_gzip(ctx.get_request_header("Accept-Encoding")):
+                    ctx.use_resource(compressed)
+                    asset = compressed
+                    encoding = "gzip"
+
+        etag = asset.ETag
+        if encoding is not None:
+            etag += "-" + encoding
+        ctx.set_response_header("ETag", HTTPUtils.format_entity_tag(etag))
+        if self.site.client_cache:
+            self._check_not_modified(ctx, etag)
+
+        if encoding is not None:
+            ctx.set_response_header("Content-Encoding", encoding)
+        ctx.set_response_header("Accept-Ranges", "bytes")
+        byte_range = self._get_range(ctx, asset, etag)
+        if byte_range is None:
+            offset, length = 0, asset.Size
+            status = Errors.OK
+        else:
+            offset, length = byte_range
+            ctx.set_response_header("Content-Range",
+                "bytes {0:d}-{1:d}/{2:d}".format(
+                    offset, offset+length-1, asset.Size))
+            status = Errors.PartialContent
+        return Message.FileMessage(asset.filename, mimetype,
+            offset=offset,
+            length=length,
+            size=asset.Size,
+            data=asset.get_data(offset, length),
+            status=status)
+
+    def get_content_type(self, ctx):
+        return self._get_mimetype(ctx.static_relpath)
+
+    def iter_sitemap_urls(self, ctx):
+        return iter(())
+
+    def get_navigation_info(self, ctx):
+        return self
+
+    def get_title(self):
+        return self._navtitle
+
+    def get_display(self):
+        return self._navdisplay
+
+    def get_representative(self):
+        return self
+
+    request_handlers = {
+        "GET": do_GET,
+        "HEAD": do_GET
+    }
+
+
+class StaticAssets(Sitleton.Sitleton):
+    """
+    Map the local hrefs of links and scripts in templated documents which
+    point to files or bundles served by :class:`Static` nodes to URLs with
+    the current fingerprint of their contents (see
+    :meth:`PyXWF.Site.Site.get_asset_url`). The nodes are looked up whenever
+    the tree has been loaded.
+
+    As the fingerprints are part of the pages, all assets which have been
+    linked so far are announced as resources of every templated response.
+    """
+    __metaclass__ = Registry.SitletonMeta
+
+    def __init__(self, site):
+        super(StaticAssets, self).__init__(site)
+        self._nodes = []
+        # replaced instead of modified, so that it can be iterated safely
+        self._linked = frozenset()
+        site.hooks.register("tree-loaded", self.find_nodes)
+        site.hooks.register("handle.templated", self.use_linked)
+        site.asset_resolvers.append(self.get_url)
+
+    def use_linked(self, ctx):
+        ctx.use_resources(self._linked)
+
+    def find_nodes(self):
+        nodes = []
+        pending = [self.site.tree]
+        while pending:
+            node = pending.pop()
+            if isinstance(node, Nodes.LazyNode):
+                # lazily loaded nodes are documents without children
+                if not node.IsLoaded and \
+                        not issubclass(node._lazy_cls, Static):
+                    continue
+                node = node.get_node()
+            if isinstance(node, Static):
+                nodes.append(node)
+            pending.extend(node.iter_children())
+        # the innermost node is responsible for a path
+        nodes.sort(key=lambda node: len(node.Path), reverse=True)
+        self._nodes = nodes
+        self._linked = frozenset()
+
+    def get_url(self, ctx, href):
+        if "?" in href or "#" in href:
+            return None
+        prefix = ""
+        path = href
+        if href.startswith("/"):
+            prefix = self.site.urlroot
+            if not prefix.endswith("/"):
+                prefix += "/"
+            if not href.startswith(prefix):
+                return None
+            path = href[len(prefix):]
+        for node in self._nodes:
+            nodepath = node.Path
+            if path.startswith(nodepath):
+                break
+        else:
+            return None
+        relpath = path[len(nodepath):]
+        asset = node.get_linked_asset(relpath)
+        if asset is None:
+            return None
+        ctx.use_resource(asset)
+        if asset not in self._linked:
+            self._linked |= frozenset([asset])
+        if not asset.Exists:
+            return None
+        return prefix + nodepath + fingerprint_path(relpath, asset.Fingerprint)
@@ -93,6 +93,7 @@ class TransformNode(TransformBase, Navigation.Info):
 
     namespace = str(TransformNS)
     names = ["node"]
+    lazy = True
 
     def __init__(self, site, parent, node):
         super(TransformNode, self).__init__(site, parent, node)
@@ -144,6 +145,7 @@ class TransformTree(TransformBase):
 
     namespace = str(TransformNS)
     names = ["tree"]
+    lazy = True
 
     def _rebuild(self):
         self._transform = self.site.template_cache[self._transform_file]
@@ -22,12 +22,16 @@
 # For feedback and questions about pyxwf please e-mail one of the
 # authors named in the AUTHORS file.
 ########################################################################
-import abc, collections
+import abc, collections, logging
 
+from PyXWF.utils import _F, threading
 import PyXWF.utils as utils
 import PyXWF.Errors as Errors
 import PyXWF.Types as Types
 import PyXWF.ContentTypes as ContentTypes
+import PyXWF.HTTPUtils as HTTPUtils
+
+logger = logging.getLogger(__name__)
 
 class NodeMeta(abc.ABCMeta):
     """
@@ -138,10 +142,36 @@ class Node(object):
 
     Note that this is not all you need to create a node. For a complete tutorial
     on how to create nodes see :ref:`<create-a-plugin-node>`.
+
+    Nodes which are expensive to construct (e.g. because they load or
+    transform documents in their constructor) can set the class attribute
+    :attr:`lazy` to :data:`True`. Unless disabled by the site, they are then
+    represented by a :class:`LazyNode` in the tree until they are first used.
+
+    When the sitemap is reloaded and only the tree changed, children of nodes
+    which set :attr:`reuse_children` to :data:`True` are taken over into the
+    new tree if their XML is unchanged; only their :attr:`Parent` is updated.
+    This must only be set if the children do not keep any other references
+    to their parent or to other nodes.
+
+    Nodes which answer with complete :class:`~PyXWF.Message.Message`
+    instances which are not based on a template, like files, set
+    :attr:`templated` to :data:`False`. The site then neither loads a
+    template for them nor negotiates between XHTML and HTML.
     """
     __metaclass__ = NodeMeta
 
+    lazy = False
+    reuse_children = False
+    templated = True
+
     _navtitle_with_none_type = Types.DefaultForNone(None, Types.Typecasts.unicode)
+    _cache_seconds_type = Types.DefaultForNone(None,
+        Types.NumericRange(int, 0, None))
+    _cache_scope_type = Types.DefaultForNone(None, Types.EnumMap({
+        "public": "public",
+        "private": "private"
+    }))
 
     def __init__(self, site, parent, node, **kwargs):
         super(Node, self).__init__(**kwargs)
@@ -150,6 +180,7 @@ class Node(object):
         self._id = None
         self._name = None
         self._template = None
+        self._cache_policy = HTTPUtils.CachePolicy()
         self._path = None
 
         if node is not None:
@@ -159,6 +190,14 @@ class Node(object):
         self.ID = node.get("id")
         self._name = node.get("name", "")
         self._template = node.get("template", None)
+        self._cache_policy = HTTPUtils.CachePolicy(
+            max_age=self._cache_seconds_type(node.get("cache-max-age")),
+            s_maxage=self._cache_seconds_type(node.get("cache-s-maxage")),
+            stale_while_revalidate=self._cache_seconds_type(
+                node.get("cache-stale-while-revalidate")),
+            stale_if_error=self._cache_seconds_type(
+                node.get("cache-stale-if-error")),
+            scope=self._cache_scope_type(node.get("cache-scope")))
         if self.Parent and self.Parent.Path:
             parent_path = self.Parent.Path
         else:
@@ -219,6 +258,36 @@ class Node(object):
         """
         return ContentTypes.xhtml
 
+    def iter_children(self):
+        """
+        Return an iterable of the nodes which are statically mounted below
+        this node. The default implementation returns an empty iterable;
+        directory-like nodes override this.
+        """
+        return iter(())
+
+    def iter_sitemap_urls(self, ctx):
+        """
+        Return an iterable of ``(path, last_modified)`` tuples for all pages at
+        or below this node which should be announced in a sitemap (see
+        :class:`PyXWF.Nodes.Sitemap.Sitemap`). *last_modified* is either a
+        :class:`datetime.datetime` or :data:`None` if it is not known.
+
+        Resources the result depends on must be announced using
+        ``ctx.use_resource``, as in :meth:`resolve_path`.
+
+        The default implementation yields the node itself if it handles GET
+        requests and then the urls of all nodes from :meth:`iter_children`.
+        """
+        handlers = self.request_handlers
+        if self.Path is not None and \
+                (isinstance(handlers, collections.defaultdict) or
+                 "GET" in handlers):
+            yield (self.Path, None)
+        for child in self.iter_children():
+            for url in child.iter_sitemap_urls(ctx):
+                yield url
+
     @property
     def Template(self):
         """
@@ -240,6 +309,26 @@ class Node(object):
     def Template(self, value):
         self._template = value
 
+    @property
+    def CachePolicy(self):
+        """
+        Return the :class:`~PyXWF.HTTPUtils.CachePolicy` for cachable
+        responses of this node. Its settings are taken from the
+        ``@cache-max-age``, ``@cache-s-maxage``,
+        ``@cache-stale-while-revalidate``, ``@cache-stale-if-error`` and
+        ``@cache-scope`` attributes of the XML node which initialized this
+        tree node; those which are not set there are taken from the parents
+        :attr:`.CachePolicy`, like :attr:`.Template`.
+        """
+        policy = self._cache_policy
+        if self.Parent is not None:
+            policy = policy.inherit(self.Parent.CachePolicy)
+        return policy
+
+    @CachePolicy.setter
+    def CachePolicy(self, value):
+        self._cache_policy = value
+
     @property
     def Name(self):
         """
@@ -299,6 +388,82 @@ class Node(object):
     request_handlers = {}
 
 
+class LazyNode(object):
+    """
+    Stand-in for a node of class *cls* which will be constructed with *site*,
+    *parent* and *node* only when it is first used, i.e. when any attribute
+    besides :attr:`Name`, :attr:`ID` and :attr:`Parent` is accessed. The
+    attribute access is then forwarded to the constructed node.
+
+    The proxy registers itself as the node with its ``@id`` at the site;
+    the constructed node replaces that registration. A proxy compares equal
+    to the node it has constructed.
+    """
+
+    def __init__(self, cls, site, parent, node):
+        super(LazyNode, self).__init__()
+        self._lazy_cls = cls
+        self._lazy_args = (site, parent, node)
+        self._lazy_node = None
+        self._lazy_lock = threading.Lock()
+        self._lazy_parent = parent
+        self.Name = node.get("name", "")
+        self.ID = node.get("id")
+        if self.ID is not None:
+            site.register_node_id(self.ID, self)
+        site.lazy_node_proxies.append(self)
+
+    def get_node(self):
+        """
+        Return the proxied node, constructing it if neccessary.
+        """
+        node = self._lazy_node
+        if node is None:
+            with self._lazy_lock:
+                node = self._lazy_node
+                if node is None:
+                    logger.debug(_F("constructing lazy {0}", self._lazy_cls))
+                    node = self._lazy_cls(*self._lazy_args)
+                    self._lazy_node = node
+                    self._lazy_args = None
+        return node
+
+    @property
+    def Parent(self):
+        return self._lazy_parent
+
+    @Parent.setter
+    def Parent(self, value):
+        with self._lazy_lock:
+            self._lazy_parent = value
+            if self._lazy_node is not None:
+                self._lazy_node.Parent = value
+            else:
+                site, _, node = self._lazy_args
+                self._lazy_args = (site, value, node)
+
+    @property
+    def IsLoaded(self):
+        return self._lazy_node is not None
+
+    def __getattr__(self, name):
+        return getattr(self.get_node(), name)
+
+    def __eq__(self, other):
+        if isinstance(other, LazyNode):
+            return other is self
+        return self._lazy_node is not None and self._lazy_node is other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = object.__hash__
+
+    def __repr__(self):
+        return "<LazyNode {0} {1!r}>".format(
+            self._lazy_cls.__name__, self._lazy_node or self.Name)
+
+
 class DirectoryResolutionBehaviour(object):
     """
     Mixin to make a node behave like a directory, regarding the working of
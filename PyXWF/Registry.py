@@ -95,7 +95,18 @@ class _NodePlugins(NamespaceRegistry):
     error_class = Errors.MissingNodePlugin
 
     def _get_instance(self, cls, node, site, parent):
-        return cls(site, parent, node)
+        key = site.get_node_reuse_key(node, parent)
+        if key is not None:
+            instance = site.reuse_node(key, parent)
+            if instance is not None:
+                return instance
+        if getattr(cls, "lazy", False) and site.lazy_nodes:
+            instance = Nodes.LazyNode(cls, site, parent, node)
+        else:
+            instance = cls(site, parent, node)
+        if key is not None:
+            site.record_node(key, instance)
+        return instance
 
 class _CrumbPlugins(NamespaceRegistry):
     error_class = Errors.MissingCrumbPlugin
@@ -91,9 +91,24 @@ class XMLTree(Resource):
         self._last_modified = utils.file_last_modified(filename)
         self._parse()
 
+    @classmethod
+    def from_tree(cls, filename, last_modified, tree):
+        """
+        Create an :class:`XMLTree` for *filename* holding the already parsed
+        *tree*, which has been loaded from the file as it was at
+        *last_modified*.
+        """
+        self = cls.__new__(cls)
+        super(XMLTree, self).__init__()
+        self._tree = tree
+        self._filename = filename
+        self._last_modified = last_modified
+        return self
+
     def _parse(self):
         self._tree = ET.parse(self._filename)
 
+    @property
     def LastModified(self):
         return self._last_modified
 
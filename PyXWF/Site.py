@@ -54,6 +54,8 @@ import PyXWF.Registry as Registry
 import PyXWF.Cache as Cache
 import PyXWF.Templates as Templates
 import PyXWF.Resource as Resource
+import PyXWF.Nodes as Nodes
+import PyXWF.Snapshot as Snapshot
 
 import PyXWF.Tweaks.CoreTweaks
 
@@ -65,6 +67,20 @@ class Site(Resource.Resource):
     loaded from *sitemap_file*. Optionally, one can specify a *default_url_root*
     which is used if no URL root is specified in the sitemap XML.
 
+    If *previous* is given, it must be a :class:`Site` for the same sitemap
+    which is being replaced by the new instance (see :class:`SiteGenerations`).
+    Cached templates and XML data which are still up to date are copied from
+    it, sharing the parsed data. So are parsed documents, unless the plugins
+    or tweaks changed, as those configure the parsers. *previous* itself is
+    not modified and can keep serving requests meanwhile.
+
+    If *auto_reload* is true, the site reloads itself in place when the
+    sitemap changes (see :meth:`update`).
+
+    If *snapshot* names a file written by :func:`PyXWF.Snapshot.write`, parsed
+    documents are restored from it instead of being loaded from their files,
+    unless the sitemap or the respective file changed in the meantime.
+
     .. attribute:: parser_registry
 
         An instance of :class:`~PyXWF.Registry.ParserRegistry` local to the
@@ -78,7 +94,8 @@ class Site(Resource.Resource):
 
     urn_scheme = re.compile("^\w+:")
 
-    def __init__(self, sitemap_file, default_url_root=None, **kwargs):
+    def __init__(self, sitemap_file, default_url_root=None, previous=None,
+            auto_reload=True, snapshot=None, **kwargs):
         logger.info(_F(
 "Initializing PyXWF/{pyxwf_version} at {pid} with {python}/{python_version} lxml.etree/{etree_version}, {threading}, blist/{blist_version}",
             pyxwf_version=PyXWF.__version__,
@@ -90,17 +107,20 @@ class Site(Resource.Resource):
             python_version=platform.python_version()
         ))
         super(Site, self).__init__(**kwargs)
-        self.startcwd = os.getcwd()
+        if previous is not None:
+            self.startcwd = previous.startcwd
+        else:
+            self.startcwd = os.getcwd()
         self.default_url_root = default_url_root
+        self.auto_reload = auto_reload
+        self.snapshot_file = snapshot
+        self._pending_nodes = None
         self.final_transform = Templates.XSLTTemplate(
             self,
             os.path.join(PyXWF.data_path, "final-transform.xsl")
         )
         # self.savepoint = ImportSavepoints.RollbackImporter()
-        try:
-            self.load_sitemap(sitemap_file)
-        except:
-            raise
+        self.load_sitemap(sitemap_file, previous=previous)
 
     @property
     def LastModified(self):
@@ -179,18 +199,33 @@ class Site(Resource.Resource):
         else:
             raise ValueError("No tree node.")
 
-    def _load_crumbs(self, root):
+    def _load_crumbs(self, root, reusable=None):
         """
-        Load crumbs and associate them to their ID.
+        Load crumbs and associate them to their ID. Crumbs from *reusable*,
+        which maps the serialized XML of crumbs to crumb instances, are used
+        instead of creating new ones where the XML matches. The crumbs in use
+        are only replaced once all of them have been loaded.
         """
-        self.crumbs = {}
+        if reusable is None:
+            reusable = {}
+        instances, sources = {}, {}
         crumbs = root.find(NS.Site.crumbs)
         if crumbs is None:
-            return
+            crumbs = []
         for crumb in crumbs:
             if not isinstance(crumb.tag, basestring):
                 continue
-            self.add_crumb(Registry.CrumbPlugins(crumb, self))
+            source = ET.tostring(crumb)
+            try:
+                instance = reusable[source]
+            except KeyError:
+                instance = Registry.CrumbPlugins(crumb, self)
+            if instance.ID in instances:
+                raise ValueError("Duplicate crumb id: {0}".format(instance.ID))
+            instances[instance.ID] = instance
+            sources[source] = instance
+        self.crumbs = instances
+        self._crumb_sources = sources
 
     def _load_tweaks(self, tweaks):
         """
@@ -252,10 +287,13 @@ class Site(Resource.Resource):
             self.prefixless_xhtml = None
 
 
-    def transform_py_namespace(self, ctx, body, crumbs=True):
+    def transform_py_namespace(self, ctx, body, crumbs=True, mobile=None):
         """
         Do PyXWF specific transformations on the XHTML tree *body*. This
         includes transforming local a tags, local img tags and placing crumbs.
+        If *mobile* is not :data:`None`, it is used instead of
+        :attr:`~PyXWF.Context.Context.IsMobileClient` (see
+        :meth:`get_template_arguments`).
 
         Note that the tree *body* is not bound to be an actual XHTML body.
         This method will iterate over all matching elements, so it can also be
@@ -278,16 +316,24 @@ class Site(Resource.Resource):
                 self._place_crumb(ctx, crumb_node, crumb)
         return self.final_transform.raw_transform(
             body,
-            self.get_template_arguments(ctx)
+            self.get_template_arguments(ctx, mobile=mobile)
         ).getroot()
 
 
-    def get_template_arguments(self, ctx):
+    def get_template_arguments(self, ctx, mobile=None):
+        """
+        Return the arguments passed to the templates for the request *ctx*.
+        Unless *mobile* is given, they depend on
+        :attr:`~PyXWF.Context.Context.IsMobileClient`, which makes the
+        response vary on the user agent.
+        """
         # XXX: This will possibly explode one day ...
+        if mobile is None:
+            mobile = ctx.IsMobileClient
         return {
             b"site_title": utils.unicode2xpathstr(self.title),
-            b"deliver_mobile": "1" if ctx.IsMobileClient else "0",
-            b"mobile_client": "1" if ctx.IsMobileClient else "0",
+            b"deliver_mobile": "1" if mobile else "0",
+            b"mobile_client": "1" if mobile else "0",
             b"host_name": utils.unicode2xpathstr(ctx.HostName),
             b"url_scheme": utils.unicode2xpathstr(ctx.URLScheme),
             b"url_root": utils.unicode2xpathstr(self.urlroot),
@@ -306,6 +352,23 @@ class Site(Resource.Resource):
             uri = "{0}://{1}{2}".format(ctx.URLScheme, ctx.HostName, uri)
         return uri
 
+    def get_asset_url(self, ctx, href):
+        """
+        Return the URL under which the asset (e.g. a stylesheet or script)
+        referenced by *href* should be linked, as determined by the callables
+        in :attr:`asset_resolvers`. Each of them is called with *ctx* and
+        *href* and may return the URL to use (e.g. one which contains a
+        fingerprint of the contents) or :data:`None` if it does not know the
+        asset. If none of them knows it, *href* is returned unchanged.
+        """
+        if not href or self.urn_scheme.search(href):  # non local href
+            return href
+        for resolver in self.asset_resolvers:
+            url = resolver(ctx, href)
+            if url is not None:
+                return url
+        return href
+
     def transform_href(self, ctx, node, attrname="href", make_global=False):
         """
         Transform the attribute *attrname* on the ETree node *node* as if it
@@ -343,13 +406,83 @@ class Site(Resource.Resource):
             raise ValueError("Duplicate crumb id: {0}".format(crumb.ID))
         self.crumbs[crumb.ID] = crumb
 
+    def get_node_reuse_key(self, element, parent):
+        """
+        Return the key under which the node created from *element* below
+        *parent* can be found again on an incremental reload (see
+        :meth:`reuse_node`), or :data:`None` if *parent* does not allow its
+        children to be reused.
+        """
+        if not getattr(parent, "reuse_children", False):
+            return None
+        return (parent.Path, ET.tostring(element))
+
+    def record_node(self, key, node):
+        """
+        Remember *node* under *key* (see :meth:`get_node_reuse_key`) for reuse
+        on the next incremental reload.
+        """
+        self._node_sources.append((key, node))
+
+    def reuse_node(self, key, parent):
+        """
+        Return the node which has been created for *key* (see
+        :meth:`get_node_reuse_key`) in the tree which is currently being
+        replaced, if any, and attach it to *parent*. IDs and reuse keys of
+        all nodes in its subtree are carried over.
+        """
+        node = self._reusable.pop(key, None)
+        if node is None:
+            return None
+        self._reparented.append((node, node.Parent))
+        node.Parent = parent
+        for ID, other in self._replaced_nodes.viewitems():
+            if self._is_descendant(other, node):
+                self.register_node_id(ID, other)
+        for other_key, other in self._replaced_sources:
+            if self._is_descendant(other, node):
+                self.record_node(other_key, other)
+        if isinstance(node, Nodes.LazyNode) and not node.IsLoaded:
+            self.lazy_node_proxies.append(node)
+        return node
+
+    @staticmethod
+    def _is_descendant(node, ancestor):
+        """
+        Check whether *node* is *ancestor* or (transitively) one of its
+        children, without constructing any lazy nodes.
+        """
+        targets = [ancestor]
+        if isinstance(ancestor, Nodes.LazyNode) and ancestor.IsLoaded:
+            targets.append(ancestor.get_node())
+        while node is not None:
+            if any(node is target for target in targets):
+                return True
+            node = node.Parent
+        return False
+
+    def _is_attached(self, node):
+        """
+        Check whether *node* is part of the current tree.
+        """
+        while node is not None:
+            if node is self.tree:
+                return True
+            node = node.Parent
+        return False
+
     def register_node_id(self, ID, node):
         """
         Nodes may have IDs under which they can be referred using the Site. This
         method is used to register the *node* under a given *ID*. This will
         raise a ValueError if the ID is duplicated.
         """
-        self.nodes[ID] = node
+        if self._pending_nodes is not None:
+            # an incremental reload is in progress, the IDs of the current
+            # tree remain in use until it has finished
+            self._pending_nodes[ID] = node
+        else:
+            self.nodes[ID] = node
 
     def unregister_node_id(self, ID):
         del self.nodes[ID]
@@ -371,19 +504,194 @@ class Site(Resource.Resource):
             pass
         return self.cache.specialized_cache(key, cls, *args)
 
-    def load_sitemap(self, sitemap_file):
+    @staticmethod
+    def _split_sitemap(root):
+        """
+        Return the serialized ``(configuration, tree, crumbs)`` parts of the
+        sitemap *root*, which are compared on reload to find out what has
+        changed. The configuration covers everything besides the tree and the
+        crumbs.
+        """
+        config, tree, crumbs = [], None, None
+        for child in root:
+            if not isinstance(child.tag, basestring):
+                continue
+            if child.tag == NS.Site.crumbs:
+                crumbs = ET.tostring(child)
+            elif tree is None and child.tag.endswith("tree"):
+                tree = ET.tostring(child)
+            else:
+                config.append(ET.tostring(child))
+        return b"".join(config), tree, crumbs
+
+    @staticmethod
+    def _get_parser_sources(root):
+        """
+        Return the serialized plugins and tweaks of the sitemap *root*, which
+        determine how documents are parsed.
+        """
+        return b"".join(ET.tostring(child) for child in
+                        (root.find(NS.Site.plugins), root.find(NS.Site.tweaks))
+                        if child is not None)
+
+    def _carry_over_cache(self, old_cache, key, new, copy):
+        """
+        Put copies of the entries of the subcache *key* of *old_cache* into
+        the subcache *new*, as long as the files they were loaded from have
+        not changed since. *copy* is called with the path and the old entry
+        and has to return the new entry. *old_cache* is not modified, as the
+        site it belongs to may still be serving requests.
+        """
+        try:
+            old = old_cache.subcaches[key]
+        except KeyError:
+            return
+        with old._lookuplock:
+            entries = list(old.entries.viewitems())
+        carried = 0
+        for path, entry in entries:
+            # keep the entry from being reloaded while it is copied
+            with entry._updatelock:
+                last_modified = utils.file_last_modified(path)
+                if last_modified is None or entry.LastModified is None or \
+                        last_modified > entry.LastModified:
+                    continue
+                Cache.SubCache.__setitem__(new, path, copy(path, entry))
+            carried += 1
+        logger.debug(_F("carried over {0} of {1} entries of {2}",
+                        carried, len(entries), key[1]))
+
+    def _purge_detached_nodes(self):
+        """
+        Remove everything from the cache which is keyed by nodes which are
+        not part of the tree anymore.
+        """
+        def detached(key):
+            if not isinstance(key, tuple):
+                key = (key,)
+            return any(isinstance(item, (Nodes.Node, Nodes.LazyNode)) and
+                       not self._is_attached(item)
+                       for item in key)
+
+        for key, subcache in list(self.cache.subcaches.viewitems()):
+            if detached(key):
+                del self.cache[key]
+                continue
+            for entry_key in list(subcache.entries):
+                if detached(entry_key):
+                    del subcache[entry_key]
+
+    def _setup_default_template(self):
+        if self._tweaked_default_template is None:
+            self.default_template = self.tree.Template or "templates/default.xsl"
+        else:
+            self.default_template = self._tweaked_default_template
+
+    def _start_warm_up(self):
+        if self.warm_up and self.lazy_node_proxies:
+            thread = threading.Thread(target=self._warm_up,
+                                      args=(self.lazy_node_proxies,),
+                                      name="PyXWF warm-up")
+            thread.daemon = True
+            thread.start()
+
+    def _reload_tree(self, root, sources, previous):
+        """
+        Apply the changes of the sitemap *root* compared to the *previous*
+        sources (see :meth:`_split_sitemap`), as long as the configuration is
+        unchanged. Plugins, tweaks and caches are kept. Nodes whose XML has
+        not changed and whose parent allows it (see
+        :attr:`PyXWF.Nodes.Node.reuse_children`) are taken over into the new
+        tree with their whole subtree. Crumbs are rebuilt if the tree or their
+        XML changed.
+
+        The tree, the node IDs and the crumbs in use are each replaced at
+        once after their replacement has been loaded completely, so that the
+        site can keep serving requests meanwhile. If loading the tree fails,
+        the current one is kept.
+        """
+        _, tree, crumbs = sources
+        _, old_tree, old_crumbs = previous
+        tree_changed = tree != old_tree
+        if tree_changed:
+            logger.info("sitemap tree changed -- reloading changed nodes")
+            current_tree = self.tree
+            current_sources = self._node_sources
+            current_proxies = self.lazy_node_proxies
+            self._reusable = dict(current_sources)
+            self._replaced_sources = current_sources
+            self._replaced_nodes = self.nodes
+            self._reparented = []
+            self._pending_nodes = {}
+            self._node_sources = []
+            self.lazy_node_proxies = []
+            try:
+                self._load_tree(root)
+            except:
+                for node, parent in self._reparented:
+                    node.Parent = parent
+                self.tree = current_tree
+                self._node_sources = current_sources
+                self.lazy_node_proxies = current_proxies
+                raise
+            else:
+                self.nodes = self._pending_nodes
+            finally:
+                reused = len(self._replaced_sources) - len(self._reusable)
+                self._reusable = {}
+                self._replaced_sources = []
+                self._replaced_nodes = {}
+                self._reparented = []
+                self._pending_nodes = None
+            logger.info(_F("reused {0} subtrees", reused))
+            self._purge_detached_nodes()
+            self.hooks.call("tree-loaded")
+            self._setup_default_template()
+
+        if tree_changed or crumbs != old_crumbs:
+            logger.info("sitemap crumbs changed -- reloading crumbs")
+            self._load_crumbs(root,
+                              None if tree_changed else self._crumb_sources)
+            self.hooks.call("crumbs-loaded")
+
+        self.hooks.call("loading-finished")
+        self._start_warm_up()
+
+    def load_sitemap(self, sitemap_file, previous=None):
         """
         Load the whole sitemap XML from *sitemap_file*.
+
+        If a sitemap has been loaded before and only the tree or the crumbs
+        changed, only those are reloaded, reusing unchanged subtrees.
+        Otherwise, the whole site is set up again, but cached templates,
+        documents and XML data whose files did not change are carried over,
+        either from this site or from the :class:`Site` *previous* (see
+        :class:`Site`).
         """
         # set this up for later auto-reload
         self.sitemap_file = sitemap_file
-        self.sitemap_timestamp = utils.file_last_modified(sitemap_file)
-
-        # reinitialize cache
-        self.cache = Cache.Cache(self)
+        timestamp = utils.file_last_modified(sitemap_file)
 
         # parse the sitemap
         root = ET.parse(sitemap_file).getroot()
+        sources = self._split_sitemap(root)
+        old_sources = getattr(self, "_sitemap_sources", None)
+        if old_sources is not None and old_sources[0] == sources[0]:
+            self._reload_tree(root, sources, old_sources)
+            # only now the change counts as handled; if reloading the tree
+            # failed, it is tried again on the next update
+            self.sitemap_timestamp = timestamp
+            self._sitemap_sources = sources
+            return
+        self.sitemap_timestamp = timestamp
+
+        if previous is None:
+            previous = self
+        old_cache = getattr(previous, "cache", None)
+        old_root = getattr(previous, "root", None)
+
+        # reinitialize cache
+        self.cache = Cache.Cache(self)
 
         # load metadata
         self._load_meta(root)
@@ -402,6 +710,9 @@ class Site(Resource.Resource):
         # load plugins
         self._load_plugins(root)
 
+        # callables which map local hrefs of assets, see get_asset_url
+        self.asset_resolvers = []
+
         # instanciate sitletons, so they're ready when the tweaks come in
         self.sitletons = Registry.Sitletons.instanciate(self)
 
@@ -413,14 +724,42 @@ class Site(Resource.Resource):
 
         self.hooks.call("tweaks-loaded")
 
+        # take over what the previous site has cached already; documents
+        # depend on the parsers, which are set up by plugins and tweaks
+        parser_sources = self._get_parser_sources(root)
+        if old_cache is not None and old_root == self.root:
+            self._carry_over_cache(old_cache, (previous, "templates"),
+                self.template_cache,
+                lambda path, template:
+                    Templates.XSLTTemplate.from_template(self, template))
+            self._carry_over_cache(old_cache, (previous, "xml-data-cache"),
+                self.xml_data_cache,
+                lambda path, tree: Resource.XMLTree.from_tree(
+                    path, tree.LastModified, tree.Tree))
+            if getattr(previous, "_parser_sources", None) == parser_sources:
+                self._carry_over_cache(old_cache, (previous, "file-doc-cache"),
+                    self.file_document_cache,
+                    lambda path, document:
+                        Document.FileDocument.from_document(self, path,
+                            document.MIMEType, document.LastModified,
+                            document.doc, **document._kwargs))
+        self._parser_sources = parser_sources
+
+        # restore parsed documents from a snapshot, if one was given
+        if self.snapshot_file is not None:
+            Snapshot.load(self, self.snapshot_file)
+
         # load site tree
+        self.lazy_node_proxies = []
+        self._node_sources = []
+        self._reusable = {}
         self._load_tree(root)
 
         self.hooks.call("tree-loaded")
 
         # setup the default template
-        if self.default_template is None:
-            self.default_template = self.tree.Template or "templates/default.xsl"
+        self._tweaked_default_template = self.default_template
+        self._setup_default_template()
 
         # load crumbs
         self._load_crumbs(root)
@@ -430,15 +769,43 @@ class Site(Resource.Resource):
         logger.debug("Sitemap loaded successfully, executing post-config")
 
         self._load_optional_transformations()
+        self._sitemap_sources = sources
 
-    def update(self):
+        self._start_warm_up()
+
+    def _warm_up(self, proxies):
         """
-        If neccessary, reload the whole sitemap. This works as long as the new
-        sitemap does not depend on any python code changes.
+        Construct all nodes which have been deferred using
+        :class:`~PyXWF.Nodes.LazyNode` proxies. Proxies created while doing so
+        (for lazy children of lazy nodes) are appended to *proxies* and thus
+        handled too.
+        """
+        logger.info("Warming up lazily loaded nodes")
+        i = 0
+        while i < len(proxies):
+            proxy = proxies[i]
+            i += 1
+            try:
+                proxy.get_node()
+            except Exception as err:
+                logger.exception(_F("While warming up {0!r}: {1}", proxy, err))
+        logger.info(_F("Warm-up finished, {0} nodes loaded", i))
+
+    def is_sitemap_changed(self):
+        """
+        Check whether the sitemap file has been modified since it was loaded.
         """
         sitemap_timestamp = utils.file_last_modified(self.sitemap_file)
-        if sitemap_timestamp > self.sitemap_timestamp:
-            logger.info("sitemap xml changed -- reloading complete site.")
+        return sitemap_timestamp > self.sitemap_timestamp
+
+    def update(self):
+        """
+        If neccessary and enabled by *auto_reload*, reload the sitemap (see
+        :meth:`load_sitemap`). This works as long as the new sitemap does not
+        depend on any python code changes.
+        """
+        if self.auto_reload and self.is_sitemap_changed():
+            logger.info("sitemap xml changed -- reloading site.")
             self.hooks.call("global-reload")
             self.load_sitemap(self.sitemap_file)
 
@@ -478,6 +845,9 @@ class Site(Resource.Resource):
         # mark ourselves as a used resource
         ctx.use_resource(self)
 
+        if self.capability_header is not None:
+            ctx.use_capability_class(self.capability_header)
+
         # call a hook used by some tweaks
         self.hooks.call("handle.pre-lookup", ctx)
 
@@ -508,6 +878,13 @@ class Site(Resource.Resource):
             # setup the context
             ctx.PageNode = node
 
+            if not node.templated:
+                logger.debug("passing request to untemplated node")
+                ctx.check_acceptable(node.get_content_type(ctx))
+                message = node.handle(ctx)
+                self.cache.enforce_limit()
+                return message
+
             logger.debug("load & announce template")
             # load the template and mark it for use
             template_path = node.Template or self.default_template
@@ -522,6 +899,10 @@ class Site(Resource.Resource):
             html_transforms = list(html_transforms)
             ctx.use_resources(html_transforms)
 
+            # plugins may announce further resources the templated output
+            # depends on (e.g. linked assets) before the cache early out
+            self.hooks.call("handle.templated", ctx)
+
             logger.debug("checking content type")
             content_type = node.get_content_type(ctx)
             if content_type == ContentTypes.xhtml:
@@ -583,6 +964,9 @@ class Site(Resource.Resource):
                     pretty_print=self.pretty_print,
                     force_namespaces=dict(self.force_namespaces)
                 )
+        elif isinstance(data, Message.Message):
+            logger.debug("got Message, passing it on")
+            message = data
         elif isinstance(data, (ET._Element, ET._ElementTree)):
             logger.debug("got Element(Tree)?, returning XML document")
             message = Message.XMLMessage(data, content_type,
@@ -617,3 +1001,92 @@ class Site(Resource.Resource):
             xhtml = Errors.Handler.InternalServerError(ctx, *sys.exc_info()).xhtml
             return Message.HTMLMessage.from_xhtml_tree(xhtml, status=Errors.HTTP500,
                 encoding="utf-8")
+
+
+class SiteGenerations(object):
+    """
+    Keep the current generation of a site loaded from *sitemap_file* and
+    replace it when the sitemap changes. *site_class* is the :class:`Site`
+    class to instanciate; further keyword arguments are passed to its
+    constructor.
+
+    When :meth:`get_site` notices a change, a new generation is built in a
+    background thread while the current one keeps serving requests. Once
+    complete, it replaces the current one atomically. Requests which are in
+    flight finish with the generation they started with. If building the new
+    generation fails, the current one is kept until the sitemap changes
+    again.
+
+    This also applies if only the tree or the crumbs changed: nodes are
+    bound to the site they were created for, so they are never taken over
+    from the current generation. The new generation still takes over its
+    cached templates, XML data and documents (see the *previous* argument of
+    :class:`Site`).
+
+    If *background* is false, only one generation exists and it reloads
+    itself in place instead (see :meth:`Site.update`), taking over unchanged
+    nodes if only the tree or the crumbs changed.
+
+    If *current* is given, it is used as the first generation instead of
+    constructing one. It must have been constructed with *auto_reload* set
+    to ``not background``.
+    """
+
+    def __init__(self, sitemap_file, site_class=Site, background=True,
+            current=None, **kwargs):
+        super(SiteGenerations, self).__init__()
+        self._site_class = site_class
+        self._kwargs = kwargs
+        self._background = background
+        self._lock = threading.Lock()
+        self._reload_thread = None
+        self._failed_timestamp = None
+        if current is None:
+            current = site_class(sitemap_file, auto_reload=not background,
+                                 **kwargs)
+        self._current = current
+
+    @property
+    def Current(self):
+        """
+        The generation currently serving requests.
+        """
+        return self._current
+
+    def get_site(self):
+        """
+        Return the generation to use for a new request, starting a reload in
+        the background if the sitemap has changed.
+        """
+        site = self._current
+        if self._background and site.is_sitemap_changed():
+            with self._lock:
+                timestamp = utils.file_last_modified(site.sitemap_file)
+                if self._reload_thread is None and \
+                        timestamp != self._failed_timestamp:
+                    self._reload_thread = threading.Thread(
+                        target=self._reload,
+                        args=(site, timestamp),
+                        name="PyXWF reload")
+                    self._reload_thread.daemon = True
+                    self._reload_thread.start()
+        return site
+
+    def _reload(self, site, timestamp):
+        logger.info("sitemap xml changed -- building new site generation")
+        try:
+            new_site = self._site_class(site.sitemap_file, previous=site,
+                                        auto_reload=False, **self._kwargs)
+        except Exception as err:
+            logger.exception(_F(
+                "Failed to load changed sitemap, keeping the old one: {0}",
+                err))
+            new_site = None
+        with self._lock:
+            if new_site is not None:
+                self._current = new_site
+                self._failed_timestamp = None
+                logger.info("new site generation is now in use")
+            else:
+                self._failed_timestamp = timestamp
+            self._reload_thread = None
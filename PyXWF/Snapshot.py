@@ -0,0 +1,205 @@
+# File name: Snapshot.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+"""
+Snapshots allow a freshly started site to skip parsing its documents. A
+snapshot is written by the ``snapshot.py`` script after loading a sitemap
+completely (which also validates it) and contains all documents which have
+been loaded from files, in a form which is much faster to load than parsing
+the original files.
+
+When a :class:`~PyXWF.Site.Site` is created with a snapshot, documents from
+the snapshot are put into the document cache as long as their file has not
+been modified since the snapshot was written. If the sitemap itself has
+changed, the snapshot is ignored completely.
+
+Nothing but documents is stored: the node tree (and thus the index of paths
+and node IDs), blog post metadata and compiled templates are built when the
+site starts, as usual. Nodes refer to the site, its caches and compiled XSLT,
+none of which can be pickled. Post metadata is read from the restored
+documents, so it does not need to be stored separately.
+
+Snapshots are pickles, so they must only be loaded from trusted locations.
+"""
+from __future__ import unicode_literals, print_function, absolute_import
+
+import os
+import cPickle as pickle
+import logging
+
+from PyXWF.utils import ET, _F
+import PyXWF.utils as utils
+import PyXWF.Document as Document
+import PyXWF.Cache as Cache
+import PyXWF.Resource as Resource
+import PyXWF.Nodes as Nodes
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+def _dump_tree(element):
+    return ET.tostring(element) if element is not None else None
+
+def _load_tree(data):
+    return ET.fromstring(data) if data is not None else None
+
+def _dump_ext(ext):
+    # parsers either pass a single container element or a list of elements
+    if ET.iselement(ext):
+        return _dump_tree(ext)
+    return [_dump_tree(element) for element in ext]
+
+def _load_ext(data):
+    if isinstance(data, list):
+        return [_load_tree(element) for element in data]
+    return _load_tree(data)
+
+def document_to_state(doc):
+    """
+    Return a picklable representation of the
+    :class:`~PyXWF.Document.Document` *doc*.
+    """
+    return {
+        "title": doc.title,
+        "keywords": list(doc.keywords),
+        "links": [_dump_tree(link) for link in doc.links],
+        "body": _dump_tree(doc.body),
+        "etag": doc.etag,
+        "ext": _dump_ext(doc.ext),
+        "authors": doc.authors,
+        "date": doc.date,
+        "license": doc.license,
+        "hmeta": [_dump_tree(hmeta) for hmeta in doc.hmeta],
+        "description": doc.description
+    }
+
+def document_from_state(state):
+    """
+    Recreate a :class:`~PyXWF.Document.Document` from the result of
+    :func:`document_to_state`.
+    """
+    return Document.Document(
+        state["title"],
+        state["keywords"],
+        [_load_tree(link) for link in state["links"]],
+        _load_tree(state["body"]),
+        etag=state["etag"],
+        ext=_load_ext(state["ext"]),
+        authors=state["authors"],
+        date=state["date"],
+        license=state["license"],
+        hmeta=[_load_tree(hmeta) for hmeta in state["hmeta"]],
+        description=state["description"]
+    )
+
+def prepare(site):
+    """
+    Construct all lazily loaded nodes of *site* and load the resources of all
+    nodes in its tree, so that the document cache contains every document the
+    site needs. In contrast to the warm-up of a site, errors are not logged
+    but raised, which makes this usable to validate a sitemap.
+    """
+    proxies = site.lazy_node_proxies
+    i = 0
+    while i < len(proxies):
+        proxies[i].get_node()
+        i += 1
+
+    pending = [site.tree]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, Nodes.LazyNode):
+            node = node.get_node()
+        if isinstance(node, Resource.Resource):
+            node.threadsafe_update()
+        pending.extend(node.iter_children())
+
+def write(site, filename):
+    """
+    Write a snapshot of all documents in the document cache of *site* to
+    *filename*. Return the number of documents written.
+    """
+    documents = []
+    cache = site.file_document_cache
+    for path, entry in cache.entries.items():
+        if not isinstance(entry, Document.FileDocument):
+            continue
+        documents.append((
+            path,
+            entry.MIMEType,
+            entry.LastModified,
+            entry._kwargs,
+            document_to_state(entry.doc)
+        ))
+    snapshot = {
+        "version": FORMAT_VERSION,
+        "sitemap": (os.path.abspath(site.sitemap_file), site.sitemap_timestamp),
+        "root": site.root,
+        "documents": documents
+    }
+    with open(filename, "wb") as f:
+        pickle.dump(snapshot, f, pickle.HIGHEST_PROTOCOL)
+    return len(documents)
+
+def load(site, filename):
+    """
+    Put the documents from the snapshot at *filename* into the document cache
+    of *site*, skipping those whose files have been changed. Return the
+    number of documents taken from the snapshot, or :data:`None` if the
+    snapshot does not apply to *site* at all.
+    """
+    try:
+        with open(filename, "rb") as f:
+            snapshot = pickle.load(f)
+    except (IOError, EOFError, pickle.UnpicklingError) as err:
+        logger.warning(_F("Could not read snapshot {0}: {1}", filename, err))
+        return None
+    if snapshot.get("version") != FORMAT_VERSION:
+        logger.warning(_F("Snapshot {0} has an unsupported format", filename))
+        return None
+    sitemap = (os.path.abspath(site.sitemap_file), site.sitemap_timestamp)
+    if snapshot["sitemap"] != sitemap or \
+            snapshot["root"] != site.root:
+        logger.info(_F("Snapshot {0} is outdated, ignoring it", filename))
+        return None
+
+    cache = site.file_document_cache
+    loaded = 0
+    for path, mimetype, last_modified, kwargs, state in snapshot["documents"]:
+        if path in cache or \
+                utils.file_last_modified(path) != last_modified:
+            continue
+        try:
+            entry = Document.FileDocument.from_document(site, path, mimetype,
+                last_modified, document_from_state(state), **kwargs)
+        except (KeyError, ValueError, ET.XMLSyntaxError) as err:
+            logger.warning(_F("Could not restore {0} from snapshot: {1}",
+                              path, err))
+            continue
+        Cache.SubCache.__setitem__(cache, path, entry)
+        loaded += 1
+    logger.info(_F("Restored {0} of {1} documents from snapshot {2}",
+                   loaded, len(snapshot["documents"]), filename))
+    return loaded
@@ -71,7 +71,8 @@ class Template(Resource.Resource):
         """
         Do the final transformation on *document*. This includes adding
         keywords and author information, setting up the title, loading crumbs,
-        replacing local links and more.
+        replacing local links (see :meth:`~PyXWF.Site.Site.get_asset_url`) and
+        more.
         """
         template_args = self.site.get_template_arguments(ctx)
         template_args.update(document.get_template_arguments())
@@ -109,6 +110,9 @@ class Template(Resource.Resource):
                 head.append(helement)
         for link in newdoc.links:
             rel = link.get("rel")
+            href = link.get("href")
+            if href is not None:
+                link.set("href", self.site.get_asset_url(ctx, href))
             if rel == "script":
                 link = ET.Element(NS.XHTML.script, attrib={
                     NS.LocalR.src: link.get("href"),
@@ -147,6 +151,20 @@ class XSLTTemplate(Template):
         super(XSLTTemplate, self).__init__(site, filename)
         self._parse_template()
 
+    @classmethod
+    def from_template(cls, site, template):
+        """
+        Create an :class:`XSLTTemplate` for *site* which shares the already
+        parsed stylesheet of *template*, another :class:`XSLTTemplate`
+        (usually of another site). This is used to carry templates over to a
+        new :class:`~PyXWF.Site.Site` generation.
+        """
+        self = cls.__new__(cls)
+        super(XSLTTemplate, self).__init__(site, template.filename)
+        self._last_modified = template.LastModified
+        self.xslt_transform = template.xslt_transform
+        return self
+
     def update(self):
         last_modified = utils.file_last_modified(self.filename)
         if last_modified > self._last_modified:
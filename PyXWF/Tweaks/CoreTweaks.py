@@ -70,6 +70,9 @@ class CoreTweaks(Tweaks.TweakSitleton):
         site.disable_xhtml = False
         site.remove_xhtml_prefixes = False
         site.client_cache = True
+        site.lazy_nodes = True
+        site.warm_up = False
+        site.capability_header = None
 
     @classmethod
     def parse_tweak(cls, node, attribs, defaults={}):
@@ -94,12 +97,19 @@ class CoreTweaks(Tweaks.TweakSitleton):
             {
                 "cache-limit": Types.NumericRange(int, 0, None),
                 "pretty-print": Types.Typecasts.bool,
-                "client-cache": Types.Typecasts.bool
+                "client-cache": Types.Typecasts.bool,
+                "lazy-nodes": Types.Typecasts.bool,
+                "warm-up": Types.Typecasts.bool,
+                "capability-header": Types.NotNone
             }
         )
         self.site.pretty_print = results.get("pretty-print", self.site.pretty_print)
         self.site.cache.Limit = results.get("cache-limit", self.site.cache.Limit)
         self.site.client_cache = results.get("client-cache", self.site.client_cache)
+        self.site.lazy_nodes = results.get("lazy-nodes", self.site.lazy_nodes)
+        self.site.warm_up = results.get("warm-up", self.site.warm_up)
+        self.site.capability_header = results.get("capability-header",
+            self.site.capability_header)
 
     def tweak_compatibility(self, node):
         results = self.parse_tweak(
@@ -82,7 +82,7 @@ def NumericRange(typecast, min, max):
         range_str = "-∞..{0}".format(max)
         def tc(value):
             numeric = typecast(value)
-            if value > max:
+            if numeric > max:
                 raise ValueError("numeric value {0} out of bounds: {1}".format(
                     numeric, range_str
                 ))
@@ -91,7 +91,7 @@ def NumericRange(typecast, min, max):
         range_str = "{0}..∞".format(min)
         def tc(value):
             numeric = typecast(value)
-            if value < min:
+            if numeric < min:
                 raise ValueError("numeric value {0} out of bounds: {1}".format(
                     numeric, range_str
                 ))
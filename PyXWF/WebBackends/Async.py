@@ -0,0 +1,916 @@
+# File name: Async.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+"""
+An HTTP/1.1 server for WSGI applications (such as
+:class:`~PyXWF.WebBackends.WSGI.WSGISite`) built on :mod:`asyncore`.
+
+All connections are handled by a single event loop, so slow clients and idle
+keep-alive connections do not tie up threads. Requests are handed to a
+bounded pool of worker threads which run the synchronous application; the
+response bodies are streamed back to the clients by the event loop.
+
+Responses which shared caches would be allowed to use without revalidation
+(``s-maxage`` or ``max-age`` above zero) are kept for a short time (at most
+*fast_path_ttl*). Repeated requests for them, including conditional requests
+which can be answered with ``304 Not Modified``, are answered on the event
+loop without involving a worker thread.
+
+Worker threads producing a response block while more than
+:attr:`HTTPChannel.max_buffered_output` bytes are waiting to be sent to the
+client, so that large responses to slow clients are streamed instead of
+being read into memory as a whole.
+"""
+from __future__ import print_function, absolute_import
+
+import asyncore
+import asynchat
+import collections
+import errno
+import logging
+import os
+import Queue
+import socket
+import sys
+import time
+import urllib
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from StringIO import StringIO
+
+from PyXWF.utils import _F, threading
+import PyXWF.utils as utils
+import PyXWF.HTTPUtils as HTTPUtils
+
+logger = logging.getLogger(__name__)
+
+# headers of cached responses which are repeated in 304 responses
+_not_modified_headers = frozenset([b"cache-control", b"content-location",
+                                   b"date", b"etag", b"expires",
+                                   b"last-modified", b"vary"])
+
+_status_titles = {
+    400: b"Bad Request",
+    413: b"Request Entity Too Large",
+    431: b"Request Header Fields Too Large",
+    500: b"Internal Server Error",
+    503: b"Service Unavailable",
+}
+
+def make_socket(address, backlog=128, reuse_port=False):
+    """
+    Create a non-blocking TCP socket listening at *address*, a tuple
+    ``(host, port)``. With *reuse_port*, ``SO_REUSEPORT`` is set so that
+    several processes can listen at the same address with their own sockets
+    and the kernel balances connections between them.
+    """
+    host, port = address
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        # not exported by the socket module of Python 2, 15 on Linux
+        sock.setsockopt(socket.SOL_SOCKET,
+                        getattr(socket, "SO_REUSEPORT", 15), 1)
+    sock.bind(address)
+    sock.listen(backlog)
+    sock.setblocking(0)
+    return sock
+
+class ThreadPool(object):
+    """
+    A fixed number of *threads* running the callables passed to
+    :meth:`submit`. At most *queue_size* calls may be waiting for a thread.
+    """
+
+    def __init__(self, threads, queue_size):
+        self._queue = Queue.Queue(queue_size)
+        self._threads = []
+        for i in range(threads):
+            thread = threading.Thread(target=self._work,
+                                      name="PyXWF worker {0}".format(i))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            func, args = item
+            try:
+                func(*args)
+            except Exception as err:
+                logger.exception(_F("Unhandled error in worker: {0}", err))
+
+    def submit(self, func, *args):
+        """
+        Schedule ``func(*args)`` to be called in one of the threads. Return
+        False, instead of blocking, if too many calls are waiting already.
+        """
+        try:
+            self._queue.put_nowait((func, args))
+        except Queue.Full:
+            return False
+        return True
+
+    def shutdown(self):
+        """
+        Let the threads exit after all calls submitted so far have been
+        processed and wait for them.
+        """
+        for thread in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+
+class _Trigger(asyncore.file_dispatcher):
+    """
+    Run callables on the event loop on behalf of other threads, waking the
+    loop through a pipe.
+    """
+
+    def __init__(self, map):
+        read_fd, self._write_fd = os.pipe()
+        asyncore.file_dispatcher.__init__(self, read_fd, map=map)
+        # file_dispatcher works on a duplicate
+        os.close(read_fd)
+        self._pending = collections.deque()
+
+    def call(self, func, *args):
+        self._pending.append((func, args))
+        try:
+            os.write(self._write_fd, b"x")
+        except OSError as err:
+            if err.errno != errno.EAGAIN:
+                raise
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return False
+
+    def handle_read(self):
+        try:
+            self.recv(4096)
+        except (OSError, socket.error):
+            pass
+        while self._pending:
+            func, args = self._pending.popleft()
+            try:
+                func(*args)
+            except Exception as err:
+                logger.exception(_F("Error in event loop callback: {0}", err))
+
+    def close(self):
+        asyncore.file_dispatcher.close(self)
+        os.close(self._write_fd)
+
+
+class _CachedResponse(object):
+    def __init__(self, status, headers, body, vary, request_values, expires):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.vary = vary
+        self.request_values = request_values
+        self.expires = expires
+        self.last_modified = None
+        self.etag = None
+        for name, value in headers:
+            name = name.lower()
+            if name == b"last-modified":
+                try:
+                    self.last_modified = HTTPUtils.parse_http_date(value)
+                except (TypeError, ValueError):
+                    pass
+            elif name == b"etag":
+                tags = HTTPUtils.parse_entity_tags(value)
+                if tags and not value.startswith(b"W/"):
+                    self.etag = tags[0]
+
+    def is_not_modified(self, environ):
+        """
+        Return whether the conditional request described by *environ* can be
+        answered with ``304 Not Modified``.
+        """
+        if_none_match = environ.get("HTTP_IF_NONE_MATCH")
+        if if_none_match is not None:
+            # If-None-Match takes precedence over If-Modified-Since
+            tags = HTTPUtils.parse_entity_tags(if_none_match)
+            return self.etag is not None and \
+                (b"*" in tags or self.etag in tags)
+        if_modified_since = environ.get("HTTP_IF_MODIFIED_SINCE")
+        if not if_modified_since or self.last_modified is None:
+            return False
+        try:
+            since = HTTPUtils.parse_http_date(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return self.last_modified <= since
+
+
+class FastPathCache(object):
+    """
+    Keep recently sent responses which a shared cache would be allowed to
+    use without revalidation, so that the event loop can repeat them. A
+    response is kept for as long as its ``Cache-Control`` allows, but at most
+    *ttl* seconds. At most *size* URLs are remembered, each with any number
+    of variants (see the ``Vary`` response header).
+
+    Requests with credentials (``Authorization`` or ``Cookie``) or which ask
+    for an end-to-end reload are neither stored nor answered from the cache.
+    """
+
+    max_body_size = 1 << 20
+
+    def __init__(self, ttl, size):
+        self.ttl = ttl
+        self._entries = utils.LRUCache(size)
+
+    @staticmethod
+    def _key(environ):
+        return (environ.get("HTTP_HOST"), environ["PATH_INFO"],
+                environ["QUERY_STRING"])
+
+    @staticmethod
+    def _is_private_request(environ):
+        if "HTTP_AUTHORIZATION" in environ or "HTTP_COOKIE" in environ:
+            return True
+        cache_control = environ.get("HTTP_CACHE_CONTROL", b"").lower()
+        pragma = environ.get("HTTP_PRAGMA", b"").lower()
+        return b"no-cache" in cache_control or b"no-store" in cache_control \
+            or b"no-cache" in pragma
+
+    @staticmethod
+    def _get_lifetime(cache_control):
+        """
+        Return the number of seconds for which a shared cache may use a
+        response with the ``Cache-Control`` tokens *cache_control* (a dict
+        mapping the token names to their values) without revalidation.
+        """
+        if b"must-revalidate" in cache_control or \
+                b"proxy-revalidate" in cache_control:
+            return 0
+        for name in (b"s-maxage", b"max-age"):
+            if name in cache_control:
+                try:
+                    return max(0, int(cache_control[name].strip(b'" ')))
+                except (TypeError, ValueError):
+                    return 0
+        return 0
+
+    @staticmethod
+    def _request_values(environ, vary):
+        return tuple(
+            environ.get(b"HTTP_" + name.upper().replace(b"-", b"_"))
+            for name in vary)
+
+    def store(self, environ, status, headers, body):
+        """
+        Remember the response to the request described by *environ* if it is
+        cachable.
+        """
+        if environ["REQUEST_METHOD"] != b"GET" or \
+                len(body) > self.max_body_size or \
+                self._is_private_request(environ):
+            return
+        code = int(status.split(None, 1)[0])
+        if code not in (200, 203, 300, 301, 302, 303, 307, 410):
+            return
+        vary = []
+        cache_control = {}
+        for name, value in headers:
+            name = name.lower()
+            if name == b"set-cookie":
+                return
+            if name == b"cache-control":
+                for token in value.lower().split(b","):
+                    token_name, _, token_value = token.partition(b"=")
+                    cache_control[token_name.strip()] = token_value
+            if name == b"vary":
+                vary.extend(token.strip().lower()
+                            for token in value.split(b","))
+        if b"*" in vary or \
+                set(cache_control) & set([b"private", b"no-cache",
+                                          b"no-store"]):
+            return
+        lifetime = min(self.ttl, self._get_lifetime(cache_control))
+        if lifetime <= 0:
+            return
+        vary = tuple(vary)
+        response = _CachedResponse(status, headers, body, vary,
+            self._request_values(environ, vary), time.time() + lifetime)
+
+        key = self._key(environ)
+        variants = [variant for variant in self._entries.get(key, [])
+                    if variant.request_values !=
+                        self._request_values(environ, variant.vary)]
+        variants.append(response)
+        self._entries[key] = variants
+
+    def lookup(self, environ):
+        """
+        Return the cached response matching *environ*, if there is one.
+        """
+        if environ["REQUEST_METHOD"] not in (b"GET", b"HEAD") or \
+                "HTTP_RANGE" in environ or \
+                self._is_private_request(environ):
+            return None
+        variants = self._entries.get(self._key(environ))
+        if not variants:
+            return None
+        now = time.time()
+        for variant in variants:
+            if variant.expires > now and variant.request_values == \
+                    self._request_values(environ, variant.vary):
+                return variant
+        return None
+
+
+class HTTPChannel(asynchat.async_chat):
+    """
+    One client connection of an :class:`HTTPServer`. Requests are read on
+    the event loop and passed to the server one at a time: Pipelined requests
+    are queued until the response to the previous request has been pushed,
+    so that the responses are sent in the order of the requests.
+
+    The amount of data waiting to be sent is tracked, so that worker threads
+    can wait for it to drain (see :meth:`reserve_output`).
+    """
+
+    max_header_size = 65536
+    max_body_size = 1 << 24
+    # amount of buffered output above which workers are blocked
+    max_buffered_output = 1 << 20
+
+    def __init__(self, server, sock, addr):
+        asynchat.async_chat.__init__(self, sock, map=server.socket_map)
+        self.server = server
+        self.addr = addr
+        self.last_activity = time.time()
+        self.busy = False
+        # parsed requests (environ dicts) and error status codes waiting to
+        # be answered
+        self._queue = collections.deque()
+        self._failed = False
+        # bytes pushed or reserved for pushing which have not been sent yet
+        self._buffered = 0
+        self._output_cond = threading.Condition()
+        self._closed = False
+        self._reset()
+
+    def _reset(self):
+        self._incoming = []
+        self._incoming_size = 0
+        self._environ = None
+        self.set_terminator(b"\r\n\r\n")
+
+    def readable(self):
+        return not self.busy and asynchat.async_chat.readable(self)
+
+    def collect_incoming_data(self, data):
+        self.last_activity = time.time()
+        if self._failed:
+            return
+        self._incoming.append(data)
+        self._incoming_size += len(data)
+        if self._environ is None and \
+                self._incoming_size > self.max_header_size:
+            self._fail(431)
+
+    def _fail(self, code):
+        """
+        Stop reading requests and answer with an error status *code* after
+        the requests received before.
+        """
+        self._failed = True
+        self._incoming = []
+        self.set_terminator(None)
+        self._queue.append(code)
+        self._dispatch()
+
+    def _dispatch(self):
+        """
+        Pass the next queued request to the server, unless a request is being
+        answered.
+        """
+        if self.busy or not self._queue:
+            return
+        request = self._queue.popleft()
+        self.busy = True
+        if isinstance(request, int):
+            self.send_error(request)
+        else:
+            self.server.handle_request(self, request)
+
+    def found_terminator(self):
+        if self._failed:
+            return
+        data = b"".join(self._incoming)
+        self._incoming = []
+        self._incoming_size = 0
+        if self._environ is None:
+            if not data.strip():
+                # tolerate empty lines between pipelined requests
+                return
+            try:
+                self._environ = self._parse_head(data)
+            except ValueError as err:
+                logger.debug(_F("Malformed request from {0}: {1}",
+                                self.addr, err))
+                self._fail(400)
+                return
+            length = self._environ.get("CONTENT_LENGTH")
+            if length:
+                if length > self.max_body_size:
+                    self._fail(413)
+                    return
+                self.set_terminator(length)
+                return
+            body = b""
+        else:
+            body = data
+        environ = self._environ
+        environ["CONTENT_LENGTH"] = str(len(body)) if body else b""
+        environ["wsgi.input"] = StringIO(body)
+        self._reset()
+        self._queue.append(environ)
+        self._dispatch()
+
+    def _parse_head(self, data):
+        lines = data.split(b"\r\n")
+        request_line = lines[0].split()
+        if len(request_line) != 3:
+            raise ValueError("bad request line: {0!r}".format(lines[0]))
+        method, uri, protocol = request_line
+        if not protocol.startswith(b"HTTP/1."):
+            raise ValueError("unsupported protocol: {0!r}".format(protocol))
+        if b"://" in uri:
+            # absolute URI, strip scheme and host
+            uri = b"/" + uri.split(b"://", 1)[1].partition(b"/")[2]
+        path, _, query_string = uri.partition(b"?")
+
+        environ = {
+            "REQUEST_METHOD": method.upper(),
+            "SCRIPT_NAME": b"",
+            "PATH_INFO": urllib.unquote(path),
+            "QUERY_STRING": query_string,
+            "SERVER_NAME": self.server.server_name,
+            "SERVER_PORT": str(self.server.server_port),
+            "SERVER_PROTOCOL": protocol,
+            "REMOTE_ADDR": str(self.addr[0]) if self.addr else b"",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": b"http",
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": self.server.multiprocess,
+            "wsgi.run_once": False,
+        }
+        for line in lines[1:]:
+            name, sep, value = line.partition(b":")
+            if not sep:
+                raise ValueError("bad header line: {0!r}".format(line))
+            name = name.strip().upper().replace(b"-", b"_")
+            value = value.strip()
+            if name in (b"CONTENT_TYPE", b"CONTENT_LENGTH"):
+                key = name
+            else:
+                key = b"HTTP_" + name
+            if key in environ:
+                environ[key] += b"," + value
+            else:
+                environ[key] = value
+        if "CONTENT_LENGTH" in environ:
+            try:
+                environ["CONTENT_LENGTH"] = int(environ["CONTENT_LENGTH"])
+            except ValueError:
+                raise ValueError("bad Content-Length")
+            if environ["CONTENT_LENGTH"] < 0:
+                raise ValueError("bad Content-Length")
+        return environ
+
+    def push(self, data):
+        with self._output_cond:
+            self._buffered += len(data)
+        asynchat.async_chat.push(self, data)
+
+    def push_reserved(self, data):
+        """
+        Push *data* for which space has been reserved using
+        :meth:`reserve_output`.
+        """
+        asynchat.async_chat.push(self, data)
+
+    def reserve_output(self, size):
+        """
+        Wait until at most :attr:`max_buffered_output` bytes are waiting to
+        be sent and reserve *size* bytes for data which is then passed to
+        :meth:`push_reserved`. Return :data:`False` if the connection has been
+        closed instead.
+
+        This must be called from a worker thread, as it blocks until the event
+        loop has sent enough data.
+        """
+        with self._output_cond:
+            while self._buffered > self.max_buffered_output and \
+                    not self._closed:
+                self._output_cond.wait()
+            if self._closed:
+                return False
+            self._buffered += size
+            return True
+
+    def send(self, data):
+        sent = asynchat.async_chat.send(self, data)
+        if sent:
+            with self._output_cond:
+                self._buffered -= sent
+                if self._buffered <= self.max_buffered_output:
+                    self._output_cond.notify_all()
+        return sent
+
+    def keep_alive(self, environ):
+        """
+        Return whether the connection may be kept open after responding to the
+        request described by *environ*.
+        """
+        connection = environ.get("HTTP_CONNECTION", b"").lower()
+        if environ["SERVER_PROTOCOL"] == b"HTTP/1.0":
+            return b"keep-alive" in connection
+        return b"close" not in connection
+
+    def send_error(self, code):
+        """
+        Send a minimal response with status *code* and close the connection.
+        """
+        title = _status_titles[code]
+        body = b"{0:d} {1}\n".format(code, title)
+        self.push(b"HTTP/1.1 {0:d} {1}\r\n"
+                  b"Content-Type: text/plain\r\n"
+                  b"Content-Length: {2:d}\r\n"
+                  b"Connection: close\r\n\r\n{3}".format(
+                      code, title, len(body), body))
+        self.close_when_done()
+        self.busy = True
+        self._failed = True
+        self._queue.clear()
+        self.set_terminator(None)
+
+    def response_done(self, keep_alive):
+        """
+        Called on the event loop when the response to the current request has
+        been pushed completely.
+        """
+        self.last_activity = time.time()
+        self.busy = False
+        if not keep_alive:
+            self._failed = True
+            self._queue.clear()
+            self.set_terminator(None)
+            self.close_when_done()
+        self.server.request_done(self)
+        self._dispatch()
+
+    def handle_error(self):
+        logger.exception(_F("Error on connection from {0}", self.addr))
+        self.close()
+
+    def close(self):
+        with self._output_cond:
+            self._closed = True
+            self._output_cond.notify_all()
+        asynchat.async_chat.close(self)
+        self.server.channel_closed(self)
+
+
+class _Response(object):
+    """
+    Write the response of the application to a request to its channel. All
+    methods are called from a worker thread and forward the data to the event
+    loop. Writing blocks while the client is not receiving fast enough; if
+    the connection is closed meanwhile, :attr:`aborted` is set and further
+    data is dropped.
+    """
+
+    def __init__(self, server, channel, environ):
+        self.server = server
+        self.channel = channel
+        self.environ = environ
+        self.status = None
+        self.headers = None
+        self.headers_sent = False
+        self.chunked = False
+        self.keep_alive = channel.keep_alive(environ)
+        self.head = environ["REQUEST_METHOD"] == b"HEAD"
+        self.body = []
+        self.body_size = 0
+        self.aborted = False
+
+    def start_response(self, status, headers, exc_info=None):
+        if exc_info is not None:
+            try:
+                if self.headers_sent:
+                    raise exc_info[0], exc_info[1], exc_info[2]
+            finally:
+                exc_info = None
+            # the body written so far belongs to the replaced status
+            self.body = []
+            self.body_size = 0
+        elif self.status is not None:
+            raise AssertionError("start_response called twice")
+        self.status = status
+        self.headers = list(headers)
+        return self.write
+
+    def _push(self, data):
+        if self.aborted:
+            return
+        if not self.channel.reserve_output(len(data)):
+            self.aborted = True
+            return
+        self.server.call_soon(self.channel.push_reserved, data)
+
+    def _send_headers(self, complete_length=None):
+        names = set(name.lower() for name, _ in self.headers)
+        headers = list(self.headers)
+        if b"content-length" not in names:
+            if complete_length is not None:
+                headers.append((b"Content-Length", str(complete_length)))
+            elif self.environ["SERVER_PROTOCOL"] == b"HTTP/1.1":
+                headers.append((b"Transfer-Encoding", b"chunked"))
+                self.chunked = True
+            else:
+                # the end of the body can only be told by closing
+                self.keep_alive = False
+        if b"date" not in names:
+            headers.append((b"Date", HTTPUtils.format_http_date(
+                utils.datetime.utcnow())))
+        headers.append((b"Connection",
+                        b"keep-alive" if self.keep_alive else b"close"))
+        self._push(b"HTTP/1.1 " + self.status + b"\r\n" +
+                   b"".join(b"{0}: {1}\r\n".format(name, value)
+                            for name, value in headers) +
+                   b"\r\n")
+        self.headers_sent = True
+
+    def write(self, data):
+        if not data:
+            return
+        if self.body is not None:
+            self.body.append(data)
+            self.body_size += len(data)
+            if self.body_size <= FastPathCache.max_body_size:
+                # keep collecting, we may cache the response and can send
+                # a Content-Length
+                return
+            self._send_headers()
+            data = b"".join(self.body)
+            self.body = None
+        if self.head:
+            return
+        if self.chunked:
+            data = b"{0:x}\r\n{1}\r\n".format(len(data), data)
+        self._push(data)
+
+    def finish(self):
+        if self.body is not None:
+            body = b"".join(self.body)
+            self._send_headers(complete_length=len(body))
+            if body and not self.head:
+                self._push(body)
+            self.server.call_soon(self.server.fast_path.store,
+                self.environ, self.status, self.headers, body)
+        elif self.chunked and not self.head:
+            self._push(b"0\r\n\r\n")
+        self.server.call_soon(self.channel.response_done, self.keep_alive)
+
+    def fail(self):
+        """
+        Respond with 500 Internal Server Error, or just drop the connection
+        if parts of the response have been sent already.
+        """
+        if self.headers_sent:
+            self.server.call_soon(self.channel.close)
+            return
+        self.status = b"500 Internal Server Error"
+        self.headers = [(b"Content-Type", b"text/plain")]
+        self.body = [b"500 Internal Server Error\n"]
+        self.body_size = len(self.body[0])
+        self.finish()
+
+
+class HTTPServer(asyncore.dispatcher):
+    """
+    Serve the WSGI *application* on the listening socket *sock* (see
+    :func:`make_socket`).
+
+    *threads* worker threads run the application; if more than *queue_size*
+    requests are waiting for a thread, further requests are answered with
+    ``503 Service Unavailable``. Idle connections are closed after
+    *keep_alive_timeout* seconds. Responses which shared caches may use
+    without revalidation are repeated from memory for as long as that is
+    allowed, but at most *fast_path_ttl* seconds (set it to zero to disable
+    that); at most *fast_path_size* URLs are remembered.
+
+    If *max_requests* is set, the server stops gracefully (see :meth:`stop`)
+    after handling that many requests.
+    """
+
+    def __init__(self, application, sock,
+            threads=8,
+            queue_size=64,
+            keep_alive_timeout=15,
+            fast_path_ttl=1.0,
+            fast_path_size=256,
+            max_requests=None,
+            multiprocess=False):
+        self.socket_map = {}
+        asyncore.dispatcher.__init__(self, sock, map=self.socket_map)
+        self.accepting = True
+        self.application = application
+        self.server_name, self.server_port = sock.getsockname()[:2]
+        self.server_name = str(self.server_name)
+        self.keep_alive_timeout = keep_alive_timeout
+        self.max_requests = max_requests
+        self.multiprocess = multiprocess
+        self.requests = 0
+        self.fast_path = FastPathCache(fast_path_ttl, fast_path_size)
+        self._fast_path_enabled = fast_path_ttl > 0
+        self._channels = set()
+        self._stopping = False
+        self._trigger = _Trigger(self.socket_map)
+        self._pool = ThreadPool(threads, queue_size)
+
+    def call_soon(self, func, *args):
+        """
+        Call ``func(*args)`` on the event loop. This may be called from any
+        thread.
+        """
+        self._trigger.call(func, *args)
+
+    def handle_accept(self):
+        try:
+            pair = self.accept()
+        except socket.error as err:
+            # another process sharing the socket may have been faster
+            if err.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK,
+                               errno.ECONNABORTED):
+                return
+            raise
+        if pair is None:
+            return
+        sock, addr = pair
+        self._channels.add(HTTPChannel(self, sock, addr))
+
+    def handle_error(self):
+        logger.exception("Error on listening socket")
+
+    def channel_closed(self, channel):
+        self._channels.discard(channel)
+
+    def handle_request(self, channel, environ):
+        """
+        Respond to the request described by *environ* which arrived on
+        *channel*, either from the fast path cache or by running the
+        application in a worker thread.
+        """
+        self.requests += 1
+        if self._fast_path_enabled:
+            cached = self.fast_path.lookup(environ)
+            if cached is not None:
+                self._send_cached(channel, environ, cached)
+                return
+        response = _Response(self, channel, environ)
+        if not self._pool.submit(self._run_application, response):
+            logger.warning("All workers busy, rejecting request")
+            channel.send_error(503)
+
+    def _send_cached(self, channel, environ, cached):
+        keep_alive = channel.keep_alive(environ)
+        status, headers, body = cached.status, cached.headers, cached.body
+        if status.startswith(b"200 ") and cached.is_not_modified(environ):
+            status = b"304 Not Modified"
+            headers = [(name, value) for name, value in headers
+                       if name.lower() in _not_modified_headers]
+            body = None
+        headers = [(name, value) for name, value in headers
+                   if name.lower() not in (b"content-length",
+                                           b"connection")]
+        if body is not None:
+            headers.append((b"Content-Length", str(len(body))))
+        headers.append((b"Connection",
+                        b"keep-alive" if keep_alive else b"close"))
+        channel.push(b"HTTP/1.1 " + status + b"\r\n" +
+                     b"".join(b"{0}: {1}\r\n".format(name, value)
+                              for name, value in headers) +
+                     b"\r\n")
+        if body and environ["REQUEST_METHOD"] != b"HEAD":
+            channel.push(body)
+        channel.response_done(keep_alive)
+
+    def _run_application(self, response):
+        # runs in a worker thread
+        try:
+            result = self.application(response.environ,
+                                      response.start_response)
+            try:
+                for data in result:
+                    if data and response.status is None:
+                        raise AssertionError("write before start_response")
+                    response.write(data)
+                    if response.aborted:
+                        # the client is gone, stop producing the body
+                        break
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+            if response.status is None:
+                raise AssertionError("application did not call start_response")
+        except Exception as err:
+            logger.exception(_F("Error while running the application: {0}",
+                                err))
+            response.fail()
+        else:
+            response.finish()
+
+    def request_done(self, channel):
+        if self.max_requests is not None and \
+                self.requests >= self.max_requests and not self._stopping:
+            logger.info(_F("Served {0} requests, stopping", self.requests))
+            self.stop()
+
+    def stop(self):
+        """
+        Stop accepting connections and return from :meth:`serve_forever` once
+        all requests which are being processed have been answered. This may
+        be called from signal handlers.
+        """
+        self._stopping = True
+
+    def _close_idle_channels(self, timeout):
+        now = time.time()
+        for channel in list(self._channels):
+            if not channel.busy and not channel.writable() and \
+                    now - channel.last_activity > timeout:
+                channel.close()
+
+    def serve_forever(self, poll_interval=1.0):
+        """
+        Run the event loop until the server is stopped.
+        """
+        try:
+            while True:
+                if self._stopping:
+                    if self.accepting:
+                        self.del_channel()
+                        self.accepting = False
+                    self._close_idle_channels(0)
+                    if not self._channels:
+                        break
+                else:
+                    self._close_idle_channels(self.keep_alive_timeout)
+                asyncore.loop(timeout=poll_interval, map=self.socket_map,
+                              use_poll=True, count=1)
+        finally:
+            self._pool.shutdown()
+            for channel in list(self._channels):
+                channel.close()
+            self._trigger.close()
+
+def serve(application, address, **kwargs):
+    """
+    Serve the WSGI *application* at *address* (a tuple ``(host, port)``)
+    until interrupted. Keyword arguments are passed to :class:`HTTPServer`.
+    """
+    server = HTTPServer(application, make_socket(address), **kwargs)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,273 @@
+# File name: Prefork.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+"""
+A pre-forking process manager for :mod:`PyXWF.WebBackends.Async` servers.
+
+The master process loads the application and, if it is a
+:class:`~PyXWF.WebBackends.WSGI.WSGISite`, constructs all nodes and loads
+all documents of its site before forking the workers. The workers thus start
+with the complete site in memory, shared copy-on-write with the master,
+instead of each loading it on its own.
+
+The master reacts to these signals:
+
+``SIGHUP``
+    Load the application again and replace all workers by workers serving the
+    new application. The old workers finish the requests they are processing
+    before they exit. If loading fails, the old workers are kept.
+
+``SIGTERM``, ``SIGINT``
+    Let all workers finish the requests they are processing and exit.
+"""
+from __future__ import print_function, absolute_import
+
+import errno
+import gc
+import logging
+import os
+import signal
+import time
+
+from PyXWF.utils import _F, threading
+import PyXWF.Snapshot as Snapshot
+import PyXWF.WebBackends.Async as Async
+
+logger = logging.getLogger(__name__)
+
+def preload(application):
+    """
+    Load everything the site of *application* would otherwise load lazily,
+    if *application* is a :class:`~PyXWF.WebBackends.WSGI.WSGISite`.
+    Errors are logged; the affected nodes are then loaded by the workers.
+    """
+    site = getattr(application, "Site", None)
+    if site is None:
+        return
+    logger.info("Preloading site")
+    try:
+        Snapshot.prepare(site)
+    except Exception as err:
+        logger.exception(_F("While preloading the site: {0}", err))
+    # the warm-up thread of the site may still be busy; forking while it
+    # holds locks would leave them locked in the workers
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread() and \
+                thread.name.startswith("PyXWF"):
+            thread.join()
+    gc.collect()
+
+class PreforkServer(object):
+    """
+    Serve the WSGI application returned by *load_application* (which is
+    called without arguments) at *address* with *workers* processes, each
+    running an :class:`~PyXWF.WebBackends.Async.HTTPServer` with *threads*
+    worker threads.
+
+    The workers share one listening socket created by the master, or, with
+    *reuse_port*, open their own sockets with ``SO_REUSEPORT``. A worker
+    which has handled *max_requests* requests exits gracefully and is
+    replaced. Workers which do not exit within *graceful_timeout* seconds
+    after being asked to are killed.
+
+    Further keyword arguments are passed to the
+    :class:`~PyXWF.WebBackends.Async.HTTPServer`.
+    """
+
+    def __init__(self, load_application, address,
+            workers=2,
+            threads=8,
+            max_requests=None,
+            reuse_port=False,
+            graceful_timeout=30,
+            **kwargs):
+        super(PreforkServer, self).__init__()
+        self.load_application = load_application
+        self.address = address
+        self.workers = workers
+        self.threads = threads
+        self.max_requests = max_requests
+        self.reuse_port = reuse_port
+        self.graceful_timeout = graceful_timeout
+        self.server_kwargs = kwargs
+        self.application = None
+        self._socket = None
+        self._workers = {}
+        self._retiring = {}
+        self._reload_requested = False
+        self._stop_requested = False
+        self._spawn_after = 0
+
+    def _load(self):
+        application = self.load_application()
+        preload(application)
+        return application
+
+    def _run_worker(self):
+        server = None
+        stopping = []
+        def stop(signum, frame):
+            stopping.append(signum)
+            if server is not None:
+                server.stop()
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        status = 1
+        try:
+            sock = self._socket
+            if sock is None:
+                sock = Async.make_socket(self.address, reuse_port=True)
+            server = Async.HTTPServer(self.application, sock,
+                threads=self.threads,
+                max_requests=self.max_requests,
+                multiprocess=True,
+                **self.server_kwargs)
+            if stopping:
+                server.stop()
+            server.serve_forever()
+            status = 0
+        except Exception as err:
+            logger.exception(_F("Worker failed: {0}", err))
+        finally:
+            logging.shutdown()
+            os._exit(status)
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker()
+        logger.debug(_F("Started worker {0}", pid))
+        self._workers[pid] = time.time()
+
+    def _signal_workers(self, pids, signum):
+        for pid in pids:
+            try:
+                os.kill(pid, signum)
+            except OSError as err:
+                if err.errno != errno.ESRCH:
+                    raise
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except OSError as err:
+                if err.errno == errno.ECHILD:
+                    return
+                raise
+            if pid == 0:
+                return
+            self._retiring.pop(pid, None)
+            started = self._workers.pop(pid, None)
+            if started is None:
+                continue
+            if status != 0:
+                logger.error(_F("Worker {0} exited with status {1}",
+                                pid, status))
+                # do not respawn crashing workers in a tight loop
+                self._spawn_after = time.time() + 1
+            else:
+                logger.info(_F("Worker {0} exited", pid))
+
+    def _retire_workers(self):
+        now = time.time()
+        pids = [pid for pid in self._workers]
+        self._signal_workers(pids, signal.SIGTERM)
+        for pid in pids:
+            self._retiring[pid] = now
+        self._workers = {}
+
+    def _kill_overdue_workers(self):
+        deadline = time.time() - self.graceful_timeout
+        overdue = [pid for pid, retired in self._retiring.items()
+                   if retired < deadline]
+        if overdue:
+            logger.warning(_F("Killing workers {0}", overdue))
+            self._signal_workers(overdue, signal.SIGKILL)
+
+    def _reload(self):
+        logger.info("Reloading the application")
+        try:
+            application = self._load()
+        except Exception as err:
+            logger.exception(_F("Reloading failed, keeping the old workers: "
+                                "{0}", err))
+            return
+        self.application = application
+        self._retire_workers()
+
+    def _on_reload_signal(self, signum, frame):
+        self._reload_requested = True
+
+    def _on_stop_signal(self, signum, frame):
+        self._stop_requested = True
+
+    def _on_child_signal(self, signum, frame):
+        # only there to interrupt the sleep of the main loop
+        pass
+
+    def serve_forever(self):
+        """
+        Load the application, start the workers and keep them running until
+        ``SIGTERM`` or ``SIGINT`` is received.
+        """
+        self.application = self._load()
+        if not self.reuse_port:
+            self._socket = Async.make_socket(self.address)
+        signal.signal(signal.SIGHUP, self._on_reload_signal)
+        signal.signal(signal.SIGTERM, self._on_stop_signal)
+        signal.signal(signal.SIGINT, self._on_stop_signal)
+        signal.signal(signal.SIGCHLD, self._on_child_signal)
+        logger.info(_F("Master {0} serving at {1} with {2} workers",
+                       os.getpid(), self.address, self.workers))
+        try:
+            while not self._stop_requested:
+                self._reap()
+                if self._reload_requested:
+                    self._reload_requested = False
+                    self._reload()
+                self._kill_overdue_workers()
+                if time.time() >= self._spawn_after:
+                    while len(self._workers) < self.workers:
+                        self._spawn()
+                time.sleep(1)
+        finally:
+            logger.info("Stopping workers")
+            self._retire_workers()
+            while self._retiring:
+                self._reap()
+                self._kill_overdue_workers()
+                time.sleep(0.1)
+            if self._socket is not None:
+                self._socket.close()
+
+def serve(load_application, address, **kwargs):
+    """
+    Run a :class:`PreforkServer` for the application returned by
+    *load_application* at *address* (a tuple ``(host, port)``). Keyword
+    arguments are passed to the :class:`PreforkServer`.
+    """
+    PreforkServer(load_application, address, **kwargs).serve_forever()
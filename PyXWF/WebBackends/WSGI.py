@@ -32,18 +32,64 @@ except ImportError:
     from cStringIO import StringIO
 
 from PyXWF.utils import _F
-import PyXWF.utils as utils
 import PyXWF.AcceptHeaders as AcceptHeaders
 import PyXWF.Errors as Errors
 import PyXWF.Context as Context
+import PyXWF.Message as Message
 import PyXWF.Site as Site
 import PyXWF.HTTPUtils as HTTPUtils
+import PyXWF.ContentTypes as ContentTypes
 
 logger = logging.getLogger(__name__)
 
+class LazyEnvironValue(object):
+    """
+    Descriptor for attributes of :class:`WSGIContext` which are derived from
+    the WSGI environ only when they are first read. On the first read, the
+    method named *loader* is called, which must return a dict mapping
+    attribute names to values; it may provide values for several lazy
+    attributes at once. Attributes which have been assigned to already keep
+    their values.
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        values = instance.__dict__
+        try:
+            return values[self.name]
+        except KeyError:
+            pass
+        for name, value in getattr(instance, self.loader)().items():
+            values.setdefault(name, value)
+        return values[self.name]
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.name] = value
+
 class WSGIContext(Context.Context):
+    _request_headers = LazyEnvironValue("_request_headers", "_load_request_headers")
+    _hostname = LazyEnvironValue("_hostname", "_load_hostname")
+    _accept = LazyEnvironValue("_accept", "_load_accept_headers")
+    _accept_charset = LazyEnvironValue("_accept_charset", "_load_accept_headers")
+    _accept_language = LazyEnvironValue("_accept_language", "_load_accept_headers")
+    _if_modified_since = LazyEnvironValue("_if_modified_since",
+                                          "_load_if_modified_since")
+    _can_use_xhtml = LazyEnvironValue("_can_use_xhtml", "_load_html_content_type")
+    _useragent_profile = LazyEnvironValue("_useragent_profile", "_load_user_agent")
+    _useragent_name = LazyEnvironValue("_useragent_name", "_load_user_agent")
+    _useragent_version = LazyEnvironValue("_useragent_version", "_load_user_agent")
+    _html5_support = LazyEnvironValue("_html5_support", "_load_user_agent")
+    _prefixed_xhtml_support = LazyEnvironValue("_prefixed_xhtml_support",
+                                               "_load_user_agent")
+    _is_mobile_client = LazyEnvironValue("_is_mobile_client", "_load_user_agent")
+
     @classmethod
-    def wsgi_parse_environ(self, environ):
+    def wsgi_parse_http_headers(cls, environ):
         http_headers = {}
         httpiter = itertools.ifilter(
             lambda x: x[0].startswith(b"HTTP_"),
@@ -51,86 +97,98 @@ class WSGIContext(Context.Context):
         for key, value in httpiter:
             header = key[5:].lower().replace(b"_", b"-")
             http_headers[header] = value
-
-        hostname = http_headers.get("host", None) or environ.get("SERVER_NAME", None)
-        try:
-            server_port = int(environ.get("SERVER_PORT"))
-        except (ValueError, TypeError):
-            server_port = None
-        relpath = environ.get("PATH_INFO").decode("utf-8")
-        logging.debug(environ)
-        url_scheme = environ.get("wsgi.url_scheme", environ.get("wsgi.scheme", "http"))
-        method = environ.get("REQUEST_METHOD")
-        query_string = environ.get("QUERY_STRING", "")
-        fulluri = environ.get("SCRIPT_NAME").decode("utf-8") + relpath + \
-            (("?" + query_string) if query_string else "")
-        return (http_headers, method, url_scheme, hostname, server_port,
-                fulluri, relpath, query_string)
+        return http_headers
 
     def __init__(self, environ, start_response):
         super(WSGIContext, self).__init__()
-        self._start_response = start_response
-        self._request_headers, \
-        self._method, \
-        self._scheme, \
-        self._hostname, \
-        self._server_port, \
-        self._fulluri, \
-        self._path, \
-        self._query_string, \
-            = self.wsgi_parse_environ(environ)
-
-        self._parse_accept_headers()
-        self._parse_non_accept_headers()
-
-        self._determine_html_content_type()
+        # drop the defaults set up by Context, the values are loaded from the
+        # environ when they are first needed
+        for name, value in vars(WSGIContext).items():
+            if isinstance(value, LazyEnvironValue):
+                self.__dict__.pop(name, None)
 
-        logger.debug(_F("request uri: {}", self.get_reconstructed_uri("/.../")))
-
-    def _load_preference_list(self, headername, preflist, default):
+        self._environ = environ
+        self._start_response = start_response
         try:
-            headervalue = self._request_headers[headername]
-        except KeyError:
-            headervalue = default
-        preflist.append_header(headervalue)
+            self._server_port = int(environ.get("SERVER_PORT"))
+        except (ValueError, TypeError):
+            self._server_port = None
+        self._path = environ.get("PATH_INFO").decode("utf-8")
+        self._scheme = environ.get("wsgi.url_scheme",
+                                   environ.get("wsgi.scheme", "http"))
+        self._method = environ.get("REQUEST_METHOD")
+        self._query_string = environ.get("QUERY_STRING", "")
+        self._fulluri = environ.get("SCRIPT_NAME").decode("utf-8") + \
+            self._path + \
+            (("?" + self._query_string) if self._query_string else "")
 
-    def _parse_if_present(self, headername, parsefunc, *args, **kwargs):
-        try:
-            headervalue = self._request_headers[headername]
-        except KeyError:
-            return None
-        else:
-            return parsefunc(headervalue, *args, **kwargs)
+        logger.debug(_F("request uri: {0}", self._fulluri))
 
-    def _parse_accept_headers(self):
-        self._accept = AcceptHeaders.AcceptPreferenceList()
-        self._load_preference_list("accept", self._accept, "*/*")
+    def _load_request_headers(self):
+        with self.timed("parse-headers"):
+            return {
+                "_request_headers": self.wsgi_parse_http_headers(self._environ)
+            }
 
-        self._accept_charset = AcceptHeaders.CharsetPreferenceList()
-        self._load_preference_list("accept-charset", self._accept_charset, "")
-        self._accept_charset.inject_rfc_values()
+    def _load_hostname(self):
+        return {
+            "_hostname": self._request_headers.get("host", None) or \
+                         self._environ.get("SERVER_NAME", None)
+        }
 
-        self._accept_language = AcceptHeaders.LanguagePreferenceList()
-        self._load_preference_list("accept-language", self._accept_language, "*")
+    def _load_preference_list(self, headername, preflist_class, default):
+        headervalue = self._request_headers.get(headername, default)
+        return preflist_class.from_header(headervalue)
 
-    def _parse_non_accept_headers(self):
-        self._parse_if_present("if-modified-since", self._parse_if_modified_since)
-        self._parse_if_present("user-agent", self._parse_user_agent)
+    def _load_accept_headers(self):
+        with self.timed("parse-accept"):
+            return {
+                "_accept": self._load_preference_list("accept",
+                    AcceptHeaders.AcceptPreferenceList, "*/*"),
+                "_accept_charset": self._load_preference_list(
+                    "accept-charset",
+                    AcceptHeaders.CharsetPreferenceList, ""),
+                "_accept_language": self._load_preference_list(
+                    "accept-language",
+                    AcceptHeaders.LanguagePreferenceList, "*")
+            }
 
-    def _parse_if_modified_since(self, value):
-        try:
-            self._if_modified_since = HTTPUtils.parse_http_date(value)
-        except Exception as err:
-            raise Errors.BadRequest(message=str(err))
+    def _load_html_content_type(self):
+        with self.timed("negotiate-html"):
+            html_content_type = self._determine_html_content_type()
+        return {"_can_use_xhtml": html_content_type == ContentTypes.xhtml}
 
-    def _parse_user_agent(self, value):
-        logger.debug(_F("Parsing user agent: {0}", value))
-        self._useragent_name, \
-        self._useragent_version \
-            = utils.guess_useragent(value)
+    def _load_if_modified_since(self):
+        value = self._request_headers.get("if-modified-since")
+        if value is None:
+            return {"_if_modified_since": None}
+        with self.timed("parse-if-modified-since"):
+            try:
+                return {"_if_modified_since": HTTPUtils.parse_http_date(value)}
+            except Exception as err:
+                raise Errors.BadRequest(message=str(err))
 
-        self.useragent_support(self._useragent_name, self._useragent_version)
-        self._is_mobile_client = utils.is_mobile_useragent(value)
+    def _load_user_agent(self):
+        value = self._request_headers.get("user-agent")
+        if value is None:
+            return {
+                "_useragent_profile": None,
+                "_useragent_name": None,
+                "_useragent_version": None,
+                "_html5_support": False,
+                "_prefixed_xhtml_support": False,
+                "_is_mobile_client": False
+            }
+        with self.timed("parse-user-agent"):
+            profile = self.get_useragent_profile(value)
+        return {
+            "_useragent_profile": profile,
+            "_useragent_name": profile.name,
+            "_useragent_version": profile.version,
+            "_html5_support": profile.html5,
+            "_prefixed_xhtml_support": profile.prefixed_xhtml,
+            "_is_mobile_client": profile.mobile
+        }
 
     def _require_query(self):
         if self._query_data is None:
@@ -143,10 +201,27 @@ class WSGIContext(Context.Context):
         cookie_value = self._request_headers.get("cookie", b"")
         self._cookies = self._parse_cookie_header(cookie_value)
 
+    def _get_file_body(self, message):
+        if message.data is not None:
+            return message.data
+        f = message.open()
+        file_wrapper = self._environ.get("wsgi.file_wrapper")
+        # the server may send the whole remaining file, so the wrapper can
+        # only be used for complete files
+        if file_wrapper is not None and message.Complete:
+            return file_wrapper(f, message.block_size)
+        return message.iter_blocks(f)
+
     def send_response(self, message):
-        body = self.get_encoded_body(message)
-        if body is not None:
-            self.set_response_content_type(message.MIMEType, message.Encoding)
+        if isinstance(message, Message.FileMessage):
+            body = self._get_file_body(message)
+            self.set_response_content_type(message.MIMEType, None)
+            self.set_response_header(b"Content-Length", message.length)
+        else:
+            body = self.get_encoded_body(message)
+            if body is not None:
+                self.set_response_content_type(message.MIMEType,
+                                               message.Encoding)
         self._set_cache_status(message.Status.code == 304)
         self._set_property_headers()
         response_headers = [
@@ -168,7 +243,9 @@ class WSGIContext(Context.Context):
             response_headers
         )
         if hasattr(body, "__iter__") and not isinstance(body, str):
-            return iter(body)
+            # a wsgi.file_wrapper must be returned as it is to allow the
+            # server to recognize it
+            return body
         elif body is None:
             return []
         else:
@@ -176,16 +253,64 @@ class WSGIContext(Context.Context):
 
 
 class WSGISite(Site.Site):
-    def __init__(self, sitemap_file, **kwargs):
-        super(WSGISite, self).__init__(sitemap_file, **kwargs)
+    """
+    WSGI application serving the site defined by *sitemap_file*. Changes of
+    the sitemap are picked up by building a new site in the background and
+    swapping it in once it is ready, unless *background_reload* is false
+    (see :class:`~PyXWF.Site.SiteGenerations`). Further keyword arguments
+    are passed to :class:`~PyXWF.Site.Site`.
+
+    The application object itself is the first generation. Later generations
+    are instances of the same class, constructed with the same arguments and
+    with *previous* set to the generation they replace; requests passed to
+    any of them are handled by the current one. Attributes assigned to the
+    application object after it has been constructed are not carried over to
+    later generations.
+    """
+
+    def __init__(self, sitemap_file, background_reload=True, previous=None,
+            auto_reload=None, **kwargs):
+        if auto_reload is None:
+            auto_reload = not background_reload
+        super(WSGISite, self).__init__(sitemap_file, previous=previous,
+            auto_reload=auto_reload, **kwargs)
+        if previous is not None:
+            self._generations = previous._generations
+        else:
+            self._generations = Site.SiteGenerations(sitemap_file,
+                site_class=type(self), background=background_reload,
+                current=self, **kwargs)
+
+    @property
+    def Site(self):
+        """
+        The generation currently serving requests.
+        """
+        return self._generations.Current
 
     def get_response(self, environ, start_response):
+        # all of the request is handled by the same site, even if a new
+        # one is swapped in meanwhile
+        site = self._generations.get_site()
+        ctx = WSGIContext(environ, start_response)
+        try:
+            return site._respond(ctx)
+        finally:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(_F("{0} {1}: {2}", ctx.Method, ctx.FullURI,
+                    ", ".join("{0}={1:.2f}ms".format(phase, seconds*1000)
+                              for phase, seconds
+                              in sorted(ctx.timings.items()))))
+
+    def _respond(self, ctx):
         try:
+            # the request is parsed lazily, so malformed requests are only
+            # noticed while handling them
             try:
-                ctx = WSGIContext(environ, start_response)
+                with ctx.timed("handle"):
+                    message = self.handle(ctx)
             except Errors.MalformedHTTPRequest as err:
                 raise Errors.BadRequest(unicode(err))
-            message = self.handle(ctx)
         except Errors.NotModified as status:
             logger.debug(_F(
                 "Not Modified: IfModifiedSince={0}, LastModified={1}, Cachable={2}",
@@ -218,9 +343,25 @@ class WSGISite(Site.Site):
             else:
                 return ctx.send_empty_response(status)
         else:
-            return ctx.send_response(message)
+            with ctx.timed("send"):
+                return ctx.send_response(message)
 
-    def __call__(self, environ, start_response):
-        for item in self.get_response(environ, start_response):
+    def _iter_response(self, result):
+        for item in result:
             yield item
         gc.collect()
+
+    def __call__(self, environ, start_response):
+        result = self.get_response(environ, start_response)
+        file_wrapper = environ.get("wsgi.file_wrapper")
+        if file_wrapper is not None:
+            try:
+                is_file = isinstance(result, file_wrapper)
+            except TypeError:
+                # not a class
+                is_file = False
+            if is_file:
+                # pass files on to the server untouched, so it can send them
+                # efficiently
+                return result
+        return self._iter_response(result)
@@ -31,7 +31,6 @@ import WebStack
 from WebStack.Generic import EndOfResponse, ContentType
 
 from PyXWF.utils import ET
-import PyXWF.utils as utils
 import PyXWF.Errors as Errors
 import PyXWF.Site as Site
 import PyXWF.Context as Context
@@ -98,11 +97,7 @@ class WebStackContext(Context.Context):
             self._html5_support = False
             return
 
-        header = values[0]
-        useragent, version = utils.guess_useragent(header)
-        self._useragent_name, self._useragent_version = useragent, version
-        self.useragent_support(useragent, version)
-        self._is_mobile_client = utils.is_mobile_useragent(header)
+        self.set_useragent_profile(self.get_useragent_profile(values[0]))
 
     def _require_query(self):
         self._query_data = self._transaction.get_fields_from_path()
@@ -24,7 +24,7 @@
 # authors named in the AUTHORS file.
 ########################################################################
 
-import abc, os, re, logging
+import abc, os, re, logging, collections
 from datetime import datetime
 
 import lxml.etree as ET
@@ -200,6 +200,24 @@ useragent_classes = {
     "seekbot": "indexer",
 }
 
+_literal_prefix_re = re.compile(r"([^\\\[\](){}?*+.^$|]*)(?![?*{])")
+
+def _required_literal(regex):
+    """
+    Return the literal text every match of the compiled *regex* starts with,
+    which may be empty.
+    """
+    if "|" in regex.pattern:
+        return ""
+    return _literal_prefix_re.match(regex.pattern).group(1)
+
+# before running a regex, check whether the literal text it needs is present
+# at all; this rules out nearly all of them for any given header
+_useragent_matchers = [
+    (agentname, _required_literal(regex), regex)
+    for agentname, regex in useragent_regexes
+]
+
 def guess_useragent(headerval):
     """
     Return a tuple ``(useragent, version)``, where *useragent* is one of:
@@ -222,7 +240,9 @@ def guess_useragent(headerval):
     version could not be determined reliably. The version number is represented
     as a floating point value.
     """
-    for agentname, regex in useragent_regexes:
+    for agentname, literal, regex in _useragent_matchers:
+        if literal not in headerval:
+            continue
         m = regex.search(headerval)
         if m:
             groups = m.groupdict()
@@ -265,3 +285,48 @@ except ImportError as err:
     logging.warning(_F("Could not import blist: {0}", err))
     logging.warning("Will fallback to surrogate; sortedlist will be slow")
     import PyXWF.Surrogates.blist as blist
+
+class LRUCache(object):
+    """
+    A thread-safe mapping which holds at most *maxsize* items. If more are
+    added, the least recently used ones are dropped. Only :meth:`get`, item
+    assignment, ``in``, :func:`len` and :meth:`clear` are supported.
+
+    This is meant for memoizing results computed from values sent by clients
+    (like HTTP header values), where only a few distinct values are seen
+    frequently but the number of possible values is unbounded.
+    """
+
+    def __init__(self, maxsize=256):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._entries.pop(key)
+            except KeyError:
+                return default
+            self._entries[key] = value
+            return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -25,10 +25,9 @@
 ########################################################################
 import argparse
 import importlib
+import os
 import sys
 
-from wsgiref.simple_server import make_server
-
 if __name__=="__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument(
@@ -46,6 +45,43 @@ if __name__=="__main__":
         metavar="NUMBER",
         help="Port number to listen on, defaults to 8080."
     )
+    parser.add_argument(
+        "-H", "--host",
+        default="",
+        metavar="ADDRESS",
+        help="Address to listen on, defaults to all addresses."
+    )
+    parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        default=0,
+        metavar="NUMBER",
+        help="Number of worker processes to fork. The sitemap is loaded"
+             " before forking and SIGHUP reloads the application. With 0"
+             " (the default), requests are served by this process."
+    )
+    parser.add_argument(
+        "-t", "--threads",
+        type=int,
+        default=8,
+        metavar="NUMBER",
+        help="Number of threads handling requests in each process, defaults"
+             " to 8."
+    )
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=None,
+        metavar="NUMBER",
+        help="Replace a worker process after it has handled NUMBER requests."
+    )
+    parser.add_argument(
+        "--reuse-port",
+        action="store_true",
+        default=False,
+        help="Let each worker process open its own socket using"
+             " SO_REUSEPORT instead of sharing one socket."
+    )
     parser.add_argument(
         "-n", "--application-name",
         default="application",
@@ -62,13 +98,29 @@ if __name__=="__main__":
 
     sys.path.extend(args.paths)
 
-    globals_dict = globals()
-    locals_dict = {}
-    execfile(args.wsgi_module, globals_dict, locals_dict)
+    import PyXWF.WebBackends.Async as Async
+    import PyXWF.WebBackends.Prefork as Prefork
+
+    # WSGI scripts may chdir relative to the working directory they are
+    # started in, so reloads have to start there too
+    cwd = os.getcwd()
 
-    app = locals_dict[args.application_name]
+    def load_application():
+        os.chdir(cwd)
+        globals_dict = globals()
+        locals_dict = {}
+        execfile(args.wsgi_module, globals_dict, locals_dict)
+        return locals_dict[args.application_name]
 
-    httpd = make_server('', args.port, app)
+    address = (args.host, args.port)
     print("Your website is now reachable at:")
-    print("  http://localhost:{0}/".format(args.port))
-    httpd.serve_forever()
+    print("  http://{0}:{1}/".format(args.host or "localhost", args.port))
+    if args.workers > 0:
+        Prefork.serve(load_application, address,
+            workers=args.workers,
+            threads=args.threads,
+            max_requests=args.max_requests,
+            reuse_port=args.reuse_port)
+    else:
+        Async.serve(load_application(), address,
+            threads=args.threads)
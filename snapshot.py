@@ -0,0 +1,87 @@
+#!/usr/bin/python2
+# File name: snapshot.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+from __future__ import print_function
+
+import argparse
+import logging
+import os
+import sys
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(
+        description="Load and validate a sitemap and write a snapshot of its \
+documents, which sites can be started from faster."
+    )
+    parser.add_argument(
+        "--add-path",
+        metavar="PATH",
+        action="append",
+        dest="paths",
+        default=[],
+        help="Add path to PYTHONPATH. May be passed multiple times.",
+    )
+    parser.add_argument(
+        "--default-url-root",
+        metavar="URL",
+        default=None,
+        help="URL root to use if the sitemap does not specify one."
+    )
+    parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="Log what is being loaded."
+    )
+    parser.add_argument(
+        "sitemap",
+        metavar="SITEMAP",
+        help="The sitemap XML file to load."
+    )
+    parser.add_argument(
+        "output",
+        metavar="SNAPSHOT",
+        help="File to write the snapshot to."
+    )
+
+    args = parser.parse_args()
+
+    sys.path.extend(args.paths)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    import PyXWF.Site as Site
+    import PyXWF.Snapshot as Snapshot
+
+    sitemap = os.path.abspath(args.sitemap)
+    try:
+        site = Site.Site(sitemap, default_url_root=args.default_url_root,
+                         auto_reload=False)
+        Snapshot.prepare(site)
+    except Exception as err:
+        print("{0}: invalid site: {1}".format(args.sitemap, err),
+              file=sys.stderr)
+        sys.exit(1)
+
+    count = Snapshot.write(site, args.output)
+    print("Wrote {0} documents to {1}".format(count, args.output))
@@ -23,6 +23,7 @@
 # authors named in the AUTHORS file.
 ########################################################################
 import os
+import time
 import tempfile
 import shutil
 import unittest
@@ -35,6 +36,8 @@ import PyXWF.Context as Context
 import PyXWF.Namespaces as NS
 import PyXWF.Resource as Resource
 
+import PyWeblog
+
 try:
     from cStringIO import StringIO
 except ImportError:
@@ -96,7 +99,8 @@ class MockedContext(Context.Context):
             accept="application/xhtml+xml",
             accept_charset="utf-8",
             if_modified_since=None,
-            query_data={}):
+            query_data={},
+            request_headers={}):
         super(MockedContext, self).__init__()
         self._method = method
         self._path = path
@@ -109,6 +113,9 @@ class MockedContext(Context.Context):
         self._determine_html_content_type()
         self._if_modified_since = if_modified_since
         self._query_data = query_data
+        self._request_headers = dict(
+            (name.lower(), value)
+            for name, value in request_headers.items())
 
     @property
     def Out(self):
@@ -259,6 +266,161 @@ class SiteTest(DynamicSiteTest):
         del self.site
         super(SiteTest, self).tearDown()
 
+class BlogSiteTest(DynamicSiteTest):
+    """
+    A site with a blog below ``blog/``, which has a list of recent posts, a
+    tag directory and an Atom feed. Posts are written to the ``posts``
+    directory using :meth:`write_post`; posts written in
+    :meth:`setUpPosts` exist before the site is loaded. The blog node can be
+    customized in :meth:`setUpBlog`.
+
+    Unlike the other site tests, this uses the real timestamps of the files,
+    as the blog index depends on them. Each written post is dated ten
+    seconds after the previous one.
+    """
+
+    list_template_xml = """<?xml version="1.0" encoding="utf-8" ?>
+<xsl:stylesheet
+        version='1.0'
+        xmlns:py="http://pyxwf.zombofant.net/xmlns/documents/pywebxml"
+        xmlns:xsl='http://www.w3.org/1999/XSL/Transform'>
+    <xsl:template match="/">
+        <py:page>
+            <py:meta><py:title>list</py:title></py:meta>
+            <body xmlns="http://www.w3.org/1999/xhtml">
+                <pre><xsl:copy-of select="/*" /></pre>
+            </body>
+        </py:page>
+    </xsl:template>
+</xsl:stylesheet>""".encode("utf-8")
+
+    feed_template_xml = """<?xml version="1.0" encoding="utf-8" ?>
+<xsl:stylesheet
+        version='1.0'
+        xmlns:blog="http://pyxwf.zombofant.net/xmlns/weblog"
+        xmlns:py="http://pyxwf.zombofant.net/xmlns/documents/pywebxml"
+        xmlns:xsl='http://www.w3.org/1999/XSL/Transform'
+        xmlns="http://www.w3.org/2005/Atom">
+    <xsl:template match="/blog:syndication">
+        <feed>
+            <id><xsl:value-of select="blog:id" /></id>
+            <link rel="self" href="{blog:feed-path}" />
+            <xsl:for-each select="blog:post">
+                <entry>
+                    <id><xsl:value-of select="blog:id" /></id>
+                    <title><xsl:value-of select="py:page/py:meta/py:title" /></title>
+                </entry>
+            </xsl:for-each>
+        </feed>
+    </xsl:template>
+</xsl:stylesheet>""".encode("utf-8")
+
+    home_xml = """<?xml version="1.0" ?>
+<page xmlns="http://pyxwf.zombofant.net/xmlns/documents/pywebxml">
+    <meta><title>Blog</title></meta>
+    <body xmlns="http://www.w3.org/1999/xhtml"><p>blog</p></body>
+</page>""".encode("utf-8")
+
+    post_xml = """<?xml version="1.0" ?>
+<page xmlns="http://pyxwf.zombofant.net/xmlns/documents/pywebxml">
+    <meta>
+        <title>{title}</title>
+        <date>{date}</date>
+        {keywords}
+    </meta>
+    <body xmlns="http://www.w3.org/1999/xhtml"><p>{body}</p></body>
+</page>"""
+
+    def setUp(self):
+        super(BlogSiteTest, self).setUp()
+        utils.file_last_modified = self.old_last_modified
+        self._post_time = int(time.time()) - 3600
+        os.mkdir(self.fs("posts"))
+        for filename, data in [("list.xsl", self.list_template_xml),
+                               ("feed.xsl", self.feed_template_xml),
+                               ("home.xml", self.home_xml)]:
+            with self.fs.open(filename, "wb") as f:
+                f.write(data)
+        self.setUpPosts()
+        self.setup_site(self.get_sitemap(self.setUpSitemap))
+
+    def setUpPosts(self):
+        pass
+
+    def setUpBlog(self, blog):
+        pass
+
+    def setUpSitemap(self, etree, meta, plugins, tweaks, tree, crumbs):
+        for plugin in ["PyXWF.Nodes.Page", "PyWeblog", "PyWeblog.TagDir",
+                       "PyWeblog.Recent", "PyWeblog.Feeds", "PyWeblog.Atom"]:
+            ET.SubElement(plugins, NS.Site.p).text = plugin
+        mimemap = ET.SubElement(tweaks, getattr(NS.Site, "mime-map"))
+        ET.SubElement(mimemap, NS.Site.mm,
+                      type="application/x-pywebxml", ext=".xml")
+
+        page_tag = "{http://pyxwf.zombofant.net/xmlns/nodes/page}node"
+        ET.SubElement(tree, page_tag, src="home.xml")
+        blog = ET.SubElement(tree, PyWeblog.PyBlog.node, attrib={
+            "name": "blog",
+            "id": "blog",
+            "entry-dir": "posts",
+            "structure": "year+month",
+            "month-template": "list.xsl",
+            "post-template": "list.xsl"
+        })
+        ET.SubElement(blog, page_tag, src="home.xml")
+        ET.SubElement(blog, PyWeblog.PyBlog.recent, attrib={
+            "name": "recent",
+            "nav-title": "Recent",
+            "list-template": "list.xsl",
+            "post-count": "10"
+        })
+        tagdir = ET.SubElement(blog, getattr(PyWeblog.PyBlog, "tag-dir"), attrib={
+            "name": "tags",
+            "nav-title": "Tags",
+            "list-template": "list.xsl"
+        })
+        ET.SubElement(tagdir, getattr(PyWeblog.PyBlog, "tag-page"), attrib={
+            "list-template": "list.xsl"
+        })
+        feeds = ET.SubElement(blog, PyWeblog.PyBlog.feeds)
+        ET.SubElement(feeds, getattr(PyWeblog.PyBlog, "atom-feed"), attrib={
+            "link-prefix": "http://blog.example.com",
+            "template": "feed.xsl"
+        })
+        self.setUpBlog(blog)
+
+    def write_post(self, name, title, date, keywords=(), body="some text"):
+        """
+        Write the post *name* (without extension) and return its file name.
+        *date* is the publication date as ISO 8601 string.
+        """
+        filename = self.fs(os.path.join("posts", name + ".xml"))
+        with open(filename, "wb") as f:
+            f.write(self.post_xml.format(
+                title=title,
+                date=date,
+                keywords="".join("<kw>{0}</kw>".format(keyword)
+                                 for keyword in keywords),
+                body=body).encode("utf-8"))
+        self._post_time += 10
+        os.utime(filename, (self._post_time, self._post_time))
+        return filename
+
+    def remove_post(self, name):
+        os.unlink(self.fs(os.path.join("posts", name + ".xml")))
+
+    def get(self, path, query_data={}, **kwargs):
+        """
+        Handle a GET request for *path* and return the context and the
+        message. HTTP status exceptions are passed on.
+        """
+        ctx = MockedContext.from_site(self.site, path=path,
+            query_data=dict((key, list(values))
+                            for key, values in query_data.items()),
+            accept="*/*", **kwargs)
+        return ctx, self.site.handle(ctx)
+
 class FakeResource(Resource.Resource):
     @property
     def LastModified(self):
@@ -0,0 +1,113 @@
+# File name: test_Sitemap.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+from __future__ import unicode_literals
+
+import unittest
+from datetime import datetime
+
+from PyXWF.utils import ET
+import PyXWF.utils as utils
+import PyXWF.Errors as Errors
+import PyXWF.Namespaces as NS
+
+import PyXWF.Nodes.Sitemap as Sitemap
+
+import tests.Mocks as Mocks
+
+class SitemapNode(Mocks.DynamicSiteTest):
+    page_xml = """<?xml version="1.0" encoding="utf-8"?>
+<page xmlns="http://pyxwf.zombofant.net/xmlns/documents/pywebxml">
+    <meta><title>page</title></meta>
+    <body xmlns="http://www.w3.org/1999/xhtml" />
+</page>""".encode("utf-8")
+
+    def setUp(self):
+        super(SitemapNode, self).setUp()
+        # the timestamps end up in the sitemap, so they have to be real
+        # datetimes
+        utils.file_last_modified = lambda *args: datetime(2013, 1, 1)
+
+    def setUpSitemap(self, etree, meta, plugins, tweaks, tree, crumbs,
+            max_urls=50000):
+        for plugin in ["PyXWF.Nodes.Page", "PyXWF.Nodes.Sitemap",
+                "PyXWF.Parsers.PyWebXML"]:
+            ET.SubElement(plugins, NS.Site.p).text = plugin
+        for name in ["", "a"]:
+            ET.SubElement(tree, "{http://pyxwf.zombofant.net/xmlns/nodes/page}node", attrib={
+                "name": name,
+                "src": "page.xml",
+                "type": "application/x-pywebxml"
+            })
+        ET.SubElement(tree, Sitemap.SitemapNS.node, attrib={
+            "name": "sitemap.xml",
+            "id": "sitemap",
+            "max-urls": str(max_urls)
+        })
+        ET.SubElement(tree, "{http://pyxwf.zombofant.net/xmlns/nodes/redirect}internal", attrib={
+            "name": "b",
+            "to": "sitemap"
+        })
+
+    def get_response(self, max_urls=50000, query_data={}):
+        with self.fs.open("page.xml", "wb") as f:
+            f.write(self.page_xml)
+        self.setup_site(self.get_sitemap(self.setUpSitemap,
+            max_urls=max_urls))
+        ctx = Mocks.MockedContext.from_site(self.site, path="sitemap.xml",
+            accept="*/*", query_data=query_data)
+        message = self.site.handle(ctx)
+        return ET.fromstring(message.get_encoded_body())
+
+    def get_locs(self, tree):
+        return [el.text for el in tree.iter(Sitemap.SitemapsOrg.loc)]
+
+    def test_urlset(self):
+        tree = self.get_response()
+        self.assertEqual(tree.tag, Sitemap.SitemapsOrg.urlset)
+        self.assertSequenceEqual(self.get_locs(tree), [
+            "http://mockingbird.example.com/",
+            "http://mockingbird.example.com/a"
+        ])
+        self.assertSequenceEqual(
+            [el.text for el in tree.iter(Sitemap.SitemapsOrg.lastmod)],
+            ["2013-01-01T00:00:00Z"] * 2)
+
+    def test_index(self):
+        tree = self.get_response(max_urls=1)
+        self.assertEqual(tree.tag, Sitemap.SitemapsOrg.sitemapindex)
+        self.assertSequenceEqual(self.get_locs(tree), [
+            "http://mockingbird.example.com/sitemap.xml?part=1",
+            "http://mockingbird.example.com/sitemap.xml?part=2"
+        ])
+
+    def test_part(self):
+        tree = self.get_response(max_urls=1, query_data={"part": ["2"]})
+        self.assertSequenceEqual(self.get_locs(tree), [
+            "http://mockingbird.example.com/a"
+        ])
+
+    def test_invalid_part(self):
+        self.assertRaises(Errors.NotFound, self.get_response,
+            max_urls=1, query_data={"part": ["3"]})
@@ -0,0 +1,163 @@
+# File name: test_Static.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import PyXWF.Errors as Errors
+
+import PyXWF.Nodes.Static as Static
+
+class ParseRange(unittest.TestCase):
+    def test_ranges(self):
+        self.assertEqual(Static.parse_range("bytes=0-9", 100), (0, 10))
+        self.assertEqual(Static.parse_range("bytes=90-", 100), (90, 10))
+        self.assertEqual(Static.parse_range("bytes=90-200", 100), (90, 10))
+        self.assertEqual(Static.parse_range("bytes=-10", 100), (90, 10))
+        self.assertEqual(Static.parse_range("bytes=-200", 100), (0, 100))
+
+    def test_ignored(self):
+        for header in ["items=0-9", "bytes=0-1,5-6", "bytes=5-1", "bytes=a-b",
+                       "bytes=5"]:
+            self.assertIsNone(Static.parse_range(header, 100), header)
+
+    def test_unsatisfiable(self):
+        for header in ["bytes=100-", "bytes=-0"]:
+            self.assertRaises(Errors.RequestedRangeNotSatisfiable,
+                              Static.parse_range, header, 100)
+
+class AcceptsGzip(unittest.TestCase):
+    def test_accepts_gzip(self):
+        self.assertTrue(Static.accepts_gzip("gzip, deflate"))
+        self.assertTrue(Static.accepts_gzip("*"))
+        self.assertTrue(Static.accepts_gzip("deflate;q=1, x-gzip;q=0.5"))
+        self.assertFalse(Static.accepts_gzip(None))
+        self.assertFalse(Static.accepts_gzip("identity"))
+        self.assertFalse(Static.accepts_gzip("gzip;q=0, *"))
+
+class StaticFile(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, "file")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_update(self):
+        static_file = Static.StaticFile(self.filename, check_interval=0,
+                                        memory_limit=4)
+        static_file.update()
+        self.assertFalse(static_file.Exists)
+        self.assertIsNone(static_file.LastModified)
+
+        with open(self.filename, "wb") as f:
+            f.write(b"data")
+        static_file.update()
+        self.assertTrue(static_file.Exists)
+        self.assertEqual(static_file.Size, 4)
+        self.assertEqual(static_file.get_data(1, 2), b"at")
+        etag = static_file.ETag
+
+        with open(self.filename, "wb") as f:
+            f.write(b"more data")
+        static_file.update()
+        self.assertEqual(static_file.Size, 9)
+        self.assertIsNone(static_file.get_data(0, 9))
+        self.assertNotEqual(static_file.ETag, etag)
+
+    def test_check_interval(self):
+        static_file = Static.StaticFile(self.filename, check_interval=3600)
+        static_file.update()
+        with open(self.filename, "wb") as f:
+            f.write(b"data")
+        static_file.update()
+        self.assertFalse(static_file.Exists)
+
+    def test_fingerprint(self):
+        static_file = Static.StaticFile(self.filename, check_interval=0)
+        with open(self.filename, "wb") as f:
+            f.write(b"data")
+        static_file.update()
+        fingerprint = static_file.Fingerprint
+        self.assertEqual(len(fingerprint), Static.fingerprint_length)
+        self.assertEqual(static_file.Fingerprint, fingerprint)
+
+        with open(self.filename, "wb") as f:
+            f.write(b"more data")
+        static_file.update()
+        self.assertNotEqual(static_file.Fingerprint, fingerprint)
+
+class StaticBundle(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filenames = [os.path.join(self.directory, name)
+                          for name in ("a.js", "b.js")]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_update(self):
+        bundle = Static.StaticBundle([
+            Static.StaticFile(filename, check_interval=0)
+            for filename in self.filenames])
+        with open(self.filenames[0], "wb") as f:
+            f.write(b"var a;")
+        bundle.update()
+        self.assertFalse(bundle.Exists)
+
+        with open(self.filenames[1], "wb") as f:
+            f.write(b"var b;\n")
+        bundle.update()
+        self.assertTrue(bundle.Exists)
+        self.assertEqual(bundle.get_data(0, bundle.Size),
+                         b"var a;\nvar b;\n")
+        fingerprint = bundle.Fingerprint
+
+        with open(self.filenames[1], "wb") as f:
+            f.write(b"var b, c;\n")
+        bundle.update()
+        self.assertNotEqual(bundle.Fingerprint, fingerprint)
+
+class Fingerprints(unittest.TestCase):
+    fingerprint = "0123456789ab"
+
+    def test_roundtrip(self):
+        for relpath in ["css/site.css", "js/jquery.min.js", "LICENSE",
+                        "dir.d/file"]:
+            path = Static.fingerprint_path(relpath, self.fingerprint)
+            self.assertNotEqual(path, relpath)
+            self.assertEqual(Static.split_fingerprint(path),
+                             (relpath, self.fingerprint))
+
+    def test_split(self):
+        self.assertEqual(Static.fingerprint_path("css/site.css",
+                                                 self.fingerprint),
+                         "css/site.0123456789ab.css")
+        for relpath in ["css/site.css", "site.0123456789.css",
+                        "css/.0123456789ab.css", "site.0123456789AB.css"]:
+            self.assertIsNone(Static.split_fingerprint(relpath), relpath)
@@ -0,0 +1,279 @@
+# File name: test_Async.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+from __future__ import print_function
+
+import socket
+import sys
+import time
+import unittest
+
+from PyXWF.utils import threading
+import PyXWF.WebBackends.Async as Async
+
+class FastPathCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = Async.FastPathCache(60, 16)
+
+    def environ(self, method=b"GET", path=b"/", **headers):
+        environ = {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": path,
+            "QUERY_STRING": b"",
+            "HTTP_HOST": b"localhost"
+        }
+        for name, value in headers.items():
+            environ[b"HTTP_" + name.upper()] = value
+        return environ
+
+    def test_variants(self):
+        headers = [(b"Content-Type", b"text/html"), (b"Vary", b"Accept"),
+                   (b"Cache-Control", b"max-age=60")]
+        self.cache.store(self.environ(accept=b"text/html"), b"200 OK",
+                         headers, b"html")
+        self.cache.store(self.environ(accept=b"application/xhtml+xml"),
+                         b"200 OK", headers, b"xhtml")
+        self.assertEqual(
+            self.cache.lookup(self.environ(accept=b"text/html")).body,
+            b"html")
+        self.assertEqual(
+            self.cache.lookup(self.environ(b"HEAD",
+                accept=b"application/xhtml+xml")).body,
+            b"xhtml")
+        self.assertIsNone(self.cache.lookup(self.environ(accept=b"*/*")))
+        self.assertIsNone(self.cache.lookup(self.environ(path=b"/foo",
+                                                         accept=b"text/html")))
+
+    def test_uncachable(self):
+        self.cache.store(self.environ(), b"404 Not Found", [], b"")
+        self.cache.store(self.environ(path=b"/a"), b"200 OK",
+                         [(b"Set-Cookie", b"a=b")], b"")
+        self.cache.store(self.environ(path=b"/b"), b"200 OK",
+                         [(b"Cache-Control", b"private, max-age=10")], b"")
+        self.cache.store(self.environ(b"POST", path=b"/c"), b"200 OK", [], b"")
+        self.cache.store(self.environ(path=b"/d"), b"200 OK",
+                         [(b"Vary", b"*")], b"")
+        for path in [b"/", b"/a", b"/b", b"/c", b"/d"]:
+            self.assertIsNone(self.cache.lookup(self.environ(path=path)))
+
+    def test_revalidate(self):
+        for path, cache_control in [
+                (b"/", b"must-revalidate, max-age=0"),
+                (b"/a", b"max-age=0"),
+                (b"/b", b"public, max-age=60, s-maxage=0"),
+                (b"/c", b"max-age=60, must-revalidate")]:
+            self.cache.store(self.environ(path=path), b"200 OK",
+                             [(b"Cache-Control", cache_control)], b"")
+            self.assertIsNone(self.cache.lookup(self.environ(path=path)),
+                              cache_control)
+        self.cache.store(self.environ(path=b"/d"), b"200 OK", [], b"")
+        self.assertIsNone(self.cache.lookup(self.environ(path=b"/d")))
+
+    def test_lifetime(self):
+        now = time.time()
+        self.cache.store(self.environ(), b"200 OK",
+                         [(b"Cache-Control", b"max-age=10")], b"")
+        expires = self.cache.lookup(self.environ()).expires
+        self.assertTrue(now + 9 <= expires <= time.time() + 10)
+        self.cache.store(self.environ(), b"200 OK",
+                         [(b"Cache-Control", b"max-age=0, s-maxage=3600")], b"")
+        expires = self.cache.lookup(self.environ()).expires
+        self.assertTrue(now + 59 <= expires <= time.time() + 60)
+
+    def test_private_requests(self):
+        headers = [(b"Cache-Control", b"max-age=60")]
+        self.cache.store(self.environ(path=b"/a", cookie=b"a=b"), b"200 OK",
+                         headers, b"")
+        self.assertIsNone(self.cache.lookup(self.environ(path=b"/a")))
+        self.cache.store(self.environ(), b"200 OK", headers, b"")
+        self.assertIsNotNone(self.cache.lookup(self.environ()))
+        for header in [{"authorization": b"Basic eDp5"},
+                       {"cookie": b"a=b"},
+                       {"cache_control": b"no-cache"},
+                       {"pragma": b"no-cache"}]:
+            self.assertIsNone(self.cache.lookup(self.environ(**header)),
+                              header)
+
+    def test_expiry(self):
+        self.cache.ttl = -1
+        self.cache.store(self.environ(), b"200 OK",
+                         [(b"Cache-Control", b"max-age=60")], b"")
+        self.assertIsNone(self.cache.lookup(self.environ()))
+
+class HTTPServer(unittest.TestCase):
+    @staticmethod
+    def application(environ, start_response):
+        path = environ["PATH_INFO"]
+        if path == b"/slow":
+            time.sleep(0.2)
+        start_response(b"200 OK", [(b"Content-Type", b"text/plain")])
+        return [path]
+
+    def setUp(self):
+        self.server = Async.HTTPServer(self.application,
+            Async.make_socket(("127.0.0.1", 0)),
+            threads=4,
+            fast_path_ttl=0)
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       kwargs={"poll_interval": 0.05})
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.stop()
+        self.thread.join(5)
+
+    def request(self, data):
+        sock = socket.create_connection(
+            ("127.0.0.1", self.server.server_port), 5)
+        try:
+            sock.sendall(data)
+            received = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                received.append(chunk)
+        finally:
+            sock.close()
+        return b"".join(received)
+
+    def test_pipelining(self):
+        response = self.request(b"GET /slow HTTP/1.1\r\nHost: a\r\n\r\n"
+                                b"GET /fast HTTP/1.1\r\nHost: a\r\n\r\n"
+                                b"GET /last HTTP/1.1\r\nHost: a\r\n"
+                                b"Connection: close\r\n\r\n")
+        bodies = [part.rsplit(b"\r\n\r\n", 1)[-1]
+                  for part in response.split(b"HTTP/1.1 200 OK")[1:]]
+        self.assertEqual(bodies, [b"/slow", b"/fast", b"/last"])
+
+    def test_error_after_pipelined_request(self):
+        response = self.request(b"GET /slow HTTP/1.1\r\nHost: a\r\n\r\n"
+                                b"garbage\r\n\r\n"
+                                b"GET /fast HTTP/1.1\r\nHost: a\r\n\r\n")
+        self.assertTrue(response.startswith(b"HTTP/1.1 200 OK"))
+        self.assertIn(b"/slow", response)
+        self.assertIn(b"HTTP/1.1 400 Bad Request", response)
+        self.assertNotIn(b"/fast", response)
+
+class Streaming(unittest.TestCase):
+    block_size = 65536
+    block_count = 512
+
+    def application(self, environ, start_response):
+        path = environ["PATH_INFO"]
+        if path == b"/large":
+            start_response(b"200 OK", [
+                (b"Content-Type", b"application/octet-stream"),
+                (b"Content-Length", str(self.block_size * self.block_count))
+            ])
+            return self.generate()
+        write = start_response(b"200 OK", [(b"Content-Type", b"text/plain")])
+        write(b"partial")
+        try:
+            raise ValueError("failed halfway")
+        except ValueError:
+            start_response(b"500 Internal Server Error",
+                           [(b"Content-Type", b"text/plain")],
+                           sys.exc_info())
+        return [b"error"]
+
+    def generate(self):
+        block = b"x" * self.block_size
+        for i in xrange(self.block_count):
+            self.produced += 1
+            yield block
+
+    def setUp(self):
+        self.produced = 0
+        self.old_max_buffered_output = Async.HTTPChannel.max_buffered_output
+        Async.HTTPChannel.max_buffered_output = self.block_size
+        self.server = Async.HTTPServer(self.application,
+            Async.make_socket(("127.0.0.1", 0)),
+            threads=2,
+            fast_path_ttl=0)
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       kwargs={"poll_interval": 0.05})
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.stop()
+        self.thread.join(5)
+        Async.HTTPChannel.max_buffered_output = self.old_max_buffered_output
+
+    def connect(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 65536)
+        sock.settimeout(5)
+        sock.connect(("127.0.0.1", self.server.server_port))
+        return sock
+
+    def receive_all(self, sock):
+        received = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            received.append(chunk)
+        return b"".join(received)
+
+    def test_slow_client(self):
+        sock = self.connect()
+        try:
+            sock.sendall(b"GET /large HTTP/1.1\r\nHost: a\r\n"
+                         b"Connection: close\r\n\r\n")
+            # do not read anything for a while; only what fits into the
+            # socket buffers and the output buffer may be produced
+            time.sleep(0.5)
+            self.assertLess(self.produced, self.block_count // 4)
+            response = self.receive_all(sock)
+        finally:
+            sock.close()
+        self.assertEqual(self.produced, self.block_count)
+        head, _, body = response.partition(b"\r\n\r\n")
+        self.assertEqual(len(body), self.block_size * self.block_count)
+
+    def test_client_gone(self):
+        sock = self.connect()
+        sock.sendall(b"GET /large HTTP/1.1\r\nHost: a\r\n\r\n")
+        time.sleep(0.2)
+        sock.close()
+        deadline = time.time() + 5
+        while self.server._channels and time.time() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.2)
+        # the worker stops producing the body
+        self.assertLess(self.produced, self.block_count)
+
+    def test_replaced_status_drops_body(self):
+        sock = self.connect()
+        try:
+            sock.sendall(b"GET /fail HTTP/1.1\r\nHost: a\r\n"
+                         b"Connection: close\r\n\r\n")
+            response = self.receive_all(sock)
+        finally:
+            sock.close()
+        self.assertTrue(response.startswith(
+            b"HTTP/1.1 500 Internal Server Error"))
+        self.assertTrue(response.endswith(b"\r\n\r\nerror"))
+        self.assertNotIn(b"partial", response)
@@ -116,9 +116,29 @@ class WSGIContext(unittest.TestCase):
         self.assertEqual(ctx.Cookies, cookies)
 
     def test_if_modified_since_bad_request(self):
-        self.assertRaises(Errors.BadRequest, self.get_context, custom_headers={
+        ctx = self.get_context(custom_headers={
             "if-modified-since": "foobar"
         })
+        self.assertRaises(Errors.BadRequest, getattr, ctx, "IfModifiedSince")
+
+    def test_lazy_parsing(self):
+        ctx = self.get_context(custom_headers={
+            "Accept": "text/html",
+            "User-Agent": "Wget/1.12 (linux-gnu)"
+        })
+        self.assertNotIn("_accept", vars(ctx))
+        self.assertNotIn("_request_headers", vars(ctx))
+        self.assertEqual(ctx.timings, {})
+
+        # assigned values are not overwritten when the rest is loaded
+        ctx.IsMobileClient = True
+        self.assertTrue(ctx.HTML5Support)
+        self.assertTrue(ctx.IsMobileClient)
+        self.assertIn("parse-user-agent", ctx.timings)
+        self.assertNotIn("parse-accept", ctx.timings)
+
+        self.assertFalse(ctx.CanUseXHTML)
+        self.assertIn("parse-accept", ctx.timings)
 
     def test_if_modified_since_rfc_822_and_1123(self):
         ctx = self.get_context(custom_headers={
@@ -225,6 +245,41 @@ class WSGIContext(unittest.TestCase):
             (b"vary", b"host")
         ])
 
+    def _get_cache_control(self):
+        for name, value in self.response_headers:
+            if name == b"cache-control":
+                return set(value.split(b","))
+        return set()
+
+    def test_cache_policy(self):
+        res = Mocks.FakeResource()
+        res.LastModified = datetime.utcnow()
+        ctx = self.get_context()
+        ctx.use_resource(res)
+        ctx.CachePolicy = HTTPUtils.CachePolicy(max_age=60, s_maxage=600,
+            stale_while_revalidate=30, scope="public")
+        ctx.send_empty_response(Errors.OK)
+        self.assertEqual(self._get_cache_control(), set([
+            b"public", b"max-age=60", b"s-maxage=600",
+            b"stale-while-revalidate=30"]))
+
+    def test_cache_policy_private(self):
+        ctx = self.get_context()
+        ctx.CachePolicy = HTTPUtils.CachePolicy(max_age=60, s_maxage=600,
+            scope="public")
+        ctx.add_cache_control("private")
+        ctx.send_empty_response(Errors.OK)
+        self.assertEqual(self._get_cache_control(),
+                         set([b"private", b"max-age=60"]))
+
+    def test_immutable(self):
+        ctx = self.get_context()
+        ctx.CachePolicy = HTTPUtils.CachePolicy(max_age=60)
+        ctx.Immutable = True
+        ctx.send_empty_response(Errors.OK)
+        self.assertEqual(self._get_cache_control(), set([
+            b"public", b"max-age=31536000", b"immutable"]))
+
     def test_not_modified(self):
         res = Mocks.FakeResource()
         d = TimeUtils.strip_microseconds(datetime.utcnow())
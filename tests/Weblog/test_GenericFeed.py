@@ -0,0 +1,183 @@
+# File name: test_GenericFeed.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+from __future__ import unicode_literals
+
+from datetime import timedelta
+
+import PyXWF.Errors as Errors
+import PyXWF.HTTPUtils as HTTPUtils
+
+import tests.Mocks as Mocks
+
+class DeltaEncoding(Mocks.BlogSiteTest):
+    feed_query = {"feed": ["atom"]}
+
+    def setUpPosts(self):
+        self.write_post("first", "First", "2012-01-01T10:00:00Z")
+        self.write_post("second", "Second", "2012-01-02T10:00:00Z")
+
+    def setUp(self):
+        super(DeltaEncoding, self).setUp()
+        self.feed = self.site.get_node("blog").Feeds._protocolmap["atom"]
+        ctx, message = self.get_feed()
+        self.etag = self.get_etag(ctx)
+
+    def get_feed(self, etag=None, a_im=None):
+        headers = {}
+        if etag is not None:
+            headers["If-None-Match"] = HTTPUtils.format_entity_tag(etag)
+        if a_im is not None:
+            headers["A-IM"] = a_im
+        return self.get("blog/recent", self.feed_query,
+                        request_headers=headers)
+
+    def get_etag(self, ctx):
+        etag, = HTTPUtils.parse_entity_tags(ctx._response_headers["etag"][0])
+        return etag
+
+    def get_body(self, message):
+        return message.get_encoded_body()
+
+    def get_deltas(self):
+        entry, = self.feed._cache.entries.values()
+        return entry.deltas
+
+    def test_full(self):
+        ctx, message = self.get_feed()
+        self.assertEqual(message.Status, Errors.OK)
+        self.assertIn(b"First", self.get_body(message))
+        self.assertIn(b"Second", self.get_body(message))
+        self.assertEqual(self.get_etag(ctx), self.etag)
+        self.assertLessEqual(set(["a-im", "if-none-match"]), ctx.Vary)
+
+    def test_full_for_unknown_etag(self):
+        ctx, message = self.get_feed(etag="garbage", a_im="feed")
+        self.assertEqual(message.Status, Errors.OK)
+        self.assertIn(b"First", self.get_body(message))
+
+    def test_not_modified(self):
+        with self.assertRaises(Errors.NotModified):
+            self.get_feed(etag=self.etag, a_im="feed")
+        with self.assertRaises(Errors.NotModified):
+            self.get_feed(etag=self.etag)
+
+    def test_delta(self):
+        self.write_post("third", "Third", "2012-01-03T10:00:00Z")
+        ctx, message = self.get_feed(etag=self.etag, a_im="feed")
+        self.assertEqual(message.Status, Errors.IMUsed)
+        self.assertEqual(ctx._response_headers["im"], [b"feed"])
+        self.assertLessEqual(set(["a-im", "if-none-match"]), ctx.Vary)
+        body = self.get_body(message)
+        self.assertIn(b"Third", body)
+        self.assertNotIn(b"First", body)
+        self.assertNotIn(b"Second", body)
+
+        # without A-IM, the client gets the whole feed
+        ctx, message = self.get_feed(etag=self.etag)
+        self.assertEqual(message.Status, Errors.OK)
+        self.assertIn(b"First", self.get_body(message))
+        self.assertLessEqual(set(["a-im", "if-none-match"]), ctx.Vary)
+
+    def test_deltas_bounded(self):
+        self.write_post("third", "Third", "2012-01-03T10:00:00Z")
+        since = self.feed._parse_etag_timestamp(self.etag)
+        # all of these are older than the third post, which is dated ten
+        # seconds after the second one
+        for seconds in range(9):
+            timestamp = since + timedelta(seconds=seconds)
+            etag = "{0}-0".format(
+                timestamp.strftime(self.feed.etag_timestamp_format))
+            ctx, message = self.get_feed(etag=etag, a_im="feed")
+            self.assertEqual(message.Status, Errors.IMUsed)
+        self.assertEqual(list(self.get_deltas()), [1])
+
+class FeedCache(Mocks.BlogSiteTest):
+    def setUpPosts(self):
+        self.write_post("first", "First", "2012-01-01T10:00:00Z")
+
+    def setUp(self):
+        super(FeedCache, self).setUp()
+        self.feed = self.site.get_node("blog").Feeds._protocolmap["atom"]
+
+    def test_ignores_other_query_parameters(self):
+        _, plain = self.get("blog/recent", {"feed": ["atom"]})
+        ctx = Mocks.MockedContext.from_site(self.site, path="blog/recent",
+            query_data={"feed": ["atom"], "utm_source": ["x"]},
+            accept="*/*")
+        ctx._fulluri += "?feed=atom&utm_source=x"
+        tracked = self.site.handle(ctx)
+        self.assertEqual(len(self.feed._cache.entries), 1)
+        self.assertEqual(tracked.get_encoded_body(), plain.get_encoded_body())
+        self.assertIn(b'href="/blog/recent?feed=atom"',
+                      tracked.get_encoded_body())
+
+    def test_same_for_all_user_agents(self):
+        ctx, desktop = self.get("blog/recent", {"feed": ["atom"]})
+        self.assertNotIn("user-agent", ctx.Vary)
+        ctx, mobile = self.get("blog/recent", {"feed": ["atom"]},
+            useragent="Mozilla/5.0 (iPhone; CPU iPhone OS 6_0 like Mac OS X) "
+                      "AppleWebKit/536.26 Mobile/10A5376e")
+        self.assertNotIn("user-agent", ctx.Vary)
+        self.assertEqual(len(self.feed._cache.entries), 1)
+
+class QueryFeedCache(Mocks.BlogSiteTest):
+    def setUpPosts(self):
+        self.write_post("first", "First", "2012-01-01T10:00:00Z",
+                        keywords=["a", "b"])
+        self.write_post("second", "Second", "2012-03-01T10:00:00Z",
+                        keywords=["a", "b"])
+
+    def setUp(self):
+        super(QueryFeedCache, self).setUp()
+        self.feed = self.site.get_node("blog").Feeds._protocolmap["atom"]
+
+    def get_feed(self, **date_range):
+        query_data = {"feed": ["atom"]}
+        for name, value in date_range.items():
+            query_data[name] = [value]
+        ctx, message = self.get("blog/tags/a+b", query_data)
+        return message.get_encoded_body()
+
+    def test_date_ranges(self):
+        since = self.get_feed(since="2012-02")
+        until = self.get_feed(until="2012-01")
+        unbounded = self.get_feed()
+        self.assertEqual(len(self.feed._cache.entries), 3)
+
+        self.assertIn(b"Second", since)
+        self.assertNotIn(b"First", since)
+        self.assertIn(b'href="/blog/tags/a+b?since=2012-02&amp;feed=atom"',
+                      since)
+        self.assertIn(b"First", until)
+        self.assertNotIn(b"Second", until)
+        self.assertIn(b'href="/blog/tags/a+b?until=2012-01&amp;feed=atom"',
+                      until)
+        self.assertIn(b"First", unbounded)
+        self.assertIn(b"Second", unbounded)
+        self.assertIn(b'href="/blog/tags/a+b?feed=atom"', unbounded)
+
+        # repeated requests are answered from the right entries
+        self.assertEqual(self.get_feed(since="2012-02"), since)
+        self.assertEqual(self.get_feed(until="2012-01"), until)
@@ -0,0 +1,178 @@
+# File name: test_Index.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+from __future__ import unicode_literals
+
+import os
+from datetime import datetime, timedelta
+
+import PyXWF.TimeUtils as TimeUtils
+
+import tests.Mocks as Mocks
+
+class IndexChanges(Mocks.BlogSiteTest):
+    def setUpPosts(self):
+        self.write_post("first", "First", "2012-01-10T10:00:00Z",
+                        keywords=["a"])
+        self.write_post("second", "Second", "2012-01-20T10:00:00Z",
+                        keywords=["a", "b"])
+
+    def setUp(self):
+        super(IndexChanges, self).setUp()
+        self.index = self.site.get_node("blog").index
+        self.index.threadsafe_update()
+        self.changes = []
+        self.index.add_change_listener(self.changes.append)
+
+    def get_change(self):
+        self.index.threadsafe_update()
+        change, = self.changes
+        return change
+
+    def get_names(self, posts):
+        return set(os.path.splitext(os.path.basename(post.filename))[0]
+                   for post in posts)
+
+    def assertChange(self, change, added=(), removed=(), moved=(),
+            updated=(), months=(), keywords=()):
+        self.assertEqual(self.get_names(change.added), set(added))
+        self.assertEqual(self.get_names(change.removed), set(removed))
+        self.assertEqual(self.get_names(change.moved), set(moved))
+        self.assertEqual(self.get_names(change.updated), set(updated))
+        self.assertEqual(change.months, set(months))
+        self.assertEqual(change.keywords, set(keywords))
+
+    def test_unchanged(self):
+        self.index.threadsafe_update()
+        self.assertEqual(self.changes, [])
+
+    def test_add(self):
+        self.write_post("third", "Third", "2012-02-01T10:00:00Z",
+                        keywords=["c"])
+        self.assertChange(self.get_change(), added=["third"],
+                          months=[(2012, 2)], keywords=["c"])
+
+    def test_remove(self):
+        self.remove_post("second")
+        self.assertChange(self.get_change(), removed=["second"],
+                          months=[(2012, 1)], keywords=["a", "b"])
+
+    def test_move(self):
+        self.write_post("first", "First", "2012-03-05T10:00:00Z",
+                        keywords=["c"])
+        # both the old and the new month and keywords are affected
+        self.assertChange(self.get_change(), moved=["first"],
+                          months=[(2012, 1), (2012, 3)],
+                          keywords=["a", "c"])
+
+    def test_update(self):
+        self.write_post("first", "First, revised", "2012-01-10T10:00:00Z",
+                        keywords=["a"])
+        self.assertChange(self.get_change(), updated=["first"],
+                          months=[(2012, 1)], keywords=["a"])
+
+    def test_combined(self):
+        self.write_post("third", "Third", "2012-02-01T10:00:00Z")
+        self.remove_post("first")
+        self.write_post("second", "Second", "2012-01-20T10:00:00Z",
+                        keywords=["b"])
+        self.assertChange(self.get_change(), added=["third"],
+                          removed=["first"], moved=["second"],
+                          months=[(2012, 1), (2012, 2)],
+                          keywords=["a", "b"])
+
+class ScheduledPosts(Mocks.BlogSiteTest):
+    def setUpPosts(self):
+        self.now = datetime.utcnow()
+        self.write_post("past", "Past", "2012-01-10T10:00:00Z")
+        self.write_post("future", "Future",
+            (self.now + timedelta(days=1)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            keywords=["soon"])
+
+    def setUpBlog(self, blog):
+        blog.set("check-interval", "3600")
+
+    def setUp(self):
+        self.old_now_date = TimeUtils.now_date
+        TimeUtils.now_date = lambda: self.now
+        super(ScheduledPosts, self).setUp()
+        self.index = self.site.get_node("blog").index
+        self.changes = []
+        self.index.add_change_listener(self.changes.append)
+        self.scans = []
+        reload_posts = self.index._reload_posts
+        def counting_reload_posts():
+            self.scans.append(self.now)
+            reload_posts()
+        self.index._reload_posts = counting_reload_posts
+
+    def tearDown(self):
+        TimeUtils.now_date = self.old_now_date
+        super(ScheduledPosts, self).tearDown()
+
+    def get_names(self, posts):
+        return [os.path.splitext(os.path.basename(post.filename))[0]
+                for post in posts]
+
+    def test_scheduled(self):
+        self.index.threadsafe_update()
+        self.assertEqual(self.changes, [])
+        self.assertEqual(self.get_names(self.index.ScheduledPosts),
+                         ["future"])
+        self.assertEqual(self.get_names(self.index.get_all_posts()),
+                         ["past"])
+        self.assertEqual(self.index.get_posts_by_keyword("soon"), [])
+
+    def test_promote_when_due(self):
+        self.now += timedelta(days=2)
+        self.index.threadsafe_update()
+        change, = self.changes
+        self.assertEqual(self.get_names(change.added), ["future"])
+        self.assertEqual(change.keywords, set(["soon"]))
+        self.assertEqual(self.get_names(self.index.get_all_posts()),
+                         ["past", "future"])
+        self.assertEqual(self.index.ScheduledPosts, [])
+        post, = self.index.get_posts_by_keyword("soon")
+        self.assertGreaterEqual(self.index.LastModified, post.creation_date)
+        # the directory has not been scanned to find out
+        self.assertEqual(self.scans, [])
+
+    def test_promote_on_request(self):
+        ctx, message = self.get("blog/recent")
+        self.assertNotIn(b"Future", message.get_encoded_body())
+        self.now += timedelta(days=2)
+        ctx, message = self.get("blog/recent")
+        self.assertIn(b"Future", message.get_encoded_body())
+        self.assertEqual(self.scans, [])
+
+    def test_rescan_after_interval(self):
+        self.write_post("other", "Other", "2012-01-20T10:00:00Z")
+        self.index.threadsafe_update()
+        self.assertEqual(self.changes, [])
+
+        self.index.check_interval = 0
+        self.index.threadsafe_update()
+        change, = self.changes
+        self.assertEqual(self.get_names(change.added), ["other"])
+        self.assertEqual(len(self.scans), 1)
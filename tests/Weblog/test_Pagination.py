@@ -0,0 +1,143 @@
+# File name: test_Pagination.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+from __future__ import unicode_literals
+
+import unittest
+
+from PyXWF.utils import ET
+import PyXWF.Errors as Errors
+
+import PyWeblog
+import PyWeblog.Pagination as Pagination
+
+import tests.Mocks as Mocks
+
+class FakePost(object):
+    def __init__(self, number):
+        self.number = number
+        self.abstract = ET.Element(PyWeblog.PyBlog.abstract,
+                                   number=unicode(number))
+
+class Paginator(unittest.TestCase):
+    def setUp(self):
+        # oldest first, like the lists of the index
+        self.posts = [FakePost(i) for i in range(1, 8)]
+        self.paginator = Pagination.Paginator(3)
+
+    def get_numbers(self, posts):
+        return [post.number for post in posts]
+
+    def get_page_number(self, query_data):
+        ctx = Mocks.MockedContext("/", query_data=query_data)
+        return self.paginator.get_page_number(ctx)
+
+    def test_page_number(self):
+        self.assertEqual(self.get_page_number({}), 1)
+        self.assertEqual(self.get_page_number({"page": ["2"]}), 2)
+        for value in ["0", "-1", "two", ""]:
+            self.assertRaises(Errors.NotFound,
+                              self.get_page_number, {"page": [value]})
+        self.assertRaises(Errors.NotFound,
+                          self.get_page_number, {"page": []})
+
+    def test_page_count(self):
+        self.assertEqual(self.paginator.get_page_count(0), 1)
+        self.assertEqual(self.paginator.get_page_count(1), 1)
+        self.assertEqual(self.paginator.get_page_count(3), 1)
+        self.assertEqual(self.paginator.get_page_count(4), 2)
+        self.assertEqual(self.paginator.get_page_count(7), 3)
+
+    def test_pages(self):
+        get_page = self.paginator.get_page
+        self.assertEqual(self.get_numbers(get_page(self.posts, 1)), [7, 6, 5])
+        self.assertEqual(self.get_numbers(get_page(self.posts, 2)), [4, 3, 2])
+        # the last page holds the remainder
+        self.assertEqual(self.get_numbers(get_page(self.posts, 3)), [1])
+        self.assertRaises(Errors.NotFound, get_page, self.posts, 4)
+
+    def test_empty(self):
+        self.assertEqual(self.paginator.get_page([], 1), [])
+        self.assertRaises(Errors.NotFound, self.paginator.get_page, [], 2)
+
+    def test_unpaginated(self):
+        paginator = Pagination.Paginator(None)
+        ctx = Mocks.MockedContext("/", query_data={"page": ["2"]})
+        self.assertEqual(paginator.get_page_number(ctx), 1)
+        self.assertEqual(paginator.get_page_count(7), 1)
+        self.assertEqual(self.get_numbers(paginator.get_page(self.posts, 1)),
+                         range(7, 0, -1))
+
+    def get_links(self, page, page_count=3):
+        abstracts = self.paginator.get_abstract_list(
+            self.paginator.get_page(self.posts, page), page, page_count,
+            "blog/recent")
+        links = {}
+        for name in ["prev-page", "next-page"]:
+            link = abstracts.find(getattr(PyWeblog.PyBlog, name))
+            if link is not None:
+                links[name] = (link.get("href"), link.get("page"))
+        return abstracts, links
+
+    def test_links(self):
+        abstracts, links = self.get_links(1)
+        self.assertEqual(abstracts.get("page"), "1")
+        self.assertEqual(abstracts.get("page-count"), "3")
+        self.assertEqual(links, {
+            "next-page": ("blog/recent?page=2", "2")
+        })
+        self.assertEqual(
+            [abstract.get("number")
+             for abstract in abstracts.iter(PyWeblog.PyBlog.abstract)],
+            ["7", "6", "5"])
+
+        abstracts, links = self.get_links(2)
+        # the first page is the one without the query parameter
+        self.assertEqual(links, {
+            "prev-page": ("blog/recent", "1"),
+            "next-page": ("blog/recent?page=3", "3")
+        })
+
+        abstracts, links = self.get_links(3)
+        self.assertEqual(links, {
+            "prev-page": ("blog/recent?page=2", "2")
+        })
+
+    def test_links_with_query(self):
+        abstracts = self.paginator.get_abstract_list(
+            self.paginator.get_page(self.posts, 2), 2, 3, "blog/tags/a+b",
+            query=[("since", "2012-01"), ("until", "2013")])
+        hrefs = dict(
+            (name, abstracts.find(getattr(PyWeblog.PyBlog, name)).get("href"))
+            for name in ["prev-page", "next-page"])
+        self.assertEqual(hrefs, {
+            "prev-page": "blog/tags/a+b?since=2012-01&until=2013",
+            "next-page": "blog/tags/a+b?since=2012-01&until=2013&page=3"
+        })
+
+    def test_no_links_without_page_count(self):
+        abstracts, links = self.get_links(1, page_count=None)
+        self.assertEqual(links, {})
+        self.assertIsNone(abstracts.get("page"))
+        self.assertEqual(len(abstracts), 3)
@@ -0,0 +1,74 @@
+# File name: test_Post.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+from __future__ import unicode_literals
+
+import re
+
+import tests.Mocks as Mocks
+
+class RenderedPostCache(Mocks.BlogSiteTest):
+    def setUpPosts(self):
+        self.write_post("gamma", "Gamma", "2012-01-05T10:00:00Z",
+                        keywords=["python"])
+        self.write_post("alpha", "Alpha", "2012-01-10T10:00:00Z",
+                        keywords=["python", "web"])
+        self.write_post("beta", "Beta", "2012-01-20T10:00:00Z",
+                        keywords=["python", "web"])
+
+    def setUpBlog(self, blog):
+        blog.set("related-posts", "1")
+
+    def setUp(self):
+        super(RenderedPostCache, self).setUp()
+        self.index = self.site.get_node("blog").index
+
+    def get_post(self, name):
+        post, = [post for post in self.index.get_all_posts()
+                 if post.basename == name]
+        return post
+
+    def render(self, name):
+        ctx, message = self.get(self.get_post(name).path)
+        return message.get_encoded_body()
+
+    def get_scores(self, body):
+        return re.findall(br'score="([^"]*)"', body)
+
+    def test_related_score_change(self):
+        first = self.render("alpha")
+        self.assertEqual(self.render("alpha"), first)
+        # another post using one of the keywords changes the weights, but
+        # not which post is most related
+        self.write_post("delta", "Delta", "2012-02-01T10:00:00Z",
+                        keywords=["web"])
+        self.index.threadsafe_update()
+        alpha = self.get_post("alpha")
+        self.assertEqual([post.title for post in alpha.RelatedPosts],
+                         ["Beta"])
+        second = self.render("alpha")
+        self.assertNotEqual(self.get_scores(second), self.get_scores(first))
+        self.assertEqual(self.get_scores(second),
+                         [score.encode("utf-8")
+                          for score in alpha.RelatedPostScores])
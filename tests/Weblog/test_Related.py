@@ -0,0 +1,160 @@
+# File name: test_Related.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+from __future__ import unicode_literals
+
+import unittest
+from datetime import datetime, timedelta
+
+import PyWeblog.Index as Index
+import PyWeblog.Related as Related
+
+class FakePost(object):
+    def __init__(self, name, keywords, number):
+        self.name = name
+        self.filename = name + ".xml"
+        self.title = name.capitalize()
+        self.keywords = list(keywords)
+        self.creation_date = datetime(2012, 1, 1) + timedelta(days=number)
+        self._related = []
+
+    def __repr__(self):
+        return "<FakePost {0}>".format(self.name)
+
+class FakeIndex(object):
+    def __init__(self):
+        self.posts = []
+
+    def get_all_posts(self):
+        return self.posts
+
+class CountingRelatedPosts(Related.RelatedPosts):
+    def __init__(self, *args, **kwargs):
+        super(CountingRelatedPosts, self).__init__(*args, **kwargs)
+        self.rebuilds = 0
+        self.vectors_built = 0
+
+    def rebuild(self):
+        self.rebuilds += 1
+        super(CountingRelatedPosts, self).rebuild()
+
+    def _build_vector(self, post):
+        self.vectors_built += 1
+        return super(CountingRelatedPosts, self)._build_vector(post)
+
+class RelatedPosts(unittest.TestCase):
+    keywords = [
+        ("alpha", ["python", "web"]),
+        ("beta", ["python", "web", "css"]),
+        ("gamma", ["python"]),
+        ("delta", ["rust"]),
+        ("epsilon", ["rust", "systems"]),
+        ("zeta", ["cooking"]),
+    ]
+
+    def setUp(self):
+        self.index = FakeIndex()
+        self.posts = {}
+        # a high ratio keeps everything incremental
+        self.related = CountingRelatedPosts(self.index, 2, rebuild_ratio=10)
+        self.change(added=[self.new_post(name, keywords)
+                           for name, keywords in self.keywords])
+
+    def new_post(self, name, keywords):
+        post = FakePost(name, keywords, len(self.posts))
+        self.posts[name] = post
+        return post
+
+    def change(self, added=(), removed=(), moved=(), updated=()):
+        change = Index.IndexChange()
+        change.added.update(added)
+        change.removed.update(removed)
+        change.moved.update(moved)
+        change.updated.update(updated)
+        self.index.posts = sorted(
+            (set(self.index.posts) | change.added) - change.removed,
+            key=lambda post: post.creation_date)
+        self.related.update(change)
+
+    def get_lists(self):
+        return dict((post.name, [other.name for _, other in post._related])
+                    for post in self.index.get_all_posts())
+
+    def assertLikeRebuild(self):
+        lists = self.get_lists()
+        Related.RelatedPosts(self.index, 2).rebuild()
+        self.assertEqual(lists, self.get_lists())
+
+    def test_initial(self):
+        lists = self.get_lists()
+        self.assertEqual(lists["alpha"], ["beta", "gamma"])
+        self.assertEqual(lists["delta"], ["epsilon"])
+        self.assertEqual(lists["zeta"], [])
+        self.assertLikeRebuild()
+
+    def test_add(self):
+        self.change(added=[self.new_post("eta", ["rust", "systems"])])
+        self.assertEqual(self.get_lists()["epsilon"], ["eta", "delta"])
+        self.assertLikeRebuild()
+
+    def test_remove(self):
+        beta = self.posts["beta"]
+        self.change(removed=[beta])
+        self.assertEqual(beta._related, [])
+        for name, others in self.get_lists().items():
+            self.assertNotIn("beta", others, name)
+        self.assertEqual(self.get_lists()["alpha"], ["gamma"])
+        self.assertLikeRebuild()
+
+    def test_move(self):
+        gamma = self.posts["gamma"]
+        gamma.keywords = ["cooking"]
+        self.change(moved=[gamma])
+        lists = self.get_lists()
+        self.assertEqual(lists["gamma"], ["zeta"])
+        self.assertEqual(lists["zeta"], ["gamma"])
+        self.assertNotIn("gamma", lists["alpha"])
+        self.assertLikeRebuild()
+
+    def test_rebuild_threshold(self):
+        self.related._rebuild_ratio = 0.5
+        # six posts, so up to three changes are applied incrementally
+        for name in ["alpha", "beta", "gamma"]:
+            self.change(updated=[self.posts[name]])
+        self.assertEqual(self.related.rebuilds, 0)
+        self.change(updated=[self.posts["delta"]])
+        self.assertEqual(self.related.rebuilds, 1)
+        self.assertEqual(self.related._changes, 0)
+        self.assertLikeRebuild()
+
+    def test_vectors_built_once(self):
+        for i in range(20):
+            self.new_post("post{0}".format(i), ["common"])
+        self.change(added=[self.posts["post{0}".format(i)]
+                           for i in range(20)])
+        self.related.vectors_built = 0
+        self.change(updated=[self.posts["post0"]])
+        # each of the posts sharing the keyword is recomputed, but its
+        # vector is only built once
+        self.assertEqual(self.related.vectors_built, 20)
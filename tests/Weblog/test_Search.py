@@ -0,0 +1,217 @@
+# File name: test_Search.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+from __future__ import unicode_literals
+
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+import cPickle as pickle
+
+import PyXWF.Namespaces as NS
+
+import PyWeblog.Index as Index
+import PyWeblog.Search as Search
+
+import tests.Mocks as Mocks
+
+class FakeDocument(object):
+    def __init__(self, body):
+        self.body = NS.XHTML("body", NS.XHTML("p", body))
+
+class FakePost(object):
+    def __init__(self, filename, title, body="", keywords=(),
+            description="", last_modified=datetime(2012, 1, 1)):
+        self.filename = filename
+        self.title = title
+        self.keywords = list(keywords)
+        self.description = description
+        self.LastModified = last_modified
+        self._document = FakeDocument(body)
+
+    def get_document(self):
+        return self._document
+
+class FakeIndex(object):
+    def __init__(self, posts):
+        self.posts = dict((post.filename, post) for post in posts)
+        self.listeners = []
+
+    def add_change_listener(self, listener):
+        self.listeners.append(listener)
+
+    def get_all_posts(self):
+        return self.posts.values()
+
+    def get_post_by_filename(self, filename):
+        return self.posts.get(filename)
+
+    def change(self, added=(), removed=(), updated=()):
+        change = Index.IndexChange()
+        for post in added:
+            self.posts[post.filename] = post
+            change.added.add(post)
+        for post in removed:
+            del self.posts[post.filename]
+            change.removed.add(post)
+        for post in updated:
+            self.posts[post.filename] = post
+            change.updated.add(post)
+        for listener in self.listeners:
+            listener(change)
+
+class Tokenize(unittest.TestCase):
+    def test_tokenize(self):
+        self.assertEqual(Search.tokenize("Hello, World! foo_bar 42"),
+                         ["hello", "world", "foo_bar", "42"])
+        self.assertEqual(Search.tokenize(None), [])
+
+class SearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = FakeIndex([
+            FakePost("a.xml", "Python tricks", "a few words on snakes"),
+            FakePost("b.xml", "Gardening",
+                     "a long text which mentions python only once among "
+                     "lots of other words about plants and flowers"),
+            FakePost("c.xml", "Cooking", "nothing to see here",
+                     keywords=["food"]),
+        ])
+        self.search_index = Search.SearchIndex(self.index)
+
+    def get_results(self, query, limit=10):
+        return [post.filename
+                for score, post in self.search_index.search(query, limit)]
+
+    def test_ranking(self):
+        # the title weighs more and the document is shorter
+        self.assertEqual(self.get_results("python"), ["a.xml", "b.xml"])
+        self.assertEqual(self.get_results("python", limit=1), ["a.xml"])
+        # documents matching more terms rank higher
+        self.assertEqual(self.get_results("python plants"),
+                         ["b.xml", "a.xml"])
+        self.assertEqual(self.get_results("FOOD"), ["c.xml"])
+        self.assertEqual(self.get_results("unknown"), [])
+
+    def test_scores(self):
+        results = self.search_index.search("python", 10)
+        self.assertGreater(results[0][0], results[1][0])
+        self.assertTrue(all(score > 0 for score, post in results))
+
+    def test_updates(self):
+        self.index.change(
+            added=[FakePost("d.xml", "More cooking", "python soup")],
+            removed=[self.index.posts["a.xml"]],
+            updated=[FakePost("c.xml", "Baking", "bread",
+                              last_modified=datetime(2012, 2, 1))])
+        self.assertEqual(self.get_results("python"), ["d.xml", "b.xml"])
+        self.assertEqual(self.get_results("cooking"), ["d.xml"])
+        self.assertEqual(self.get_results("bread"), ["c.xml"])
+        self.assertEqual(self.get_results("snakes"), [])
+
+    def test_empty(self):
+        search_index = Search.SearchIndex(FakeIndex([]))
+        self.assertEqual(search_index.search("python", 10), [])
+
+class PersistentSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dirname, "search.idx")
+        self.posts = [
+            FakePost("a.xml", "Python tricks"),
+            FakePost("b.xml", "Gardening"),
+        ]
+        self.search_index = Search.SearchIndex(FakeIndex(self.posts),
+                                               self.filename)
+
+    def tearDown(self):
+        self.search_index.flush()
+        shutil.rmtree(self.dirname)
+
+    def load_file(self):
+        with open(self.filename, "rb") as f:
+            return pickle.load(f)
+
+    def test_load(self):
+        self.assertEqual(set(self.load_file()["documents"]),
+                         set(["a.xml", "b.xml"]))
+
+        class CountingSearchIndex(Search.SearchIndex):
+            indexed = []
+
+            def _index_post(self, post):
+                self.indexed.append(post.filename)
+                super(CountingSearchIndex, self)._index_post(post)
+
+        changed = FakePost("b.xml", "Gardening with python",
+                           last_modified=datetime(2012, 2, 1))
+        loaded = CountingSearchIndex(FakeIndex([self.posts[0], changed]),
+                                     self.filename)
+        # only the changed post is indexed again
+        self.assertEqual(CountingSearchIndex.indexed, ["b.xml"])
+        self.assertEqual(
+            [post.filename for score, post in loaded.search("python", 10)],
+            ["a.xml", "b.xml"])
+
+    def test_discard_unreadable(self):
+        with open(self.filename, "wb") as f:
+            f.write(b"garbage")
+        with Mocks.MockLogging(logging.getLogger("PyWeblog.Search")) as logs:
+            loaded = Search.SearchIndex(FakeIndex(self.posts), self.filename)
+            logs.assertLoggedCount("warning", 1)
+        self.assertEqual(len(loaded.search("python", 10)), 1)
+        self.assertEqual(set(self.load_file()["documents"]),
+                         set(["a.xml", "b.xml"]))
+
+    def test_save_in_background(self):
+        self.search_index.save_delay = 60
+        self.search_index._index.change(
+            added=[FakePost("c.xml", "Cooking")])
+        # nothing is written while handling the change
+        self.assertNotIn("c.xml", self.load_file()["documents"])
+        timer = self.search_index._save_timer
+        self.assertIsNotNone(timer)
+
+        # further changes are saved along with the first one
+        self.search_index._index.change(
+            added=[FakePost("d.xml", "Baking")])
+        self.assertIs(self.search_index._save_timer, timer)
+
+        self.search_index.flush()
+        self.assertIsNone(self.search_index._save_timer)
+        self.assertEqual(set(self.load_file()["documents"]),
+                         set(["a.xml", "b.xml", "c.xml", "d.xml"]))
+        # no temporary files are left behind
+        self.assertEqual(os.listdir(self.dirname), ["search.idx"])
+
+    def test_save_after_delay(self):
+        self.search_index.save_delay = 0
+        self.search_index._index.change(
+            removed=[self.posts[0]])
+        self.search_index._save_timer.join()
+        self.assertEqual(set(self.load_file()["documents"]),
+                         set(["b.xml"]))
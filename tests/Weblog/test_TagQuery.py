@@ -0,0 +1,207 @@
+# File name: test_TagQuery.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+from __future__ import unicode_literals
+
+import unittest
+from datetime import datetime, timedelta
+
+import PyWeblog
+import PyWeblog.TagQuery as TagQuery
+
+import tests.Mocks as Mocks
+
+class FakePost(object):
+    def __init__(self, number, keywords=()):
+        self.number = number
+        self.filename = "{0:03d}.xml".format(number)
+        self.creation_date = datetime(2012, 1, 1) + timedelta(days=number)
+        self.keywords = set(keywords)
+
+    def __repr__(self):
+        return "<FakePost {0}>".format(self.number)
+
+class FakeIndex(object):
+    def __init__(self, posts):
+        self.posts = sorted(posts, key=TagQuery._key)
+        self.keywords = {}
+        for post in self.posts:
+            for keyword in post.keywords:
+                self.keywords.setdefault(keyword, []).append(post)
+
+    def get_all_posts(self):
+        return self.posts
+
+    def get_posts_by_keyword(self, keyword):
+        return self.keywords.get(keyword, [])
+
+def get_numbers(posts):
+    return [post.number for post in posts]
+
+def full_range(posts):
+    return TagQuery._Range(posts, 0, len(posts))
+
+class Search(unittest.TestCase):
+    def setUp(self):
+        self.posts = [FakePost(i) for i in range(0, 40, 2)]
+
+    def test_gallop(self):
+        seq = self.posts
+        for lo in range(len(seq)):
+            for number in range(-1, 42):
+                key = TagQuery._key(FakePost(number))
+                expected = TagQuery._bisect(seq, key, lo, len(seq))
+                self.assertEqual(
+                    TagQuery._gallop(seq, key, lo, len(seq)), expected)
+                self.assertEqual(
+                    expected,
+                    lo + len([post for post in seq[lo:]
+                              if TagQuery._key(post) < key]))
+
+    def test_contains(self):
+        window = full_range(self.posts)
+        self.assertTrue(window.contains(self.posts[3]))
+        self.assertFalse(window.contains(FakePost(7)))
+        # the window only narrows
+        self.assertEqual(window.lo, 4)
+        self.assertTrue(window.contains(self.posts[-1]))
+        self.assertFalse(window.contains(FakePost(41)))
+        self.assertEqual(len(window), 0)
+
+class Merging(unittest.TestCase):
+    def setUp(self):
+        self.posts = [FakePost(i) for i in range(100)]
+
+    def get_range(self, step, offset=0):
+        return full_range(self.posts[offset::step])
+
+    def test_intersect(self):
+        self.assertEqual(
+            get_numbers(TagQuery.intersect(
+                [self.get_range(2), self.get_range(3)])),
+            range(0, 100, 6))
+        # a small list against a large one
+        self.assertEqual(
+            get_numbers(TagQuery.intersect(
+                [self.get_range(1), self.get_range(30, 7)])),
+            [7, 37, 67, 97])
+        self.assertEqual(
+            get_numbers(TagQuery.intersect(
+                [self.get_range(2), self.get_range(2, 1)])),
+            [])
+        self.assertEqual(
+            get_numbers(TagQuery.intersect(
+                [self.get_range(2), full_range([])])),
+            [])
+
+    def test_difference(self):
+        self.assertEqual(
+            get_numbers(TagQuery.difference(
+                iter(self.get_range(5)),
+                [self.get_range(2), self.get_range(3)])),
+            [5, 25, 35, 55, 65, 85, 95])
+
+    def test_union(self):
+        merged = TagQuery.union([
+            iter(self.posts[0:10:3]),
+            iter(self.posts[0:10:2]),
+            iter([]),
+        ])
+        # ascending and without duplicates
+        self.assertEqual(get_numbers(merged), [0, 2, 3, 4, 6, 8, 9])
+
+class Query(unittest.TestCase):
+    def setUp(self):
+        self.index = FakeIndex([
+            FakePost(1, ["python", "web"]),
+            FakePost(2, ["python"]),
+            FakePost(3, ["rust", "draft"]),
+            FakePost(4, ["rust"]),
+            FakePost(5, ["python", "web", "draft"]),
+            FakePost(40, ["python", "web"]),
+        ])
+
+    def evaluate(self, spec, **kwargs):
+        query = TagQuery.TagQuery.parse(spec, **kwargs)
+        return get_numbers(query.evaluate(self.index))
+
+    def test_parse(self):
+        query = TagQuery.TagQuery.parse("python+web,rust!draft")
+        self.assertEqual(query.clauses, [
+            (("python", "web"), ()),
+            (("rust",), ("draft",)),
+        ])
+        self.assertEqual(unicode(query), "python+web,rust!draft")
+        for spec in ["python+", ",python", "python!", "!"]:
+            self.assertRaises(ValueError, TagQuery.TagQuery.parse, spec)
+
+    def test_is_query(self):
+        self.assertFalse(TagQuery.TagQuery.is_query("python"))
+        for key in ["a+b", "a,b", "a!b"]:
+            self.assertTrue(TagQuery.TagQuery.is_query(key))
+
+    def test_evaluate(self):
+        self.assertEqual(self.evaluate("python+web"), [1, 5, 40])
+        self.assertEqual(self.evaluate("python+web!draft"), [1, 40])
+        self.assertEqual(self.evaluate("python+web,rust!draft"),
+                         [1, 4, 5, 40])
+        self.assertEqual(self.evaluate("!draft"), [1, 2, 4, 40])
+        self.assertEqual(self.evaluate("web,python"), [1, 2, 5, 40])
+        self.assertEqual(self.evaluate("python+unknown"), [])
+
+    def test_date_bounds(self):
+        self.assertEqual(
+            self.evaluate("python,rust",
+                          since=TagQuery.parse_date_bound("2012-01-03"),
+                          until=TagQuery.parse_date_bound("2012-01",
+                                                          upper=True)),
+            [2, 3, 4, 5])
+
+    def test_parse_date_bound(self):
+        parse = TagQuery.parse_date_bound
+        self.assertEqual(parse("2012"), datetime(2012, 1, 1))
+        self.assertEqual(parse("2012", upper=True), datetime(2013, 1, 1))
+        self.assertEqual(parse("2012-12", upper=True), datetime(2013, 1, 1))
+        self.assertEqual(parse("2012-02-29", upper=True),
+                         datetime(2012, 3, 1))
+        self.assertRaises(ValueError, parse, "yesterday")
+
+class QueryPage(Mocks.BlogSiteTest):
+    def setUpPosts(self):
+        for i in range(1, 4):
+            self.write_post("post{0}".format(i), "Post {0}".format(i),
+                            "2012-0{0}-01T10:00:00Z".format(i),
+                            keywords=["a", "b"])
+
+    def setUpBlog(self, blog):
+        tag_page = blog.find(getattr(PyWeblog.PyBlog, "tag-dir")).find(
+            getattr(PyWeblog.PyBlog, "tag-page"))
+        tag_page.set("page-size", "1")
+
+    def test_pagination_keeps_date_range(self):
+        ctx, message = self.get("blog/tags/a+b", {"since": ["2012-02"]})
+        body = message.get_encoded_body()
+        self.assertIn(b"Post 3", body)
+        self.assertIn(b'page-count="2"', body)
+        self.assertIn(b'href="blog/tags/a+b?since=2012-02&amp;page=2"', body)
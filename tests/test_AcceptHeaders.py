@@ -103,6 +103,25 @@ class AcceptPreferenceList(ListTest):
         ]
         self._test_list(l, expected_qualities)
 
+    def test_from_header(self):
+        header = """text/*;q=0.3, text/html;q=0.7, text/html;level=1,
+               text/html;level=2;q=0.4, */*;q=0.5"""
+        l = AcceptHeaders.AcceptPreferenceList.from_header(header)
+        self.assertIs(AcceptHeaders.AcceptPreferenceList.from_header(header), l)
+        self.assertTrue(l.Frozen)
+        self.assertRaises(TypeError, l.append_header, "text/plain")
+
+        P = AcceptHeaders.AcceptPreference
+        own = [P("text/html", 1.0), P("text/plain", 0.9)]
+        candidates = l.get_candidates(own)
+        candidates.pop()
+        self.assertEqual(l.get_candidates(own), candidates + [(0.7, "text/html")])
+        self.assertEqual(l.best_match(own), "text/html")
+        self._test_list(l, [
+            (P.from_header_section("text/plain"),             0.3),
+            (P.from_header_section("text/html;level=2"),      0.4),
+        ])
+
 class CharsetPreferenceList(ListTest):
     def test_parsing(self):
         P = AcceptHeaders.CharsetPreference
@@ -132,6 +151,16 @@ class CharsetPreferenceList(ListTest):
             ]
         )
 
+    def test_from_header(self):
+        P = AcceptHeaders.CharsetPreference
+        l = AcceptHeaders.CharsetPreferenceList.from_header("iso-8859-5")
+        self.assertSequenceEqual(list(l),
+            [
+                P("iso-8859-5", 1.0),
+                P("iso-8859-1", 1.0)
+            ]
+        )
+
 class LanguagePreferenceList(ListTest):
     def test_parsing(self):
         P = AcceptHeaders.LanguagePreference
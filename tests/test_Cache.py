@@ -63,5 +63,12 @@ class Cache(unittest.TestCase):
         self.assertEqual(len(self.subcache), 1)
         self.assertIn("d0", self.subcache)
 
+    def test_replace(self):
+        dummy = Dummy()
+        self.subcache.replace("d0", dummy)
+        self.assertEqual(len(self.subcache), 10)
+        self.assertIs(self.subcache["d0"], dummy)
+        self.assertNotIn(self.dummies[0], self.subcache.reversemap)
+
     def tearDown(self):
         del self.cache
@@ -244,3 +244,59 @@ vary: host
             parsed = MContext.Context._parse_cookie_header(b"")
             mocked_logging.assertLoggedCount("error", 0)
         self.assertEqual(parsed, {})
+
+    def test_useragent_profile(self):
+        header = b"Mozilla/5.0 (Linux; Android 4.1) AppleWebKit/535.19 (KHTML, like Gecko) Chrome/18.0.1025.166 Mobile Safari/535.19"
+        profile = MContext.Context.get_useragent_profile(header)
+        self.assertEqual(profile.name, "chrome")
+        self.assertEqual(profile.version, 18.0)
+        self.assertTrue(profile.html5)
+        self.assertFalse(profile.prefixed_xhtml)
+        self.assertTrue(profile.mobile)
+        self.assertEqual(profile.classification, "browser")
+        self.assertIs(MContext.Context.get_useragent_profile(header), profile)
+
+        ctx = Mocks.MockedContext("/")
+        ctx.set_useragent_profile(profile)
+        self.assertTrue(ctx.IsMobileClient)
+        self.assertTrue(ctx.HTML5Support)
+
+    def get_capability_context(self, capability_class):
+        ctx = Mocks.MockedContext("/", accept="text/html",
+            request_headers={"X-PyXWF-Class": capability_class})
+        ctx.set_useragent_profile(MContext.Context.get_useragent_profile(
+            b"Mozilla/5.0 (Linux; Android 4.1) AppleWebKit/535.19 "
+            b"(KHTML, like Gecko) Chrome/18.0.1025.166 Mobile "
+            b"Safari/535.19"))
+        return ctx
+
+    def test_capability_class(self):
+        ctx = self.get_capability_context("html-html5-mobile")
+        self.assertTrue(ctx.use_capability_class("X-PyXWF-Class"))
+        self.assertTrue(ctx.IsMobileClient)
+        self.assertTrue(ctx.HTML5Support)
+        self.assertFalse(ctx.CanUseXHTML)
+        self.assertEqual(ctx.CapabilityClass, "html-html5-mobile")
+        self.assertIn("x-pyxwf-class", ctx.Vary)
+        self.assertNotIn("user-agent", ctx.Vary)
+        self.assertNotIn("accept", ctx.Vary)
+
+    def test_capability_class_mismatch(self):
+        # a client must not be able to pick the variant cached for a class
+        ctx = self.get_capability_context("xhtml-html4")
+        self.assertFalse(ctx.use_capability_class("X-PyXWF-Class"))
+        self.assertTrue(ctx.IsMobileClient)
+        self.assertTrue(ctx.HTML5Support)
+        self.assertFalse(ctx.CanUseXHTML)
+        self.assertEqual(ctx.CapabilityClass, "html-html5-mobile")
+        self.assertIn("user-agent", ctx.Vary)
+        self.assertIn("accept", ctx.Vary)
+        self.assertNotIn("x-pyxwf-class", ctx.Vary)
+
+    def test_capability_class_invalid(self):
+        ctx = Mocks.MockedContext("/",
+            request_headers={"X-PyXWF-Class": "fnord"})
+        self.assertFalse(ctx.use_capability_class("X-PyXWF-Class"))
+        ctx.IsMobileClient
+        self.assertIn("user-agent", ctx.Vary)
+        self.assertNotIn("x-pyxwf-class", ctx.Vary)
@@ -0,0 +1,78 @@
+# File name: test_HTTPUtils.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+from __future__ import unicode_literals
+
+import unittest
+
+import PyXWF.HTTPUtils as HTTPUtils
+
+class parse_entity_tags(unittest.TestCase):
+    def test_single(self):
+        self.assertEqual(HTTPUtils.parse_entity_tags('"foo"'), ["foo"])
+
+    def test_list(self):
+        self.assertEqual(
+            HTTPUtils.parse_entity_tags('"foo", W/"bar" ,"baz-1"'),
+            ["foo", "bar", "baz-1"])
+
+    def test_wildcard(self):
+        self.assertEqual(HTTPUtils.parse_entity_tags(" * "), ["*"])
+
+    def test_roundtrip(self):
+        self.assertEqual(
+            HTTPUtils.parse_entity_tags(HTTPUtils.format_entity_tag("a-b")),
+            ["a-b"])
+
+class CachePolicy(unittest.TestCase):
+    def test_default(self):
+        policy = HTTPUtils.CachePolicy()
+        self.assertFalse(policy.is_defined())
+        self.assertEqual(policy.get_tokens(), ["must-revalidate", "max-age=0"])
+
+    def test_tokens(self):
+        policy = HTTPUtils.CachePolicy(max_age=60, s_maxage=600,
+            stale_while_revalidate=30, stale_if_error=86400, scope="public")
+        self.assertTrue(policy.is_defined())
+        self.assertEqual(policy.get_tokens(), [
+            "public", "max-age=60", "s-maxage=600",
+            "stale-while-revalidate=30", "stale-if-error=86400"])
+
+    def test_stale_without_max_age(self):
+        policy = HTTPUtils.CachePolicy(stale_if_error=600)
+        self.assertEqual(policy.get_tokens(),
+                         ["max-age=0", "stale-if-error=600"])
+
+    def test_private(self):
+        policy = HTTPUtils.CachePolicy(max_age=60, s_maxage=600,
+                                       scope="private")
+        self.assertEqual(policy.get_tokens(), ["private", "max-age=60"])
+
+    def test_inherit(self):
+        parent = HTTPUtils.CachePolicy(max_age=60, s_maxage=600,
+                                       scope="public")
+        child = HTTPUtils.CachePolicy(max_age=0, scope="private")
+        self.assertEqual(child.inherit(parent),
+            HTTPUtils.CachePolicy(max_age=0, s_maxage=600, scope="private"))
+        self.assertEqual(HTTPUtils.CachePolicy().inherit(parent), parent)
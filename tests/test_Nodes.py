@@ -26,6 +26,7 @@ from __future__ import unicode_literals
 
 import unittest
 
+from PyXWF.utils import ET
 import PyXWF.Nodes as Nodes
 import PyXWF.Errors as Errors
 
@@ -102,3 +103,89 @@ class Metaclass(unittest.TestCase):
         })
         # XXX: assertIn doesn't work here ... why?
         self.assertEqual(cls.request_handlers["GET"], self.some_callable)
+
+
+class FakeSite(object):
+    def __init__(self):
+        self.nodes = {}
+        self.lazy_node_proxies = []
+
+    def register_node_id(self, ID, node):
+        self.nodes[ID] = node
+
+class Expensive(object):
+    instances = 0
+
+    def __init__(self, site, parent, node):
+        Expensive.instances += 1
+        self.Parent = parent
+        self.Name = node.get("name", "")
+        self.value = node.get("value")
+        site.register_node_id(node.get("id"), self)
+
+class LazyNode(unittest.TestCase):
+    def setUp(self):
+        Expensive.instances = 0
+        self.site = FakeSite()
+        self.element = ET.Element("node", attrib={
+            "id": "expensive",
+            "name": "foo",
+            "value": "bar"
+        })
+        self.proxy = Nodes.LazyNode(Expensive, self.site, None, self.element)
+
+    def test_deferred(self):
+        self.assertEqual(self.proxy.Name, "foo")
+        self.assertIs(self.site.nodes["expensive"], self.proxy)
+        self.assertEqual(self.site.lazy_node_proxies, [self.proxy])
+        self.assertFalse(self.proxy.IsLoaded)
+        self.assertEqual(Expensive.instances, 0)
+
+    def test_forwarding(self):
+        self.assertEqual(self.proxy.value, "bar")
+        self.assertEqual(self.proxy.value, "bar")
+        self.assertTrue(self.proxy.IsLoaded)
+        self.assertEqual(Expensive.instances, 1)
+        node = self.site.nodes["expensive"]
+        self.assertIsInstance(node, Expensive)
+        self.assertIs(self.proxy.get_node(), node)
+
+    def test_equality(self):
+        other = Expensive(FakeSite(), None, self.element)
+        self.assertNotEqual(self.proxy, other)
+        node = self.proxy.get_node()
+        self.assertEqual(self.proxy, node)
+        self.assertEqual(node, self.proxy)
+        self.assertNotEqual(self.proxy, other)
+
+    def tearDown(self):
+        del self.proxy
+        del self.site
+
+class PlainNode(Nodes.Node):
+    def get_navigation_info(self, ctx):
+        raise NotImplementedError()
+
+class NodeCachePolicy(unittest.TestCase):
+    def test_inheritance(self):
+        root = PlainNode(None, None, ET.Element("tree", attrib={
+            "cache-max-age": "60",
+            "cache-s-maxage": "600",
+            "cache-scope": "public"
+        }))
+        child = PlainNode(None, root, ET.Element("node", attrib={
+            "name": "child",
+            "cache-max-age": "0",
+            "cache-stale-while-revalidate": "30"
+        }))
+        grandchild = PlainNode(None, child, ET.Element("node", attrib={
+            "name": "grandchild"
+        }))
+        self.assertEqual(grandchild.CachePolicy.get_tokens(), [
+            "public", "max-age=0", "s-maxage=600",
+            "stale-while-revalidate=30"])
+
+    def test_invalid(self):
+        for attrib in [{"cache-max-age": "-1"}, {"cache-scope": "shared"}]:
+            self.assertRaises(ValueError, PlainNode, None, None,
+                              ET.Element("node", attrib=attrib))
@@ -24,14 +24,21 @@
 ########################################################################
 from __future__ import unicode_literals
 
+import logging
+import os
 import unittest
+from datetime import datetime
 
 from PyXWF.utils import ET
+import PyXWF.utils as utils
 import PyXWF.Namespaces as NS
 import PyXWF.ContentTypes as ContentTypes
 import PyXWF.Message as Message
+import PyXWF.Site as Site
+import PyXWF.WebBackends.WSGI as WSGI
 
 import PyXWF.Nodes.Page
+import PyXWF.Crumbs.Static
 
 import Mocks
 
@@ -177,3 +184,274 @@ class SimpleSite(Mocks.SiteTest):
         message = self.site.get_message(ctx)
         self.assertEqual(message, refmessage)
 
+
+
+class ReloadTest(Mocks.DynamicSiteTest):
+    background = True
+
+    page_xml = """<?xml version="1.0" ?>
+<page xmlns="http://pyxwf.zombofant.net/xmlns/documents/pywebxml">
+    <meta>
+        <title>Home</title>
+    </meta>
+    <body xmlns="http://www.w3.org/1999/xhtml">
+        <p>some text</p>
+    </body>
+</page>""".encode("utf-8")
+
+    def setUp(self):
+        super(ReloadTest, self).setUp()
+        # replace the always-changing timestamps of the FSTest by ones
+        # which only change when we say so
+        self.mtimes = {}
+        utils.file_last_modified = lambda fileref, float_times=False: \
+            self.mtimes.get(os.path.basename(fileref), datetime(2012, 1, 1))
+        with self.fs.open("page.xml", "wb") as f:
+            f.write(self.page_xml)
+        with self.fs.open("default-template.xsl", "wb") as f:
+            f.write(self.default_template_xml)
+        self.write_sitemap()
+        os.chdir(self.fs.Root)
+        self.generations = Site.SiteGenerations(self.fs("sitemap.xml"),
+                                                background=self.background,
+                                                default_url_root="/")
+        self.site = self.generations.Current
+        self.site.get_message(Mocks.MockedContext.from_site(self.site))
+
+    def write_sitemap(self, title="mocked site", tweak=None, extra_node=None,
+            extra_sub_node=None, crumb_src="page.xml"):
+        sitemap, meta, plugins, tweaks, tree, crumbs = \
+            self.get_basic_sitemap()
+        ET.SubElement(plugins, "p").text = "PyXWF.Nodes.Page"
+        meta.find(NS.Site.title).text = title
+        if tweak is not None:
+            tweaks.append(tweak)
+        page = ET.SubElement(tree, PyXWF.Nodes.Page.PageNS.node)
+        page.set("src", "page.xml")
+        page.set("type", ContentTypes.PyWebXML)
+        page.set("id", "home")
+        directory = ET.SubElement(tree,
+            "{http://pyxwf.zombofant.net/xmlns/nodes/directory}node")
+        directory.set("name", "sub")
+        directory.set("id", "sub")
+        page = ET.SubElement(directory, PyXWF.Nodes.Page.PageNS.node)
+        page.set("src", "page.xml")
+        page.set("type", ContentTypes.PyWebXML)
+        page.set("id", "sub-home")
+        if extra_sub_node is not None:
+            directory.append(extra_sub_node)
+        directory = ET.SubElement(tree,
+            "{http://pyxwf.zombofant.net/xmlns/nodes/directory}node")
+        directory.set("name", "other")
+        directory.set("id", "other")
+        page = ET.SubElement(directory, PyXWF.Nodes.Page.PageNS.node)
+        page.set("src", "page.xml")
+        page.set("type", ContentTypes.PyWebXML)
+        page.set("id", "other-home")
+        if extra_node is not None:
+            tree.append(extra_node)
+        ET.SubElement(plugins, "p").text = "PyXWF.Crumbs.Static"
+        for ID, src in [("fixed", "page.xml"), ("changing", crumb_src)]:
+            ET.SubElement(crumbs, PyXWF.Crumbs.Static.StaticNS.crumb,
+                          src=src, type=ContentTypes.PyWebXML, id=ID)
+        with self.fs.open("sitemap.xml", "wb") as f:
+            f.write(ET.tostring(sitemap))
+        self.mtimes["sitemap.xml"] = datetime(2012, 1, 1 + len(self.mtimes))
+
+
+class SiteReload(ReloadTest):
+    def reload(self):
+        self.assertIs(self.generations.get_site(), self.site)
+        thread = self.generations._reload_thread
+        self.assertIsNotNone(thread)
+        thread.join()
+        return self.generations.Current
+
+    def get_cached(self, site, name, filename):
+        subcache = site.cache.subcaches[(site, name)]
+        return subcache.entries.get(self.fs(filename))
+
+    def assert_reparsed(self, new_site, filename):
+        # the crumbs load the document again right away
+        old_document = self.get_cached(self.site, "file-doc-cache", filename)
+        document = self.get_cached(new_site, "file-doc-cache", filename)
+        self.assertIsNot(document.doc, old_document.doc)
+
+    def test_new_generation_copies_caches(self):
+        self.write_sitemap(title="changed title")
+        new_site = self.reload()
+        self.assertIsNot(new_site, self.site)
+
+        old_template = self.get_cached(self.site, "templates",
+                                       "default-template.xsl")
+        template = self.get_cached(new_site, "templates",
+                                   "default-template.xsl")
+        self.assertIsNotNone(template)
+        self.assertIsNot(template, old_template)
+        self.assertIs(template.site, new_site)
+        self.assertIs(template.xslt_transform, old_template.xslt_transform)
+
+        old_document = self.get_cached(self.site, "file-doc-cache", "page.xml")
+        document = self.get_cached(new_site, "file-doc-cache", "page.xml")
+        self.assertIsNotNone(document)
+        self.assertIsNot(document, old_document)
+        self.assertIs(document.doc, old_document.doc)
+
+        # the old generation keeps its entries, it may still be in use
+        self.assertIs(old_template._cache_master, self.site.cache)
+        self.assertIs(old_document._cache_master, self.site.cache)
+
+        ctx = Mocks.MockedContext.from_site(new_site)
+        self.assertTrue(new_site.get_message(ctx))
+
+    def test_new_generation_skips_changed_files(self):
+        self.write_sitemap(title="changed title")
+        self.mtimes["page.xml"] = datetime(2013, 1, 1)
+        new_site = self.reload()
+        self.assertIsNotNone(self.get_cached(new_site, "templates",
+                                             "default-template.xsl"))
+        self.assert_reparsed(new_site, "page.xml")
+
+    def test_new_generation_reparses_on_changed_tweaks(self):
+        self.write_sitemap(tweak=ET.Element(NS.Site.formatting,
+                                            attrib={"date-format": "%Y"}))
+        new_site = self.reload()
+        self.assertIsNot(new_site, self.site)
+        self.assertIsNotNone(self.get_cached(new_site, "templates",
+                                             "default-template.xsl"))
+        self.assert_reparsed(new_site, "page.xml")
+
+    def test_tree_change_builds_new_generation(self):
+        home, sub = self.site.get_node("home"), self.site.get_node("sub")
+        old_tree, old_nodes = self.site.tree, dict(self.site.nodes)
+        old_crumbs = dict(self.site.crumbs)
+        self.write_sitemap(extra_node=ET.Element(
+            "{http://pyxwf.zombofant.net/xmlns/nodes/redirect}internal",
+            attrib={"name": "new", "to": "home", "id": "new"}))
+        new_site = self.reload()
+        self.assertIsNot(new_site, self.site)
+        self.assertEqual(new_site.get_node("new").Parent, new_site.tree)
+        self.assertIsNot(new_site.get_node("sub"), sub)
+        self.assertIs(new_site.get_node("sub").site, new_site)
+        self.assertFalse(new_site.is_sitemap_changed())
+        # documents are taken over
+        self.assertIs(
+            self.get_cached(new_site, "file-doc-cache", "page.xml").doc,
+            self.get_cached(self.site, "file-doc-cache", "page.xml").doc)
+
+        # the old generation is left alone, it may still be in use
+        self.assertIs(self.site.tree, old_tree)
+        self.assertEqual(self.site.nodes, old_nodes)
+        self.assertEqual(self.site.crumbs, old_crumbs)
+        self.assertIs(sub.Parent, old_tree)
+        self.assertIs(home.site, self.site)
+        ctx = Mocks.MockedContext.from_site(self.site)
+        self.assertTrue(self.site.get_message(ctx))
+
+    def test_failed_tree_change_keeps_generation(self):
+        sub = self.site.get_node("sub")
+        old_tree, old_nodes = self.site.tree, self.site.nodes
+        # a second node named "sub" makes loading the tree fail
+        self.write_sitemap(extra_node=ET.Element(
+            "{http://pyxwf.zombofant.net/xmlns/nodes/redirect}internal",
+            attrib={"name": "sub", "to": "home", "id": "new"}))
+        with Mocks.MockLogging(logging.getLogger("PyXWF.Site")) as logs:
+            new_site = self.reload()
+            logs.assertLoggedCount("error", 1)
+        self.assertIs(new_site, self.site)
+        self.assertIs(self.site.tree, old_tree)
+        self.assertIs(self.site.nodes, old_nodes)
+        self.assertIs(sub.Parent, old_tree)
+        self.assertRaises(KeyError, self.site.get_node, "new")
+        # the change is not retried until the sitemap changes again
+        self.assertTrue(self.site.is_sitemap_changed())
+        self.assertIs(self.generations.get_site(), self.site)
+        self.assertIsNone(self.generations._reload_thread)
+
+
+class CustomWSGISite(WSGI.WSGISite):
+    pass
+
+class WSGIReload(ReloadTest):
+    def setUp(self):
+        super(WSGIReload, self).setUp()
+        self.application = CustomWSGISite(self.fs("sitemap.xml"),
+                                          default_url_root="/")
+
+    def test_generations_are_sites(self):
+        self.assertIsInstance(self.application, Site.Site)
+        self.assertIs(self.application.Site, self.application)
+        self.assertFalse(self.application.auto_reload)
+
+        self.write_sitemap(title="changed title")
+        generations = self.application._generations
+        self.assertIs(generations.get_site(), self.application)
+        generations._reload_thread.join()
+        new_site = self.application.Site
+        self.assertIsNot(new_site, self.application)
+        # later generations keep the class and share the generations
+        self.assertIs(type(new_site), CustomWSGISite)
+        self.assertIs(new_site._generations, generations)
+        self.assertIs(new_site.Site, new_site)
+        self.assertEqual(new_site.title, "changed title")
+        self.assertFalse(new_site.auto_reload)
+
+
+class IncrementalReload(ReloadTest):
+    background = False
+
+    def reload(self, **kwargs):
+        self.write_sitemap(**kwargs)
+        self.site.update()
+        self.assertIs(self.generations.Current, self.site)
+
+    def test_reuse_unchanged_subtrees(self):
+        nodes = dict(self.site.nodes)
+        crumbs = dict(self.site.crumbs)
+        self.reload(extra_sub_node=ET.Element(
+            "{http://pyxwf.zombofant.net/xmlns/nodes/redirect}internal",
+            attrib={"name": "new", "to": "home", "id": "new"}))
+        # directories let their unchanged children be reused, with
+        # everything below them
+        for ID in ["home", "other", "other-home", "sub-home"]:
+            self.assertIs(self.site.get_node(ID), nodes[ID], ID)
+        self.assertIs(self.site.get_node("other").Parent, self.site.tree)
+        # the changed directory and its parents are rebuilt
+        for ID in ["treeRoot", "sub"]:
+            self.assertIsNot(self.site.get_node(ID), nodes[ID], ID)
+        sub = self.site.get_node("sub")
+        self.assertIs(sub.Parent, self.site.tree)
+        self.assertIs(self.site.get_node("sub-home").Parent, sub)
+        self.assertIs(self.site.get_node("new").Parent, sub)
+        # crumbs may refer to nodes, so they are all rebuilt
+        for ID in ["fixed", "changing"]:
+            self.assertIsNot(self.site.crumbs[ID], crumbs[ID], ID)
+
+    def test_reuse_unchanged_crumbs(self):
+        with self.fs.open("other-page.xml", "wb") as f:
+            f.write(self.page_xml)
+        tree, nodes = self.site.tree, dict(self.site.nodes)
+        crumbs = dict(self.site.crumbs)
+        self.reload(crumb_src="other-page.xml")
+        self.assertIs(self.site.tree, tree)
+        self.assertEqual(self.site.nodes, nodes)
+        self.assertIs(self.site.crumbs["fixed"], crumbs["fixed"])
+        self.assertIsNot(self.site.crumbs["changing"], crumbs["changing"])
+
+    def test_rebuild_on_config_change(self):
+        nodes = dict(self.site.nodes)
+        crumbs = dict(self.site.crumbs)
+        self.reload(title="changed title")
+        self.assertEqual(self.site.title, "changed title")
+        for ID in ["home", "other", "sub"]:
+            self.assertIsNot(self.site.get_node(ID), nodes[ID], ID)
+        self.assertIsNot(self.site.crumbs["fixed"], crumbs["fixed"])
+
+    def test_failed_reload_is_retried(self):
+        tree = self.site.tree
+        self.write_sitemap(extra_node=ET.Element(
+            "{http://pyxwf.zombofant.net/xmlns/nodes/redirect}internal",
+            attrib={"name": "sub", "to": "home", "id": "new"}))
+        self.assertRaises(ValueError, self.site.update)
+        self.assertIs(self.site.tree, tree)
+        self.assertTrue(self.site.is_sitemap_changed())
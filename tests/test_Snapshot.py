@@ -0,0 +1,67 @@
+# File name: test_Snapshot.py
+# This file is part of: pyxwf
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyxwf please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+from __future__ import unicode_literals
+
+import unittest
+import cPickle as pickle
+
+from PyXWF.utils import ET
+import PyXWF.Namespaces as NS
+import PyXWF.ContentTypes as ContentTypes
+import PyXWF.Snapshot as Snapshot
+
+import tests.Mocks as Mocks
+
+class DocumentState(Mocks.DynamicSiteTest):
+    def setUp(self):
+        super(DocumentState, self).setUp()
+        self.setup_site(self.get_sitemap(self.setUpSitemap))
+
+    def test_roundtrip(self):
+        test_tree = NS.PyWebXML("page",
+            NS.PyWebXML("meta",
+                NS.PyWebXML("title", "fnord"),
+                NS.PyWebXML("kw", "foo"),
+                NS.PyWebXML("date", "2012-01-01T12:00:00Z"),
+                NS.XHTML("script", href="foo")
+            ),
+            NS.XHTML("body",
+                NS.XHTML("p", "bar")
+            )
+        )
+        parser = self.site.parser_registry[ContentTypes.PyWebXML]
+        doc = parser.parse_tree(test_tree)
+
+        state = pickle.loads(pickle.dumps(Snapshot.document_to_state(doc),
+                                          pickle.HIGHEST_PROTOCOL))
+        restored = Snapshot.document_from_state(state)
+
+        self.assertEqual(restored.title, doc.title)
+        self.assertEqual(restored.keywords, doc.keywords)
+        self.assertEqual(restored.date, doc.date)
+        self.assertMultiLineEqual(
+            ET.tostring(restored.to_PyWebXML_page()),
+            ET.tostring(doc.to_PyWebXML_page())
+        )
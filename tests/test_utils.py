@@ -201,3 +201,15 @@ class file_last_modified(Mocks.FSTest):
         os.utime(path, (time, time))
 
         self.assertEqual(TimeUtils.to_datetime(time), utils.file_last_modified(path))
+
+class LRUCache(unittest.TestCase):
+    def test_evict_least_recently_used(self):
+        cache = utils.LRUCache(2)
+        cache["a"] = 1
+        cache["b"] = 2
+        self.assertEqual(cache.get("a"), 1)
+        cache["c"] = 3
+        self.assertEqual(len(cache), 2)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIsNone(cache.get("b"))